@@ -5,12 +5,32 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-# Initialize Phoenix tracing BEFORE importing other modules
+# Phoenix tracing is set up after launch (see PHOENIX_TRACING in monitoring/tracing.py)
 sys.path.append(os.path.join(os.path.dirname(__file__), 'monitoring'))
-from tracing import tracer
+from tracing import init_tracing_in_background
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src/workflows'))
-from recommend_trails import recommend_trails
+from recommend_trails import recommendation_events, format_trails, get_vector_db
+
+# Requests generating at once (each holds an LLM stream) and requests allowed to wait in the queue
+GRADIO_CONCURRENCY_LIMIT = int(os.getenv('GRADIO_CONCURRENCY_LIMIT', '8'))
+GRADIO_MAX_QUEUE = int(os.getenv('GRADIO_MAX_QUEUE', '64'))
+
+def respond(query):
+    """Show the retrieved trails as soon as search finishes, then stream the recommendation"""
+    answer = ""
+    # Clear the previous question's trails, in case search fails
+    yield "", ""
+    for kind, value in recommendation_events(query):
+        if kind == "trails":
+            yield format_trails(value), ""
+        elif kind == "error":
+            answer += f"\n\nError: {value}" if answer else f"Error: {value}"
+            yield gr.skip(), answer
+        else:
+            # Gradio sends only the appended text of each update to the browser
+            answer += value
+            yield gr.skip(), answer
 
 with gr.Blocks(fill_height=True) as demo:
 
@@ -26,21 +46,30 @@ with gr.Blocks(fill_height=True) as demo:
         submit_btn = gr.Button("Submit", variant="primary", size="lg")
         clear_btn = gr.Button("Clear", variant="secondary", size="lg")
     
+    trails = gr.Markdown(label="Matching trails")
+
     output = gr.Textbox(
         label="Recommendation",
         lines=10
     )
 
     submit_btn.click(
-        fn=recommend_trails,
+        fn=respond,
         inputs=query,
-        outputs=output,
+        outputs=[trails, output],
         api_name="recommend"
     )
 
     clear_btn.click(
-        fn=lambda: ("",""),
-        outputs=[query, output]
+        fn=lambda: ("", "", ""),
+        outputs=[query, trails, output],
+        queue=False
     )
 
-demo.launch(server_name="0.0.0.0", server_port=7860)
\ No newline at end of file
+demo.queue(default_concurrency_limit=GRADIO_CONCURRENCY_LIMIT, max_size=GRADIO_MAX_QUEUE)
+
+if __name__ == "__main__":
+    init_tracing_in_background()
+    # Build the shared backend before serving, so a bad setup fails here and not on the first click
+    get_vector_db()
+    demo.launch(server_name="0.0.0.0", server_port=7860)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the VanTrails benchmarks
+Environment setup, latency statistics and JSON result files
+"""
+
+import os
+import sys
+import json
+import platform
+import threading
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+CLEAN_CSV = os.path.join(ROOT_DIR, 'data', 'vancouver_trails_clean.csv')
+QUERY_CSV = os.path.join(ROOT_DIR, 'evaluation', 'query_parser', 'query_parser_test.csv')
+
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.join(ROOT_DIR, 'src'))
+
+# Defaults matching .env.example, so benchmarks run without a .env file
+ENV_DEFAULTS = {
+    'QDRANT_HOST': 'localhost',
+    'QDRANT_PORT': '6333',
+    'COLLECTION_NAME': 'vancouver_trails',
+    'MODEL_NAME': 'jinaai/jina-embeddings-v2-small-en',
+    'EMBEDDING_DIMENSIONALITY': '512',
+    'SECRET_KEY': 'benchmark',
+    # Measure the full pipeline: no query cache, no query log
+    'QUERY_CACHE_PATH': '',
+    'QUERY_LOG_PATH': '',
+}
+
+
+def configure_environment(qdrant_location: str = None) -> None:
+    """Apply env defaults; must run before importing any src module"""
+    for key, value in ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    if qdrant_location:
+        os.environ['QDRANT_LOCATION'] = qdrant_location
+
+
+def start_stub_llm(ttft: float, tokens_per_sec: float, error_rate: float = 0.0) -> str:
+    """Run the stub LLM server in a background thread and point llm_function at it"""
+    from werkzeug.serving import make_server
+    from llm.stub_server import create_app
+
+    app = create_app({'ttft': ttft, 'tokens_per_sec': tokens_per_sec, 'error_rate': error_rate})
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ['OPENAI_BASE_URL'] = base_url
+    return base_url
+
+
+def ensure_trails_ingested(csv_path: str = CLEAN_CSV) -> int:
+    """Create and fill the collection if it is new (always the case for :memory:)"""
+    from rag.vector_search import TrailVectorDB
+
+    vector_db = TrailVectorDB()
+    if vector_db.create_collection():
+        return vector_db.ingest_trails(csv_path)
+    return vector_db.client.get_collection(os.environ['COLLECTION_NAME']).points_count
+
+
+def load_queries(n: int) -> List[str]:
+    """Load benchmark queries from the query parser test set"""
+    import csv
+    with open(QUERY_CSV, encoding='utf-8') as f:
+        queries = [row['user_query'] for row in csv.DictReader(f)]
+    return queries[:n]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds"""
+    if not values:
+        return {}
+    ms = np.asarray(values) * 1000
+    return {
+        'count': int(ms.size),
+        'mean': round(float(ms.mean()), 2),
+        'p50': round(float(np.percentile(ms, 50)), 2),
+        'p95': round(float(np.percentile(ms, 95)), 2),
+        'p99': round(float(np.percentile(ms, 99)), 2),
+        'max': round(float(ms.max()), 2),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save_results(name: str, results: Dict, output: str = None) -> str:
+    """Write results with run metadata to benchmarks/results/<name>-<timestamp>-<rev>.json"""
+    revision = git_revision()
+    timestamp = datetime.now(timezone.utc)
+    payload = {
+        'benchmark': name,
+        'meta': {
+            'git_revision': revision,
+            'timestamp': timestamp.isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        **results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}-{timestamp:%Y%m%d-%H%M%S}-{revision}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    return output
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files and flag regressions
+Exits with status 1 when any tracked metric regresses beyond the threshold
+"""
+
+import sys
+import json
+import argparse
+from typing import Dict, Iterator, Tuple
+
+# Metrics where a higher value is better; every other number is a latency/size (lower is better)
+HIGHER_IS_BETTER = ('throughput', 'recall', 'mrr', 'filter_satisfaction')
+TRACKED_STATS = ('p50', 'p95', 'p99', 'mean', 'max', 'peak_mb')
+
+
+def flatten(results: Dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield (dotted.path, value) for every numeric metric worth comparing"""
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            if key in TRACKED_STATS or any(name in key for name in HIGHER_IS_BETTER):
+                yield path, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result JSON files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    print(f"Baseline: {baseline['meta']['git_revision']} ({baseline['meta']['timestamp']})")
+    print(f"Current:  {current['meta']['git_revision']} ({current['meta']['timestamp']})\n")
+
+    skip = ('config', 'meta')
+    old = dict(flatten({k: v for k, v in baseline.items() if k not in skip}))
+    new = dict(flatten({k: v for k, v in current.items() if k not in skip}))
+
+    regressions = 0
+    for path in sorted(old.keys() & new.keys()):
+        before, after = old[path], new[path]
+        change = ((after - before) / before * 100) if before else 0.0
+        higher_is_better = any(name in path for name in HIGHER_IS_BETTER)
+        regressed = (-change if higher_is_better else change) > args.threshold
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{path:<55} {before:>12.2f} -> {after:>12.2f}  ({change:+6.1f}%){flag}")
+
+    print(f"\n{regressions} regression(s) above {args.threshold}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Ingestion memory benchmark
+Ingests synthetic datasets of growing size and reports peak traced memory, to show
+that streaming ingestion stays flat while building every point up front grows linearly
+"""
+
+import io
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+from common import CLEAN_CSV, configure_environment, save_results
+
+
+def build_dataset(path: str, size: int) -> None:
+    """Write a Parquet dataset of `size` trails by repeating the clean dataset with unique URLs"""
+    import pandas as pd
+    from processing.trail_store import CLEAN_TRAIL_SCHEMA, append_trails
+
+    base = pd.read_csv(CLEAN_CSV)
+    written, copy = 0, 0
+    while written < size:
+        chunk = base.head(size - written).copy()
+        chunk['name'] = chunk['name'] + f" #{copy}"
+        chunk['url'] = chunk['url'] + f"?copy={copy}"
+        append_trails(chunk, path, CLEAN_TRAIL_SCHEMA)
+        written += len(chunk)
+        copy += 1
+
+
+def ingest_all_at_once(vector_db, path: str) -> None:
+    """The previous ingestion path: build every point, then upload them in one call"""
+    from rag.vector_search import COLLECTION_NAME
+
+    points = vector_db.prepare_new_trail_data(path)
+    if points:
+        vector_db.client.upsert(collection_name=COLLECTION_NAME, points=points)
+
+
+def measure(mode: str, path: str, batch_size: int) -> dict:
+    from rag.vector_search import TrailVectorDB, COLLECTION_NAME
+
+    vector_db = TrailVectorDB()
+    vector_db.client.delete_collection(COLLECTION_NAME)
+    with redirect_stdout(io.StringIO()):
+        vector_db.create_collection()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        if mode == 'streaming':
+            # Only the streaming upload is measured; the similarity graph is a separate pass
+            vector_db.ingest_trails(path, batch_size=batch_size, update_graph=False)
+        else:
+            ingest_all_at_once(vector_db, path)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    count = vector_db.client.get_collection(COLLECTION_NAME).points_count
+    return {
+        'points': count,
+        'seconds': round(elapsed, 2),
+        'throughput_trails_per_s': round(count / elapsed, 1) if elapsed else 0.0,
+        'peak_mb': round(peak / 1024 / 1024, 2),
+        # Peak minus what is still held afterwards (the stored collection): the ingestion working set
+        'transient_peak_mb': round((peak - current) / 1024 / 1024, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion peak-memory benchmark")
+    parser.add_argument("--sizes", default="500,2000,8000", help="Comma-separated dataset sizes (trails)")
+    parser.add_argument("--modes", default="streaming,all_at_once")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--qdrant-location", default=":memory:", help="':memory:', a storage path, or '' for QDRANT_HOST")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    configure_environment(args.qdrant_location)
+    # Separate collection so a real Qdrant server's data is never touched
+    os.environ['COLLECTION_NAME'] = 'vancouver_trails_ingest_benchmark'
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    modes = args.modes.split(',')
+    results = {
+        'config': {'sizes': sizes, 'modes': modes, 'batch_size': args.batch_size, 'qdrant_location': args.qdrant_location},
+        'runs': {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix='vantrails-ingest-')
+    for size in sizes:
+        path = os.path.join(workdir, f"trails-{size}.parquet")
+        build_dataset(path, size)
+        for mode in modes:
+            run = measure(mode, path, args.batch_size)
+            results['runs'].setdefault(mode, {})[str(size)] = run
+            print(f"{mode:<12} {size:>7} trails: {run['seconds']:>7}s  peak {run['peak_mb']:>8} MB  "
+                  f"transient {run['transient_peak_mb']:>8} MB")
+
+    path = save_results('ingest', results, args.output)
+    print(f"\nResults saved to: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test and latency benchmark
+Drives /api/recommend, the streaming recommend_trails workflow and the individual
+pipeline stages at a fixed concurrency against a local Qdrant and the stub LLM
+"""
+
+import os
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from common import (
+    configure_environment, start_stub_llm, ensure_trails_ingested,
+    load_queries, summarize, save_results, CLEAN_CSV
+)
+
+SCENARIOS = ("api", "workflow", "stages")
+
+
+def run_load(fn: Callable[[str], Dict[str, float]], queries: List[str], concurrency: int, requests: int) -> Dict:
+    """Call fn for `requests` queries using `concurrency` worker threads"""
+    samples = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(i: int):
+        query = queries[i % len(queries)]
+        try:
+            sample = fn(query)
+            with lock:
+                samples.append(sample)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(requests)))
+    wall = time.perf_counter() - start
+
+    metrics = sorted({key for sample in samples for key in sample})
+    return {
+        'requests': requests,
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(len(samples) / wall, 3) if wall else 0.0,
+        'latency': summarize([s['latency'] for s in samples]),
+        'stages': {key: summarize([s[key] for s in samples if key in s]) for key in metrics if key != 'latency'},
+    }
+
+
+def api_scenario(api_url: str = None) -> Callable:
+    """POST /api/recommend through HTTP, or the in-process Flask app when no URL is given"""
+    if api_url:
+        import requests
+        session = threading.local()
+
+        def call(query):
+            if not hasattr(session, 'value'):
+                session.value = requests.Session()
+            start = time.perf_counter()
+            response = session.value.post(f"{api_url}/api/recommend", json={'query': query}, timeout=120)
+            response.raise_for_status()
+            return {'latency': time.perf_counter() - start}
+        return call
+
+    from vantrails import create_app
+    app = create_app({'TESTING': True})
+    clients = threading.local()
+
+    def call(query):
+        if not hasattr(clients, 'value'):
+            clients.value = app.test_client()
+        start = time.perf_counter()
+        response = clients.value.post('/api/recommend', json={'query': query})
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.get_json()}")
+        return {'latency': time.perf_counter() - start}
+    return call
+
+
+def workflow_scenario() -> Callable:
+    """Consume the streaming recommend_trails generator used by the Gradio UI"""
+    from workflows.recommend_trails import recommend_trails
+
+    def call(query):
+        start = time.perf_counter()
+        first = None
+        # recommend_trails raises if search or generation fails, even mid-stream
+        for _ in recommend_trails(query):
+            if first is None:
+                first = time.perf_counter()
+        end = time.perf_counter()
+        return {'latency': end - start, 'ttft': (first or end) - start}
+    return call
+
+
+def stages_scenario() -> Callable:
+    """Run search and generation separately to report per-stage timings"""
+    from rag.vector_search import TrailVectorDB
+    from rag.generate_recommendations import generate_trail_recommendation
+    from llm.client import llm_function
+
+    def call(query):
+        start = time.perf_counter()
+        vector_db = TrailVectorDB()
+        results = vector_db.search_trails(query, limit=3)
+        searched = time.perf_counter()
+
+        first = None
+        for _ in generate_trail_recommendation(query, results, llm_function):
+            if first is None:
+                first = time.perf_counter()
+        end = time.perf_counter()
+
+        return {
+            'latency': end - start,
+            'parse': vector_db.last_timings.get('parse', 0.0),
+            'search': vector_db.last_timings.get('search', 0.0),
+            'generate_ttft': (first or end) - searched,
+            'generate': end - searched,
+            'ttft': (first or end) - start,
+        }
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VanTrails load test and latency benchmark")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma separated subset of {SCENARIOS}")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=40, help="Requests per scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed requests per scenario (loads models, fills pools)")
+    parser.add_argument("--queries", type=int, default=20, help="Number of distinct queries to cycle through")
+    parser.add_argument("--qdrant-location", default=":memory:",
+                        help="Local Qdrant (':memory:' or a path); empty string uses QDRANT_HOST/QDRANT_PORT")
+    parser.add_argument("--csv", default=CLEAN_CSV, help="Dataset ingested into a new collection")
+    parser.add_argument("--api-url", default=None, help="Benchmark a running API instead of the in-process app")
+    parser.add_argument("--llm-base-url", default=None, help="Use an already running OpenAI-compatible server")
+    parser.add_argument("--stub-ttft", type=float, default=0.3)
+    parser.add_argument("--stub-tokens-per-sec", type=float, default=50)
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    configure_environment(args.qdrant_location)
+    if args.llm_base_url:
+        os.environ['OPENAI_BASE_URL'] = args.llm_base_url
+    else:
+        print(f"Started stub LLM at {start_stub_llm(args.stub_ttft, args.stub_tokens_per_sec)}")
+
+    print(f"Trails in collection: {ensure_trails_ingested(args.csv)}")
+
+    queries = load_queries(args.queries)
+    builders = {
+        'api': lambda: api_scenario(args.api_url),
+        'workflow': workflow_scenario,
+        'stages': stages_scenario,
+    }
+
+    results = {
+        'config': {
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'queries': len(queries),
+            'qdrant_location': args.qdrant_location or f"{os.environ['QDRANT_HOST']}:{os.environ['QDRANT_PORT']}",
+            'llm': args.llm_base_url or {'stub_ttft': args.stub_ttft, 'stub_tokens_per_sec': args.stub_tokens_per_sec},
+        },
+        'scenarios': {},
+    }
+
+    for name in args.scenarios.split(","):
+        name = name.strip()
+        fn = builders[name]()
+        if args.warmup:
+            run_load(fn, queries, 1, args.warmup)
+        print(f"\nRunning {name}: {args.requests} requests at concurrency {args.concurrency}")
+        scenario = run_load(fn, queries, args.concurrency, args.requests)
+        results['scenarios'][name] = scenario
+
+        latency = scenario['latency']
+        print(f"   throughput: {scenario['throughput_rps']} req/s, errors: {scenario['errors']}")
+        if latency:
+            print(f"   latency ms: p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}")
+        for stage, stats in scenario['stages'].items():
+            print(f"   {stage:<14} p50 {stats['p50']:>9} ms  p95 {stats['p95']:>9} ms")
+
+    path = save_results('load_test', results, args.output)
+    print(f"\nResults saved to: {path}")
+
+
+if __name__ == "__main__":
+    main()
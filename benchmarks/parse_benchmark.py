@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+HTML parsing micro-benchmark for the scraper
+Compares the original full html.parser parse with the lxml + SoupStrainer
+partial parse over saved pages: time per page, peak memory, identical output
+"""
+
+import os
+import time
+import logging
+import argparse
+import tracemalloc
+from statistics import median
+from typing import Callable, Dict, List
+
+from bs4 import BeautifulSoup
+
+from common import ROOT_DIR, save_results
+
+from scrapers.fixtures import FixtureArchive
+from scrapers.scraper import (
+    VancouverTrailsScraper, description_from_soup, parse_trail_description, parse_trails_list
+)
+
+DEFAULT_FIXTURES = os.path.join(ROOT_DIR, 'data', 'http_cache')
+
+
+def load_fixtures(path: str) -> Dict[str, List[bytes]]:
+    """Read saved pages (fixture .zip, .html files or HTTP cache .body files) split into listing and trail pages"""
+    pages = {'listing': [], 'trail': []}
+    if path.endswith('.zip'):
+        for content in FixtureArchive(path).pages.values():
+            pages['listing' if b'trails-list' in content else 'trail'].append(content)
+        return pages
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if not name.endswith(('.html', '.body')):
+                continue
+            with open(os.path.join(root, name), 'rb') as f:
+                content = f.read()
+            pages['listing' if b'trails-list' in content else 'trail'].append(content)
+    return pages
+
+
+def measure(fn: Callable[[bytes], object], pages: List[bytes], repeat: int) -> Dict:
+    """Median time per page over `repeat` passes and the peak traced memory of one pass"""
+    per_page = []
+    for content in pages:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(content)
+            times.append(time.perf_counter() - start)
+        per_page.append(median(times))
+
+    tracemalloc.start()
+    peak = 0
+    for content in pages:
+        tracemalloc.reset_peak()
+        fn(content)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return {
+        'pages': len(pages),
+        'mean_ms_per_page': round(sum(per_page) / len(per_page) * 1000, 3),
+        'p50': round(median(per_page) * 1000, 3),
+        'total_ms': round(sum(per_page) * 1000, 2),
+        'peak_mb': round(peak / 1024 / 1024, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraper HTML parsing micro-benchmark")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Fixture archive or folder of saved pages (default: scraper HTTP cache)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    # Per-page INFO logs would dominate the output and the timings
+    logging.disable(logging.INFO)
+
+    pages = load_fixtures(args.fixtures)
+    if not pages['listing'] and not pages['trail']:
+        print(f"No saved pages found in {args.fixtures}. Run the scraper with a cache_dir or record fixtures first.")
+        return 1
+
+    scraper = VancouverTrailsScraper()
+    variants = {
+        'listing': {
+            'before': lambda c: scraper.extract_trail_data(BeautifulSoup(c, 'html.parser')),
+            'after': lambda c: scraper.extract_trail_data(parse_trails_list(c)),
+        },
+        'trail': {
+            'before': lambda c: description_from_soup(BeautifulSoup(c, 'html.parser')),
+            'after': parse_trail_description,
+        },
+    }
+
+    results = {'config': {'fixtures': args.fixtures, 'repeat': args.repeat}, 'pages': {}}
+    for kind, fns in variants.items():
+        if not pages[kind]:
+            continue
+        mismatches = sum(fns['before'](c) != fns['after'](c) for c in pages[kind])
+        before = measure(fns['before'], pages[kind], args.repeat)
+        after = measure(fns['after'], pages[kind], args.repeat)
+        results['pages'][kind] = {
+            'before': before,
+            'after': after,
+            'speedup': round(before['mean_ms_per_page'] / after['mean_ms_per_page'], 2),
+            'output_mismatches': mismatches,
+        }
+
+        print(f"\n{kind} pages ({len(pages[kind])}):")
+        print(f"   html.parser full parse:  {before['mean_ms_per_page']:>8} ms/page  peak {before['peak_mb']} MB")
+        print(f"   lxml partial parse:      {after['mean_ms_per_page']:>8} ms/page  peak {after['peak_mb']} MB")
+        print(f"   speedup: {results['pages'][kind]['speedup']}x, output mismatches: {mismatches}")
+
+    path = save_results('parse', results, args.output)
+    print(f"\nResults saved to: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Offline scrape pipeline benchmark
+Times the full scraper against a recorded fixture archive, with no network access
+"""
+
+import os
+import time
+import json
+import hashlib
+import logging
+import argparse
+import tempfile
+
+from common import ROOT_DIR, save_results
+
+from scrapers.scraper import VancouverTrailsScraper
+
+DEFAULT_ARCHIVE = os.path.join(ROOT_DIR, 'data', 'fixtures', 'vancouvertrails.zip')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the scrape pipeline against recorded fixtures")
+    parser.add_argument("--fixtures", default=DEFAULT_ARCHIVE, help="Archive recorded with SCRAPER_FIXTURES_MODE=record")
+    parser.add_argument("--base-url", default="https://www.vancouvertrails.com", help="Site the fixtures were recorded from")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--parse-workers", type=int, default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    # Per-page INFO logs would dominate the output and the timings
+    logging.disable(logging.INFO)
+
+    if not os.path.exists(args.fixtures):
+        print(f"No fixture archive at {args.fixtures}. Record one with SCRAPER_FIXTURES_MODE=record first.")
+        return 1
+
+    timings, digests = [], set()
+    for i in range(args.repeat):
+        scraper = VancouverTrailsScraper(args.base_url, replay_fixtures=args.fixtures, parse_workers=args.parse_workers)
+        # A missing CSV means every trail counts as new, so the whole pipeline runs
+        csv_file = os.path.join(tempfile.mkdtemp(), 'trails.csv')
+        start = time.perf_counter()
+        trails = scraper.scrape_all_trails(csv_file)
+        timings.append(time.perf_counter() - start)
+        digests.add(hashlib.sha256(json.dumps(trails, sort_keys=True).encode()).hexdigest())
+        print(f"Run {i + 1}: {len(trails)} trails in {timings[-1]:.2f}s")
+
+    results = {
+        'config': {'fixtures': args.fixtures, 'repeat': args.repeat, 'parse_workers': scraper.parse_workers},
+        'trails': len(trails),
+        'scrape_seconds': {'p50': round(sorted(timings)[len(timings) // 2], 3), 'max': round(max(timings), 3)},
+        'deterministic': len(digests) == 1,
+    }
+    print(f"Deterministic output: {results['deterministic']}")
+
+    path = save_results('scrape', results, args.output)
+    print(f"Results saved to: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
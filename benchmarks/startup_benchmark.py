@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark
+Starts the Flask API (vantrails.create_app) and the Gradio UI (app.py) in fresh
+processes and reports import time, time-to-first-request and the slowest imports
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import Dict, List
+
+from common import ROOT_DIR, configure_environment, save_results, summarize
+
+# Each probe runs in a fresh interpreter and prints its timings as JSON on the last line.
+# Times are measured from just before the first project import.
+PROBES = {
+    'api': """
+import json, time
+start = time.perf_counter()
+import vantrails
+app = vantrails.create_app({'TESTING': True})
+imported = time.perf_counter()
+response = app.test_client().get('/health')
+assert response.status_code == 200, response.status_code
+done = time.perf_counter()
+print(json.dumps({'import_s': imported - start, 'first_request_s': done - start}))
+""",
+    'ui': """
+import json, time, socket, urllib.request
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+with socket.socket() as s:
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+app.demo.launch(server_name='127.0.0.1', server_port=port, prevent_thread_lock=True, quiet=True)
+while True:
+    try:
+        urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+        break
+    except OSError:
+        time.sleep(0.01)
+done = time.perf_counter()
+app.demo.close()
+print(json.dumps({'import_s': imported - start, 'first_request_s': done - start}))
+""",
+}
+
+
+def run_probe(target: str, importtime: bool = False) -> Dict:
+    """Run one probe in a fresh process; returns its timings plus the whole process wall time"""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', PROBES[target]]
+    start = time.perf_counter()
+    proc = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"exit status {proc.returncode}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['process_s'] = elapsed
+    if importtime:
+        result['importtime'] = proc.stderr
+    return result
+
+
+def slowest_imports(importtime_log: str, top: int) -> List[Dict]:
+    """Packages by cumulative import time (including what they pull in), from `python -X importtime` output"""
+    imports = []
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Packages only, at any nesting depth; their submodules are included in the cumulative time
+        if '.' in name.strip():
+            continue
+        imports.append({'module': name.strip(), 'ms': round(int(cumulative) / 1000, 1)})
+    return sorted(imports, key=lambda item: item['ms'], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time benchmark")
+    parser.add_argument("--targets", default="api,ui", help="Comma-separated: api (vantrails.create_app), ui (app.py)")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per target")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to report")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    configure_environment()
+    # Tracing would otherwise start exporting to Phoenix from the UI probe
+    os.environ.setdefault('PHOENIX_TRACING', 'off')
+
+    targets = args.targets.split(',')
+    results = {'config': {'targets': targets, 'repeat': args.repeat}, 'startup': {}}
+    for target in targets:
+        try:
+            runs = [run_probe(target) for _ in range(args.repeat)]
+            profile = run_probe(target, importtime=True)
+        except RuntimeError as e:
+            print(f"{target:<4} failed: {e}")
+            results['startup'][target] = {'error': str(e)}
+            continue
+
+        results['startup'][target] = {
+            'import': summarize([run['import_s'] for run in runs]),
+            'first_request': summarize([run['first_request_s'] for run in runs]),
+            'process': summarize([run['process_s'] for run in runs]),
+            'slowest_imports': slowest_imports(profile['importtime'], args.top),
+        }
+        stats = results['startup'][target]
+        print(f"{target:<4} import p50 {stats['import']['p50']:>8} ms   first request p50 "
+              f"{stats['first_request']['p50']:>8} ms   process p50 {stats['process']['p50']:>8} ms")
+        for item in stats['slowest_imports']:
+            print(f"       {item['ms']:>8} ms  {item['module']}")
+
+    path = save_results('startup', results, args.output)
+    print(f"\nResults saved to: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
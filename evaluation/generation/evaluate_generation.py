@@ -5,10 +5,22 @@ Evaluate generation quality using LLM-as-a-Judge
 
 import os
 import sys
-import pandas as pd
 import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import pandas as pd
+import openai
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
+# Judge freshly generated answers and keep eval questions out of the hot queries:
+# no query cache, no query log (read when the modules are imported)
+os.environ.setdefault('QUERY_CACHE_PATH', '')
+os.environ.setdefault('QUERY_LOG_PATH', '')
+
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
@@ -43,37 +55,148 @@ Provide your feedback.
 Feedback:::
 Evaluation: """
 
-def evaluate_response(question: str) -> dict:
+# Errors worth retrying: rate limits, timeouts and transient server failures
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def api_error(error: Exception) -> Exception:
+    """The OpenAI error behind a failure; recommend_trails raises RuntimeError chained to it"""
+    return error.__cause__ if error.__cause__ is not None else error
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether the error, or the OpenAI error behind a workflow failure, is transient"""
+    return isinstance(error, RETRYABLE_ERRORS) or isinstance(error.__cause__, RETRYABLE_ERRORS)
+
+
+def with_retries(fn, *args, max_retries: int = 5, base_delay: float = 2.0):
+    """Call fn, backing off exponentially (or as told by Retry-After) on retryable API errors"""
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+            response = getattr(api_error(e), "response", None)
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            time.sleep(delay)
+
+
+class JudgeCache:
+    """Append-only cache of judge outputs keyed by (question, answer hash)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry["evaluation"]
+
+    @staticmethod
+    def key(question: str, answer: str) -> str:
+        answer_hash = hashlib.sha256(answer.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{question}\x00{answer_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, question: str, answer: str):
+        return self.entries.get(self.key(question, answer))
+
+    def put(self, question: str, answer: str, evaluation: str) -> None:
+        key = self.key(question, answer)
+        with self._lock:
+            self.entries[key] = evaluation
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "evaluation": evaluation}, ensure_ascii=False) + "\n")
+
+
+class Checkpoint:
+    """JSONL file with one finished result per line, so a crashed run can resume"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.results = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        result = json.loads(line)
+                        self.results[result["query"]] = result
+
+    def is_done(self, query: str) -> bool:
+        """Finished queries are skipped on resume, failed ones are retried"""
+        result = self.results.get(query)
+        return result is not None and not result.get("error")
+
+    def save(self, result: dict) -> None:
+        with self._lock:
+            self.results[result["query"]] = result
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def generate_answer(question: str) -> str:
+    """Run the full recommendation workflow and return the final answer (raises if it failed)"""
+    return "".join(recommend_trails(question))
+
+
+def parse_judge_output(evaluation: str):
+    """Extract (rating, evaluation_text) from the judge output"""
+    rating = None
+    evaluation_text = ""
+    
+    if "Total rating:" in evaluation:
+        lines = evaluation.split('\n')
+        for line in lines:
+            if line.strip().startswith("Total rating:"):
+                try:
+                    rating = int(line.split(":")[-1].strip())
+                except:
+                    pass
+            elif line.strip().startswith("Evaluation:"):
+                evaluation_text = line.split(":", 1)[-1].strip()
+
+    return rating, evaluation_text
+
+
+def evaluate_response(question: str, judge_cache: JudgeCache = None, max_retries: int = 5) -> dict:
     """Evaluate a response using LLM-as-a-Judge"""
+    answer = ""
     try:
-        answer_generator = recommend_trails(question)
-        answer = ""
-        for chunk in answer_generator:
-            answer = chunk  # Keep only the latest (complete) response
-        judge_prompt = IMPROVED_JUDGE_PROMPT.format(question=question, answer=answer)
-        system_prompt = "You are an expert evaluator of AI system responses. Provide fair and accurate ratings."
-        evaluation = llm_function(judge_prompt, system_prompt, stream=False)
-        
-        # Extract rating from the evaluation
-        rating = None
-        evaluation_text = ""
-        
-        if "Total rating:" in evaluation:
-            lines = evaluation.split('\n')
-            for line in lines:
-                if line.strip().startswith("Total rating:"):
-                    try:
-                        rating = int(line.split(":")[-1].strip())
-                    except:
-                        pass
-                elif line.strip().startswith("Evaluation:"):
-                    evaluation_text = line.split(":", 1)[-1].strip()
+        answer = with_retries(generate_answer, question, max_retries=max_retries)
+
+        evaluation = judge_cache.get(question, answer) if judge_cache else None
+        if evaluation is None:
+            judge_prompt = IMPROVED_JUDGE_PROMPT.format(question=question, answer=answer)
+            system_prompt = "You are an expert evaluator of AI system responses. Provide fair and accurate ratings."
+            evaluation = with_retries(llm_function, judge_prompt, system_prompt, False, max_retries=max_retries)
+            if judge_cache:
+                judge_cache.put(question, answer, evaluation)
+
+        rating, evaluation_text = parse_judge_output(evaluation)
         
         return {
             "query": question,
             "answer": answer,
             "rating": rating,
             "evaluation_text": evaluation_text,
+            "error": None,
         }
     except Exception as e:
         return {
@@ -81,49 +204,49 @@ def evaluate_response(question: str) -> dict:
             "answer": answer,
             "rating": None,
             "evaluation_text": f"Error in evaluation: {e}",
+            "error": str(e),
         }
 
 def main():
     """Run generation evaluation"""
+    parser = argparse.ArgumentParser(description="Evaluate generation quality using LLM-as-a-Judge")
+    parser.add_argument("--test-set", default="../query_parser/query_parser_test.csv")
+    parser.add_argument("--limit", type=int, default=21, help="Number of queries to evaluate")
+    parser.add_argument("--concurrency", type=int, default=4, help="Queries evaluated in parallel")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries per LLM call on rate limits and transient errors")
+    parser.add_argument("--checkpoint", default="generation_evaluation_checkpoint.jsonl")
+    parser.add_argument("--judge-cache", default="judge_cache.jsonl")
+    parser.add_argument("--output", default="generation_evaluation_results.csv")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint and start over")
+    args = parser.parse_args()
+
     print("Starting generation evaluation...")
     
-    test_df = pd.read_csv("../query_parser/query_parser_test.csv")
-    queries = test_df.loc[:20, 'user_query'].tolist()
+    test_df = pd.read_csv(args.test_set)
+    queries = test_df['user_query'].head(args.limit).tolist()
 
-    print(f"Evaluating {len(queries)} queries...")
-    
-    results = []
+    if args.fresh and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = Checkpoint(args.checkpoint)
+    judge_cache = JudgeCache(args.judge_cache)
+
+    pending = [query for query in queries if not checkpoint.is_done(query)]
+    print(f"Evaluating {len(pending)} queries ({len(queries) - len(pending)} already in checkpoint)...")
     
-    for query in tqdm(queries, desc="Generating and evaluating responses"):
-        try:
-            # Evaluate response
-            evaluation = evaluate_response(query)
-            
-            result = {
-                'query': query,
-                'answer': evaluation['answer'],
-                'rating': evaluation['rating'],
-                'evaluation_text': evaluation['evaluation_text'],
-            }
-            
-            results.append(result)
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(evaluate_response, query, judge_cache, args.max_retries) for query in pending]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Generating and evaluating responses"):
+            evaluation = future.result()
+            checkpoint.save(evaluation)
             print(f"Rating: {evaluation['rating']}")
-            
-        except Exception as e:
-            print(f"Error processing query: {e}")
-            results.append({
-                'query': query,
-                'answer': f"Error: {e}",
-                'rating': None,
-                'evaluation_text': f"Error: {e}",
-            })
     
-    # Save results
-    results_df = pd.DataFrame(results)
-    results_df.to_csv("generation_evaluation_results.csv", index=False)
+    # Save results in test-set order
+    results = [checkpoint.results[query] for query in queries if query in checkpoint.results]
+    results_df = pd.DataFrame(results, columns=['query', 'answer', 'rating', 'evaluation_text'])
+    results_df.to_csv(args.output, index=False)
     
     # Calculate statistics
-    valid_ratings = [r for r in results_df['rating'] if r is not None]
+    valid_ratings = [int(r) for r in results_df['rating'] if pd.notna(r)]
     if valid_ratings:
         avg_rating = sum(valid_ratings) / len(valid_ratings)
         rating_counts = {i: valid_ratings.count(i) for i in range(1, 5)}
@@ -140,7 +263,7 @@ def main():
             print(f"  {rating}/4: {count} ({percentage:.1f}%)")
         print(f"{'='*50}")
     
-    print(f"\nResults saved to: generation_evaluation_results.csv")
+    print(f"\nResults saved to: {args.output}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Offline retrieval benchmark
+Measures recall@k, MRR and filter satisfaction on a labelled query set, plus
+parse/embed/search latency percentiles, against a local or in-memory Qdrant
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import pandas as pd
+from tqdm import tqdm
+# Suppress HuggingFace warnings
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+# Add repository root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from benchmarks.common import configure_environment, summarize, save_results
+
+HERE = os.path.dirname(__file__)
+LABELLED_QUERIES = os.path.join(HERE, "labelled_queries.csv")
+PARSE_CACHE = os.path.join(HERE, "parse_cache.json")
+CLEAN_CSV = os.path.join(HERE, "../../data/vancouver_trails_clean.csv")
+
+
+def load_labelled_queries(path: str) -> list:
+    """Rows of (query, expected filters, set of relevant trail urls)"""
+    df = pd.read_csv(path)
+    return [
+        {
+            'query': row['query'],
+            'expected_filters': json.loads(row['expected_filters']),
+            'relevant_urls': set(row['relevant_urls'].split('|')),
+        }
+        for _, row in df.iterrows()
+    ]
+
+
+def load_filters(labelled: list, source: str, cache_path: str) -> dict:
+    """
+    Filters per query and the time it took to produce them
+
+    expected: labelled filters, no LLM at all
+    cached:   LLM parses stored in cache_path, only missing queries call the parser
+    none:     pure vector search
+    """
+    if source == "none":
+        return {item['query']: ({}, None) for item in labelled}
+    if source == "expected":
+        return {item['query']: (item['expected_filters'], None) for item in labelled}
+
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+
+    missing = [item['query'] for item in labelled if item['query'] not in cache]
+    if missing:
+        from src.processing.query_parser import QueryParser
+        from src.llm.client import llm_function
+        query_parser = QueryParser()
+        for query in tqdm(missing, desc="Parsing uncached queries"):
+            start = time.perf_counter()
+            filters_dict = query_parser.parse_query_with_llm(query, llm_function)
+            cache[query] = {'filters': filters_dict, 'parse_seconds': time.perf_counter() - start}
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2, ensure_ascii=False)
+
+    return {item['query']: (cache[item['query']]['filters'], cache[item['query']]['parse_seconds']) for item in labelled}
+
+
+def build_index(client, collection: str, model, csv_path: str, build_trail_payload, models) -> int:
+    """Embed the dataset with the given model into a fresh collection"""
+    df = pd.read_csv(csv_path)
+    payloads = [build_trail_payload(row) for _, row in df.iterrows()]
+    vectors = list(model.embed([payload['description'] for payload in payloads], batch_size=32))
+
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    client.create_collection(
+        collection_name=collection,
+        vectors_config=models.VectorParams(size=len(vectors[0]), distance=models.Distance.COSINE)
+    )
+    client.upload_points(
+        collection_name=collection,
+        points=[
+            models.PointStruct(id=i, vector=vector.tolist(), payload=payload)
+            for i, (vector, payload) in enumerate(zip(vectors, payloads))
+        ]
+    )
+    return len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark")
+    parser.add_argument("--queries", default=LABELLED_QUERIES, help="Labelled query CSV")
+    parser.add_argument("--csv", default=CLEAN_CSV, help="Trail dataset to index")
+    parser.add_argument("--qdrant-location", default=":memory:", help="':memory:' or a local storage path")
+    parser.add_argument("--model", default=None, help="fastembed model (default: MODEL_NAME)")
+    parser.add_argument("--filters", choices=("expected", "cached", "none"), default="expected",
+                        help="Where query filters come from")
+    parser.add_argument("--parse-cache", default=PARSE_CACHE)
+    parser.add_argument("--k", default="1,3,5", help="Comma separated cut-offs for recall@k")
+    parser.add_argument("--hnsw-ef", type=int, default=None, help="Search-time HNSW ef")
+    parser.add_argument("--exact", action="store_true", help="Brute-force search instead of HNSW")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the query set")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    configure_environment()
+    from fastembed import TextEmbedding
+    from qdrant_client import models
+    from src.rag.vector_search import build_trail_payload, payload_matches_filters, TrailVectorDB
+
+    model_name = args.model or os.environ['MODEL_NAME']
+    ks = sorted(int(k) for k in args.k.split(","))
+    max_k = ks[-1]
+
+    labelled = load_labelled_queries(args.queries)
+    filters = load_filters(labelled, args.filters, args.parse_cache)
+
+    vector_db = TrailVectorDB(location=args.qdrant_location)
+    client = vector_db.client
+    collection = "retrieval_benchmark_" + model_name.replace("/", "_").replace("-", "_")
+
+    print(f"Indexing {args.csv} with {model_name}...")
+    model = TextEmbedding(model_name)
+    start = time.perf_counter()
+    n_trails = build_index(client, collection, model, args.csv, build_trail_payload, models)
+    index_seconds = time.perf_counter() - start
+    print(f"   {n_trails} trails indexed in {index_seconds:.1f}s")
+
+    search_params = models.SearchParams(hnsw_ef=args.hnsw_ef, exact=args.exact)
+
+    embed_times, search_times = [], []
+    recall_hits = {k: [] for k in ks}
+    reciprocal_ranks, satisfied = [], []
+
+    for repeat in range(args.repeat):
+        for item in tqdm(labelled, desc=f"Pass {repeat + 1}/{args.repeat}"):
+            filters_dict, _ = filters[item['query']]
+
+            start = time.perf_counter()
+            vector = next(iter(model.query_embed([item['query']])))
+            embedded = time.perf_counter()
+            response = client.query_points(
+                collection_name=collection,
+                query=vector.tolist(),
+                query_filter=vector_db.build_qdrant_filter(filters_dict),
+                search_params=search_params,
+                limit=max_k,
+                with_payload=True
+            )
+            searched = time.perf_counter()
+            embed_times.append(embedded - start)
+            search_times.append(searched - embedded)
+
+            if repeat:
+                continue  # quality metrics are deterministic, score the first pass only
+            urls = [point.payload['url'] for point in response.points]
+            relevant = item['relevant_urls']
+            for k in ks:
+                recall_hits[k].append(len(relevant & set(urls[:k])) / len(relevant))
+            rank = next((i for i, url in enumerate(urls, 1) if url in relevant), None)
+            reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+            satisfied.extend(payload_matches_filters(point.payload, item['expected_filters']) for point in response.points)
+
+    parse_times = [seconds for _, seconds in filters.values() if seconds is not None]
+    quality = {f'recall@{k}': round(sum(hits) / len(hits), 4) for k, hits in recall_hits.items()}
+    quality['mrr'] = round(sum(reciprocal_ranks) / len(reciprocal_ranks), 4)
+    quality['filter_satisfaction'] = round(sum(satisfied) / len(satisfied), 4) if satisfied else None
+
+    results = {
+        'config': {
+            'model': model_name,
+            'filters': args.filters,
+            'queries': len(labelled),
+            'trails': n_trails,
+            'hnsw_ef': args.hnsw_ef,
+            'exact': args.exact,
+            'repeat': args.repeat,
+        },
+        'quality': quality,
+        'latency': {
+            'parse': summarize(parse_times),
+            'embed': summarize(embed_times),
+            'search': summarize(search_times),
+        },
+        'index_seconds': round(index_seconds, 2),
+    }
+
+    print("=" * 50)
+    print("RETRIEVAL BENCHMARK RESULTS")
+    print("=" * 50)
+    for metric, value in quality.items():
+        print(f"{metric:<20} {value}")
+    for stage, stats in results['latency'].items():
+        if stats:
+            print(f"{stage:<20} p50 {stats['p50']} ms  p95 {stats['p95']} ms  p99 {stats['p99']} ms")
+    print("=" * 50)
+
+    path = save_results('retrieval', results, args.output)
+    print(f"Results saved to: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Trail-name fast path check
+Runs the name index over name_match_cases.csv and every labelled retrieval
+query (none of which may take the fast path, since they carry other
+constraints) and reports wrong, missed and spurious matches
+"""
+
+import os
+import sys
+import pandas as pd
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+
+from rag.name_index import TrailNameIndex
+
+HERE = os.path.dirname(__file__)
+NAME_MATCH_CASES = os.path.join(HERE, "name_match_cases.csv")
+LABELLED_QUERIES = os.path.join(HERE, "labelled_queries.csv")
+CLEAN_CSV = os.path.join(HERE, "../../data/vancouver_trails_clean.csv")
+
+
+def load_cases() -> list:
+    """(query, expected trail name or None) pairs"""
+    cases = pd.read_csv(NAME_MATCH_CASES, keep_default_na=False)
+    labelled = pd.read_csv(LABELLED_QUERIES)
+    return (
+        [(row['query'], row['expected_name'] or None) for _, row in cases.iterrows()]
+        + [(query, None) for query in labelled['query']]
+    )
+
+
+def main():
+    trails = pd.read_csv(CLEAN_CSV)
+    index = TrailNameIndex(dict(zip(trails['url'], trails['name'])))
+
+    print("🔤 Trail-name fast path check")
+    print("=" * 50)
+    failures = 0
+    cases = load_cases()
+    for query, expected in cases:
+        match = index.match(query)
+        matched = match[1] if match else None
+        if matched != expected:
+            failures += 1
+            print(f"   ❌ {query!r}: expected {expected or 'no match'}, got {matched or 'no match'}")
+
+    print(f"\n{'✅' if not failures else '❌'} {len(cases) - failures}/{len(cases)} cases passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,52 @@
 import os
+import threading
+from functools import lru_cache
 from opentelemetry import trace
 
+# eager: set up Phoenix at import time (the old behaviour)
+# deferred: set up in a background thread once the app is serving
+# off: no tracing
+PHOENIX_TRACING = os.getenv("PHOENIX_TRACING", "deferred")
+
 def _init_tracer():
     try:
-        from phoenix.otel import register 
+        from phoenix.otel import register
         from openinference.instrumentation.openai import OpenAIInstrumentor
-        
+
         project_name = os.getenv("PHOENIX_PROJECT_NAME", "vantrails")
-        
+
         tp = register(
             project_name=project_name,
             endpoint="http://host.docker.internal:6006/v1/traces",
             auto_instrument=True
         )
-        
+
         # Explicitly instrument OpenAI
         OpenAIInstrumentor().instrument(tracer_provider=tp)
-        
+
         return tp.get_tracer(project_name)
     except Exception as e:
         print(f"Warning: Phoenix tracing failed to initialize: {e}")
         # Return no-op tracer
         return trace.NoOpTracer()
 
-tracer = _init_tracer()
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_tracer():
+    """Get the shared tracer, importing and registering the Phoenix stack on first use"""
+    if PHOENIX_TRACING == "off":
+        return trace.NoOpTracer()
+    return _init_tracer()
+
+def init_tracing_in_background():
+    """Set up tracing off the startup path; LLM calls made before it finishes are not traced"""
+    if PHOENIX_TRACING == "deferred":
+        threading.Thread(target=get_tracer, name="phoenix-tracing", daemon=True).start()
+
+if PHOENIX_TRACING == "eager":
+    get_tracer()
+
+def __getattr__(name):
+    # `from tracing import tracer` keeps working, but only pays for Phoenix when asked
+    if name == "tracer":
+        return get_tracer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Query Log
+Append-only JSON-lines record of what users ask: normalized query, filters,
+result IDs and stage timings. Requests only enqueue an entry; a background
+thread does the writing.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from functools import lru_cache
+from typing import Dict, Iterator, Optional
+
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from rag.query_cache import normalize_query
+
+# JSON-lines file shared by the API and UI processes; empty disables logging
+QUERY_LOG_PATH = os.getenv('QUERY_LOG_PATH', 'data/query_log.jsonl')
+# Entries waiting to be written; beyond this they are dropped rather than slowing requests
+QUERY_LOG_QUEUE = int(os.getenv('QUERY_LOG_QUEUE', '10000'))
+
+
+class QueryLog:
+    """Non-blocking writer appending one JSON line per query"""
+
+    def __init__(self, path: str, max_queue: int = QUERY_LOG_QUEUE):
+        self.path = path
+        self.dropped = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # O_APPEND with one write per batch keeps lines from several worker processes intact
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name='query-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, query: str, filters: Optional[Dict], results: list, timings: Dict[str, float],
+               source: str, limit: int) -> None:
+        """Enqueue one query; never blocks
+
+        Args:
+            query: The user's query (only its normalized form is logged)
+            filters: Filters used for the search
+            results: Retrieved trails (ScoredPoints)
+            timings: Stage durations in seconds
+            source: 'api', 'batch' or 'ui'
+            limit: Trails the answer was generated from
+        """
+        entry = {
+            'ts': round(time.time(), 3),
+            'query': normalize_query(query),
+            'filters': filters or {},
+            'result_ids': [str(point.id) for point in results],
+            'timings_ms': {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+            'source': source,
+            'limit': limit,
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            entries = [self._queue.get()]
+            # Write everything that is already waiting in one go
+            while not self._queue.empty():
+                entries.append(self._queue.get_nowait())
+            done = None in entries
+            lines = ''.join(json.dumps(entry) + '\n' for entry in entries if entry is not None)
+            if lines:
+                try:
+                    os.write(self._fd, lines.encode())
+                except OSError as e:
+                    print(f"   Warning: query log write failed ({e})")
+            if done:
+                return
+
+    def close(self) -> None:
+        """Write what is queued and stop the writer"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            os.close(self._fd)
+
+
+@lru_cache(maxsize=None)
+def get_query_log(path: str = QUERY_LOG_PATH) -> Optional[QueryLog]:
+    """Shared log for a path, or None when logging is disabled or the path isn't writable"""
+    if not path:
+        return None
+    try:
+        return QueryLog(path)
+    except OSError as e:
+        print(f"   Warning: query log disabled ({e})")
+        return None
+
+
+def read_query_log(path: str = QUERY_LOG_PATH, since: float = 0) -> Iterator[Dict]:
+    """Logged entries newer than `since` (a timestamp), skipping malformed lines"""
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get('ts', 0) >= since:
+                yield entry
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Hot Query Cache Warming
+Finds the most asked queries in the query log and pre-populates the parse,
+embedding and answer caches, so those requests are served without LLM calls.
+Run nightly (or at API startup with WARM_CACHE_ON_STARTUP=1).
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+# Suppress HuggingFace warnings
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from analytics.query_log import QUERY_LOG_PATH, read_query_log
+from rag.vector_search import TrailVectorDB, MODEL_NAME
+from rag.model_artifacts import model_options
+from rag.generate_recommendations import cached_trail_recommendation, recommendation_answer_version
+from llm.client import llm_function
+
+# Queries warmed per run, how far back the log is read, and how often a query must appear
+HOT_QUERY_TOP_N = int(os.getenv('HOT_QUERY_TOP_N', '50'))
+HOT_QUERY_DAYS = float(os.getenv('HOT_QUERY_DAYS', '7'))
+HOT_QUERY_MIN_COUNT = int(os.getenv('HOT_QUERY_MIN_COUNT', '2'))
+
+# Follow-ups depend on their conversation, so their answers can't be reused
+WARMABLE_SOURCES = {'api', 'batch', 'ui'}
+
+
+def hot_queries(entries: Iterable[Dict], top_n: int = HOT_QUERY_TOP_N,
+                min_count: int = HOT_QUERY_MIN_COUNT) -> List[Tuple[str, int, int]]:
+    """(normalized query, answer result limit, count) of the most asked queries, most asked first"""
+    counts = Counter(
+        (entry['query'], entry.get('limit', 5))
+        for entry in entries if entry.get('query') and entry.get('source') in WARMABLE_SOURCES
+    )
+    return [(query, limit, count) for (query, limit), count in counts.most_common(top_n) if count >= min_count]
+
+
+def warm_query_vectors(vector_db: TrailVectorDB, queries: List[str], embed_in_process: bool = True) -> int:
+    """Cache the query vectors not cached yet; returns how many were added.
+
+    The embedding service caches vectors as a side effect of embedding them. Qdrant's in-process
+    model doesn't expose its vectors, so without the service the model is loaded here
+    (unless embed_in_process is off, e.g. inside the API process).
+    """
+    cache = vector_db.query_cache
+    missing = [query for query in dict.fromkeys(queries) if cache.get('embedding', query, MODEL_NAME) is None]
+    if not missing:
+        return 0
+    if vector_db.embedder is not None:
+        vector_db.embed_texts(missing, is_query=True)
+    elif embed_in_process:
+        from fastembed import TextEmbedding
+
+        model = TextEmbedding(MODEL_NAME, **model_options())
+        for query, vector in zip(missing, model.query_embed(missing)):
+            cache.put('embedding', query, vector.tolist(), MODEL_NAME)
+    else:
+        return 0
+    return sum(cache.get('embedding', query, MODEL_NAME) is not None for query in missing)
+
+
+def warm_cache(vector_db: TrailVectorDB = None, log_path: str = QUERY_LOG_PATH, top_n: int = HOT_QUERY_TOP_N,
+               days: float = HOT_QUERY_DAYS, min_count: int = HOT_QUERY_MIN_COUNT,
+               embed_in_process: bool = True) -> Dict[str, int]:
+    """Pre-populate the query cache for the hot queries of the last `days` days
+
+    Returns:
+        Counts of hot queries, vectors added, answers generated or already cached, queries without
+        results and failures
+    """
+    vector_db = vector_db or TrailVectorDB()
+    counts = {'hot_queries': 0, 'embedded': 0, 'generated': 0, 'already_cached': 0, 'no_results': 0, 'failed': 0}
+    if vector_db.query_cache is None:
+        print("⚠️  Query cache disabled (QUERY_CACHE_PATH is empty), nothing to warm")
+        return counts
+    if not log_path or not os.path.exists(log_path):
+        print(f"⚠️  No query log at {log_path!r}, nothing to warm")
+        return counts
+
+    hot = hot_queries(read_query_log(log_path, since=time.time() - days * 86400), top_n, min_count)
+    counts['hot_queries'] = len(hot)
+    counts['embedded'] = warm_query_vectors(vector_db, [query for query, _, _ in hot], embed_in_process)
+
+    for query, limit, _ in hot:
+        try:
+            # Caches the parsed filters; the answer is cached per retrieved trails
+            search_results = vector_db.search_trails(query, limit=limit)
+            if not search_results:
+                counts['no_results'] += 1
+            elif vector_db.query_cache.get('answer', query, recommendation_answer_version(search_results)) is not None:
+                counts['already_cached'] += 1
+            else:
+                "".join(cached_trail_recommendation(query, search_results, llm_function, vector_db.query_cache))
+                counts['generated'] += 1
+        except Exception as e:
+            print(f"   ❌ {query!r}: {e}")
+            counts['failed'] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-populate the query cache with the most asked queries")
+    parser.add_argument("--log", default=QUERY_LOG_PATH, help="Query log to read")
+    parser.add_argument("--top", type=int, default=HOT_QUERY_TOP_N, help="Hot queries to warm")
+    parser.add_argument("--days", type=float, default=HOT_QUERY_DAYS, help="Only count queries this recent")
+    parser.add_argument("--min-count", type=int, default=HOT_QUERY_MIN_COUNT, help="Times a query must appear")
+    parser.add_argument("--show", action="store_true", help="List the hot queries without warming")
+    args = parser.parse_args()
+
+    print("🔥 Hot Query Cache Warming")
+    print("=" * 50)
+    if args.show:
+        entries = read_query_log(args.log, since=time.time() - args.days * 86400)
+        for query, limit, count in hot_queries(entries, args.top, args.min_count):
+            print(f"   {count:>5}  {query}  (top {limit})")
+        return 0
+
+    start = time.perf_counter()
+    counts = warm_cache(log_path=args.log, top_n=args.top, days=args.days, min_count=args.min_count)
+    print(f"\n✅ Warmed {counts['hot_queries']} hot queries in {time.perf_counter() - start:.1f}s")
+    for name, value in counts.items():
+        print(f"   {name}: {value}")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Record/replay cassette store for LLM calls
+Lets evaluation and load-test runs reuse recorded responses offline
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_CASSETTE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'evaluation', 'cassettes')
+
+# off:    always call the API (default)
+# record: always call the API and overwrite the stored response
+# replay: only serve stored responses, fail on a cassette miss
+# auto:   serve stored responses, record the ones that are missing
+CASSETTE_MODES = ("off", "record", "replay", "auto")
+
+
+class CassetteMissError(KeyError):
+    """Raised in replay mode when no recorded response matches a request"""
+
+
+class CassetteStore:
+    """Local store of LLM responses keyed by request fingerprint"""
+
+    def __init__(self, directory: str = DEFAULT_CASSETTE_DIR, mode: str = "auto", latency_scale: float = 0.0):
+        """
+        Args:
+            directory: Folder where cassette files are written
+            mode: One of CASSETTE_MODES
+            latency_scale: Multiplier applied to recorded timings on replay
+                (0 replays instantly, 1.0 reproduces the recorded latency)
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {CASSETTE_MODES}")
+        self.directory = directory
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["CassetteStore"]:
+        """Build a store from LLM_CASSETTE_* variables, or None when disabled"""
+        mode = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+        if mode == "off":
+            return None
+        return cls(
+            directory=os.getenv("LLM_CASSETTE_DIR", DEFAULT_CASSETTE_DIR),
+            mode=mode,
+            latency_scale=float(os.getenv("LLM_CASSETTE_LATENCY", "0")),
+        )
+
+    @staticmethod
+    def fingerprint(model: str, messages: List[Dict], stream: bool) -> str:
+        """Stable hash of everything that determines the response"""
+        request = json.dumps({"model": model, "messages": messages, "stream": stream}, sort_keys=True)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def load(self, key: str) -> Optional[Dict]:
+        """Return the recorded entry for a fingerprint, if any"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, key: str, entry: Dict) -> None:
+        """Atomically write an entry so concurrent runs never see partial files"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        with self._lock:
+            os.replace(tmp_path, path)
+
+    def call(self, model: str, messages: List[Dict], stream: bool, live_call: Callable):
+        """
+        Serve a request from the cassette or from live_call, depending on the mode
+
+        Args:
+            model: Model name sent to the API
+            messages: Chat messages sent to the API
+            stream: Whether the caller expects a chunk generator
+            live_call: Zero-argument function performing the real request and
+                returning a string (stream=False) or a chunk generator (stream=True)
+
+        Returns:
+            LLM response (string if not streaming, generator if streaming)
+        """
+        key = self.fingerprint(model, messages, stream)
+
+        if self.mode in ("replay", "auto"):
+            entry = self.load(key)
+            if entry is not None:
+                return self._replay_stream(entry) if stream else self._replay_response(entry)
+            if self.mode == "replay":
+                raise CassetteMissError(f"No cassette recorded for request {key[:12]} (LLM_CASSETTE_MODE=replay)")
+
+        request = {"model": model, "messages": messages, "stream": stream}
+        if stream:
+            return self._record_stream(key, request, live_call)
+
+        start = time.perf_counter()
+        content = live_call()
+        self.save(key, {"request": request, "content": content, "elapsed": time.perf_counter() - start})
+        return content
+
+    def _sleep(self, seconds: float) -> None:
+        if self.latency_scale > 0 and seconds > 0:
+            time.sleep(seconds * self.latency_scale)
+
+    def _replay_response(self, entry: Dict) -> str:
+        self._sleep(entry.get("elapsed", 0.0))
+        return entry["content"]
+
+    def _replay_stream(self, entry: Dict):
+        previous = 0.0
+        for chunk in entry["chunks"]:
+            self._sleep(chunk["t"] - previous)
+            previous = chunk["t"]
+            yield chunk["content"]
+
+    def _record_stream(self, key: str, request: Dict, live_call: Callable):
+        start = time.perf_counter()
+        chunks = []
+        for content in live_call():
+            chunks.append({"t": time.perf_counter() - start, "content": content})
+            yield content
+        # Only reached when the stream was fully consumed, so partial answers are never stored
+        self.save(key, {"request": request, "chunks": chunks, "elapsed": time.perf_counter() - start})
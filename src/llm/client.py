@@ -6,15 +6,38 @@ Simple LLM client for query parsing
 import os
 import sys
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Load environment variables
 load_dotenv()
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from llm.cassette import CassetteStore
+
 # Tracing imports removed for now
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+MODEL = "gpt-5-mini"
+
+# OpenAI client is created on first live call so cassette replays work without an API key
+_client = None
+
+# Record/replay store, enabled with LLM_CASSETTE_MODE (see llm/cassette.py)
+cassette = CassetteStore.from_env()
+
+
+def get_client() -> "OpenAI":
+    """Get the shared OpenAI client, creating it if it doesn't exist"""
+    global _client
+    if _client is None:
+        # Imported here: the openai package is slow to import and cassette replays never need it
+        from openai import OpenAI
+
+        # OPENAI_BASE_URL points the client at any OpenAI-compatible server,
+        # e.g. the local stub in llm/stub_server.py, which needs no real key
+        base_url = os.getenv("OPENAI_BASE_URL") or None
+        api_key = os.getenv("OPENAI_API_KEY") or ("stub" if base_url else None)
+        _client = OpenAI(api_key=api_key, base_url=base_url)
+    return _client
+
 
 # Note: GPT-5-mini is fixed-temperature model that only runs at temperature=1
 def llm_function(user_prompt: str, system_prompt: str, stream: bool = False):
@@ -31,12 +54,21 @@ def llm_function(user_prompt: str, system_prompt: str, stream: bool = False):
     Returns:
         LLM response (string if not streaming, generator if streaming)
     """
-    response = client.chat.completions.create(
-        model="gpt-5-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+    if cassette is not None:
+        return cassette.call(MODEL, messages, stream, lambda: _create_completion(messages, stream))
+    return _create_completion(messages, stream)
+
+
+def _create_completion(messages: list, stream: bool):
+    """Send the chat completion request to OpenAI"""
+    response = get_client().chat.completions.create(
+        model=MODEL,
+        messages=messages,
         stream=stream
     )
     
@@ -49,4 +81,4 @@ def llm_function(user_prompt: str, system_prompt: str, stream: bool = False):
         return stream_generator()
     else:
         # Return complete response for non-streaming
-        return response.choices[0].message.content.strip()
\ No newline at end of file
+        return response.choices[0].message.content.strip()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+OpenAI-compatible stub LLM server for load testing
+Speaks the chat-completions API used by llm_function, including streaming,
+with configurable time-to-first-token, tokens/sec and error rate
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+from flask import Flask, Response, request, jsonify, stream_with_context
+
+DEFAULT_PARSER_JSON = '{"difficulty":"Easy","dog_friendly":true}'
+
+DEFAULT_ANSWER = (
+    "For an easy outing with your dog, Lighthouse Park is a great pick. "
+    "The loop takes about an hour and a half through old growth forest and ends at rocky viewpoints over the water. "
+    "Trails are well marked and mostly gentle, so it works well for families. "
+    "Dogs are welcome on leash, so bring water and a towel for muddy sections after rain. "
+    "Parking fills up quickly on sunny weekends, so arrive early or take the bus from downtown. "
+    "If you want something a little longer, the nearby Cypress Falls trail adds waterfalls and a bit more elevation. "
+    "Enjoy your hike!"
+)
+
+DEFAULT_JUDGE_ANSWER = "The answer addresses the request with relevant trails and practical details.\nTotal rating: 4"
+
+
+def load_config_from_env() -> dict:
+    """Read stub behaviour from LLM_STUB_* environment variables"""
+    return {
+        "ttft": float(os.getenv("LLM_STUB_TTFT", "0.3")),
+        "tokens_per_sec": float(os.getenv("LLM_STUB_TOKENS_PER_SEC", "50")),
+        "error_rate": float(os.getenv("LLM_STUB_ERROR_RATE", "0")),
+        "parser_json": os.getenv("LLM_STUB_PARSER_JSON", DEFAULT_PARSER_JSON),
+        "answer": os.getenv("LLM_STUB_ANSWER", DEFAULT_ANSWER),
+    }
+
+
+def _tokenize(text: str) -> list:
+    """Split text into word-sized pieces that re-join to the original text"""
+    words = text.split(" ")
+    return [word + " " for word in words[:-1]] + [words[-1]]
+
+
+def _pick_content(messages: list, config: dict) -> str:
+    """Choose a canned response based on which prompt is calling"""
+    system_prompt = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    if system_prompt.startswith("You are a query parser"):
+        return config["parser_json"]
+    if system_prompt.startswith("You are an expert evaluator"):
+        return DEFAULT_JUDGE_ANSWER
+    return config["answer"]
+
+
+def create_app(config: dict = None) -> Flask:
+    """Create the stub server app"""
+    config = {**load_config_from_env(), **(config or {})}
+    app = Flask(__name__)
+
+    @app.route('/health')
+    def health():
+        return {'status': 'healthy', 'service': 'VanTrails LLM stub'}
+
+    @app.route('/v1/models')
+    def list_models():
+        return jsonify({"object": "list", "data": [{"id": "gpt-5-mini", "object": "model", "owned_by": "stub"}]})
+
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        body = request.get_json(force=True)
+        model = body.get("model", "gpt-5-mini")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if random.random() < config["error_rate"]:
+            time.sleep(config["ttft"])
+            return jsonify({"error": {
+                "message": "Stub server injected error",
+                "type": "server_error",
+                "code": "stub_error"
+            }}), 500
+
+        tokens = _tokenize(_pick_content(body.get("messages", []), config))
+        token_delay = 1.0 / config["tokens_per_sec"] if config["tokens_per_sec"] > 0 else 0.0
+
+        if not body.get("stream"):
+            time.sleep(config["ttft"] + token_delay * max(len(tokens) - 1, 0))
+            return jsonify({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}
+            })
+
+        def chunk(delta: dict, finish_reason=None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        def event_stream():
+            time.sleep(config["ttft"])
+            yield chunk({"role": "assistant", "content": ""})
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(token_delay)
+                yield chunk({"content": token})
+            yield chunk({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return Response(stream_with_context(event_stream()), mimetype='text/event-stream')
+
+    return app
+
+
+def main():
+    defaults = load_config_from_env()
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("LLM_STUB_PORT", "8089")))
+    parser.add_argument("--ttft", type=float, default=defaults["ttft"], help="Seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=defaults["tokens_per_sec"], help="Generation speed after the first token")
+    parser.add_argument("--error-rate", type=float, default=defaults["error_rate"], help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--parser-json", default=defaults["parser_json"], help="Canned JSON returned to the query parser")
+    args = parser.parse_args()
+
+    app = create_app({
+        "ttft": args.ttft,
+        "tokens_per_sec": args.tokens_per_sec,
+        "error_rate": args.error_rate,
+        "parser_json": args.parser_json,
+    })
+
+    print("Starting VanTrails LLM stub...")
+    print(f"Point the app at it with OPENAI_BASE_URL=http://localhost:{args.port}/v1")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,98 +4,205 @@ Data Cleaning Script for Vancouver Trails
 Cleans the raw scraped data for use in the RAG application
 """
 
+import os
+import sys
 import pandas as pd
-import re
+from typing import List, Optional, Tuple
 
-def clean_vancouver_trails_data(input_file: str = "../../data/vancouver_trails.csv", 
-                               output_file: str = "../../data/vancouver_trails_clean.csv"):
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from processing.trail_store import (
+    RAW_TRAIL_SCHEMA, CLEAN_TRAIL_SCHEMA, read_trails, iter_trail_batches, write_trails, append_trails, migrate_csv
+)
+
+# First number in strings like "1.5 hours", "1.5 - 2 hours", "4km", "up to 15km"
+FIRST_NUMBER = r'(\d+\.?\d*)'
+
+BOOLEAN_VALUES = {'true': True, 'false': False, '1': True, '0': False}
+
+# Cleaned dataset schema. Ranges match the ones the query parser prompt advertises,
+# so every stored trail can be reached by some filter.
+TRAIL_SCHEMA = {
+    'name':            {'dtype': 'string', 'required': True},
+    'rating':          {'dtype': 'Float64', 'range': (0.0, 5.0)},
+    'region':          {'dtype': 'string', 'required': True},
+    'difficulty':      {'dtype': 'string', 'required': True, 'allowed': ('Easy', 'Intermediate', 'Difficult')},
+    'time':            {'dtype': 'Float64', 'range': (0.25, 12.0)},
+    'distance':        {'dtype': 'Float64', 'range': (0.5, 30.0)},
+    'season':          {'dtype': 'string'},
+    'dog_friendly':    {'dtype': 'boolean', 'required': True},
+    'no_dogs_allowed': {'dtype': 'boolean', 'required': True},
+    'public_transit':  {'dtype': 'boolean', 'required': True},
+    'camping':         {'dtype': 'boolean', 'required': True},
+    'url':             {'dtype': 'string', 'required': True},
+    'description':     {'dtype': 'string'},
+}
+
+def _on_uniques(series: pd.Series, transform, dtype: str) -> pd.Series:
+    """Apply a vectorized transform to the distinct values only and broadcast the result back.
+
+    Raw time/distance/flag columns have a few hundred distinct values at most, so this keeps
+    the string work constant while the row count grows.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    values = transform(pd.Series(uniques, dtype=object).astype('string')).astype(dtype).array
+    result = values.take(codes, allow_fill=True)
+    return pd.Series(result, index=series.index, name=series.name)
+
+def extract_number(series: pd.Series) -> pd.Series:
+    """Vectorized first-number extraction ("1.5 - 2 hours" -> 1.5, "4km" -> 4.0)."""
+    return _on_uniques(
+        series,
+        lambda values: pd.to_numeric(values.str.extract(FIRST_NUMBER, expand=False), errors='coerce'),
+        'Float64'
+    )
+
+def clean_time(series: pd.Series) -> pd.Series:
+    """Convert "X hours" (or a range like "1.5 - 2 hours", first number wins) to float hours."""
+    return extract_number(series)
+
+def clean_distance(series: pd.Series) -> pd.Series:
+    """Convert "Xkm" to float km."""
+    return extract_number(series)
+
+def clean_boolean(series: pd.Series) -> pd.Series:
+    """Map True/False (bools or strings, any case) to a nullable boolean; anything else becomes NA."""
+    return _on_uniques(series, lambda values: values.str.strip().str.lower().map(BOOLEAN_VALUES), 'boolean')
+
+def clean_trails_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert raw scraped rows to the typed TRAIL_SCHEMA columns (unparseable values become NA)."""
+    df = df.copy()
+    df['rating'] = pd.to_numeric(df['rating'], errors='coerce').astype('Float64').round(1)
+    df['time'] = clean_time(df['time'])
+    df['distance'] = clean_distance(df['distance'])
+    for column, spec in TRAIL_SCHEMA.items():
+        if column not in df.columns:
+            df[column] = pd.Series(pd.NA, index=df.index, dtype=spec['dtype'])
+        elif spec['dtype'] == 'boolean':
+            df[column] = clean_boolean(df[column])
+        elif spec['dtype'] == 'string':
+            df[column] = df[column].astype('string')
+    return df
+
+def validate_trails(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Split cleaned rows into (valid, rejected); rejected rows get a `reason` column."""
+    reasons = pd.Series('', index=df.index, dtype='string')
+    for column, spec in TRAIL_SCHEMA.items():
+        values = df[column]
+        if spec.get('required'):
+            missing = values.isna()
+            if spec['dtype'] == 'string':
+                missing |= values.fillna('').eq('')
+            reasons = reasons.mask(missing, reasons + f"{column} missing;")
+        if 'allowed' in spec:
+            bad = values.notna() & ~values.isin(spec['allowed'])
+            reasons = reasons.mask(bad, reasons + f"{column} not in {'/'.join(spec['allowed'])};")
+        if 'range' in spec:
+            low, high = spec['range']
+            bad = values.notna() & ((values < low) | (values > high))
+            reasons = reasons.mask(bad.fillna(False), reasons + f"{column} outside {low}-{high};")
+
+    rejected_mask = reasons.ne('')
+    rejected = df[rejected_mask].assign(reason=reasons[rejected_mask].str.rstrip(';'))
+    return df[~rejected_mask], rejected
+
+def clean_vancouver_trails_data(input_file: str = "../../data/vancouver_trails.parquet",
+                               output_file: str = "../../data/vancouver_trails_clean.parquet",
+                               rejected_file: Optional[str] = "../../data/vancouver_trails_rejected.csv",
+                               chunksize: Optional[int] = None,
+                               export_csv: Optional[str] = "../../data/vancouver_trails_clean.csv",
+                               partition_by: Optional[List[str]] = None):
     """
     Clean the Vancouver trails dataset.
-    
+
     Transformations:
     1. Round rating to 1 decimal place
     2. Convert time from "X hours" to float hours
     3. Convert distance from "Xkm" to float km
+    4. Parse feature flags to booleans
+    5. Validate against TRAIL_SCHEMA; rows that fail go to rejected_file with a reason
+
+    With chunksize set, the input is streamed in chunks and the output appended
+    chunk by chunk, so memory stays flat for very large files.
+
+    Input and output may be Parquet datasets or CSV files (by extension); export_csv
+    additionally writes the cleaned data as CSV.
     """
-    
+
     print("🧹 Cleaning Data")
     print("=" * 40)
-    
-    # Load the data
-    df = pd.read_csv(input_file)
-    print(f"📊 Loaded {len(df)} trails")
-    
-    # 1. Round rating to 1 decimal place
-    df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
-    df['rating'] = df['rating'].round(1)
+
+    # Load the data (as one chunk unless chunksize is set)
+    chunks = iter_trail_batches(input_file, chunksize) if chunksize else [read_trails(input_file)]
+
+    valid_parts, rejected_parts = [], []
+    total = 0
+    for i, chunk in enumerate(chunks):
+        total += len(chunk)
+        valid, rejected = validate_trails(clean_trails_dataframe(chunk))
+        valid = valid[list(TRAIL_SCHEMA)]
+        # Streaming mode writes each chunk straight away; otherwise keep it for the summary
+        if chunksize:
+            save = write_trails if i == 0 else append_trails
+            save(valid, output_file, CLEAN_TRAIL_SCHEMA, partition_by)
+            if export_csv:
+                save(valid, export_csv)
+        valid_parts.append(valid if not chunksize else valid[['rating', 'time', 'distance']])
+        rejected_parts.append(rejected)
+
+    df = pd.concat(valid_parts, ignore_index=True)
+    rejected = pd.concat(rejected_parts, ignore_index=True)
+    print(f"📊 Loaded {total} trails")
     print("✅ Rounded ratings to 1 decimal place")
-    
-    # 2. Clean time column - extract hours and convert to float
-    def clean_time(time_str):
-        if pd.isna(time_str):
-            return None
-        
-        # Convert to string
-        time_str = str(time_str).lower()
-        
-        # Handle ranges like "1.5 - 2 hours" - take the first number
-        if '-' in time_str:
-            time_str = time_str.split('-')[0].strip()
-        
-        # Extract first number from strings like "1.5 hours", "3 hours", "1 hour"
-        match = re.search(r'(\d+\.?\d*)', time_str)
-        if match:
-            return float(match.group(1))
-        
-        return None
-    
-    df['time'] = df['time'].apply(clean_time)
     print("✅ Converted time to hours (numeric)")
-    
-    # 3. Clean distance column - extract km and convert to float
-    def clean_distance(distance_str):
-        if pd.isna(distance_str):
-            return None
-            
-        # Convert to string
-        distance_str = str(distance_str).lower()
-        
-        # Extract first number from strings like "4km", "7.5km"
-        match = re.search(r'(\d+\.?\d*)', distance_str)
-        if match:
-            return float(match.group(1))
-        
-        return None
-    
-    df['distance'] = df['distance'].apply(clean_distance)
     print("✅ Converted distance to km (numeric)")
-    
+    print(f"✅ Validated against schema: {len(df)} valid, {len(rejected)} rejected")
+
     # Show cleaning results
     print(f"\n📈 Cleaning Results:")
     print(f"   Rating range: {df['rating'].min():.1f} - {df['rating'].max():.1f}")
     print(f"   Time range: {df['time'].min():.1f} - {df['time'].max():.1f} hours")
     print(f"   Distance range: {df['distance'].min():.1f} - {df['distance'].max():.1f} km")
-    
+
     # Count missing values
     missing_time = df['time'].isna().sum()
     missing_distance = df['distance'].isna().sum()
     print(f"   Missing time values: {missing_time}")
     print(f"   Missing distance values: {missing_distance}")
-    
+
+    # Rejected rows report
+    if len(rejected):
+        print(f"\n⚠️  Rejected rows by reason:")
+        for reason, count in rejected['reason'].value_counts().items():
+            print(f"   {count:>5}  {reason}")
+    if rejected_file:
+        if len(rejected):
+            rejected.to_csv(rejected_file, index=False)
+            print(f"   Rejected rows saved to: {rejected_file}")
+        elif os.path.exists(rejected_file):
+            os.remove(rejected_file)
+
     # Save cleaned data
-    df.to_csv(output_file, index=False)
+    if not chunksize:
+        write_trails(df, output_file, CLEAN_TRAIL_SCHEMA, partition_by)
+        if export_csv:
+            write_trails(df, export_csv)
     print(f"\n💾 Saved cleaned data to: {output_file}")
-    
+    if export_csv:
+        print(f"   Exported CSV to: {export_csv}")
+
     # Show sample of cleaned data
-    print(f"\n🎯 Sample cleaned data:")
-    sample_cols = ['name', 'rating', 'time', 'distance', 'difficulty']
-    print(df[sample_cols].head(3).to_string(index=False))
-    
+    if not chunksize:
+        print(f"\n🎯 Sample cleaned data:")
+        sample_cols = ['name', 'rating', 'time', 'distance', 'difficulty']
+        print(df[sample_cols].head(3).to_string(index=False))
+
     return df
 
 def main():
+    # First run after upgrading: build the Parquet dataset from the existing CSV
+    migrate_csv("../../data/vancouver_trails.csv", "../../data/vancouver_trails.parquet", RAW_TRAIL_SCHEMA)
     clean_vancouver_trails_data()
     print(f"\n✅ Data cleaning complete! Ready for RAG application.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
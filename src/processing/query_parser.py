@@ -8,12 +8,20 @@ import json
 import re
 import sys
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 
 # Add parent directory to path to import llm client
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from llm.client import llm_function
+
+# Values of the trail `region` field; region hints outside this list are dropped
+REGIONS = [
+    "The North Shore", "Fraser Valley East", "Howe Sound", "Whistler", "Tri Cities", "Southern Gulf Islands",
+    "Sunshine Coast", "Vancouver City", "Ridge Meadows", "Surrey and Langley", "Pemberton",
+    "Tsawwassen and Delta", "Manning Provincial Park",
+]
+
 @dataclass
 class TrailFilters:
     """Structured filters for trail search"""
@@ -27,6 +35,7 @@ class TrailFilters:
     dog_friendly: Optional[bool] = None
     public_transit: Optional[bool] = None
     camping: Optional[bool] = None
+    regions: Optional[List[str]] = None  # region hints, also used to route the search
 
 class QueryParser:
     """Extract structured filters from natural language queries"""
@@ -47,6 +56,8 @@ Available Filters:
 - dog_friendly: true/false (boolean)
 - public_transit: true/false (boolean)
 - camping: true/false (boolean)
+- regions: list of regions, ONLY when the query names a place or area. Use these exact names:
+  """ + ", ".join(f'"{region}"' for region in REGIONS) + """
 
 The output dictionary keys should be in this order:
 1. rating_min/rating_max
@@ -56,6 +67,7 @@ The output dictionary keys should be in this order:
 5. dog_friendly
 6. public_transit
 7. camping
+8. regions
 
 Example Query Mappings (not exhaustive):
 - "family friendly" → difficulty: "Easy"
@@ -65,6 +77,11 @@ Example Query Mappings (not exhaustive):
 - "camping" → camping: true
 - "short hike" → time_max: 2.0
 - "long hike" → time_max: null (no limit)
+- "near Squamish" → regions: ["Howe Sound"]
+- "in the Sea to Sky area" → regions: ["Howe Sound", "Whistler", "Pemberton"]
+- "North Van or West Van" → regions: ["The North Shore"]
+- "around Coquitlam or Port Moody" → regions: ["Tri Cities"]
+- "Chilliwack" → regions: ["Fraser Valley East"]
 
 IMPORTANT: 
 - Return ONLY valid JSON with extracted filters
@@ -95,13 +112,14 @@ Extract filters from this query: {user_query}
             return json_match.group(0)
         return text.strip()
 
-    def parse_query_with_llm(self, query: str, llm_function) -> Dict[str, Any]:
+    def parse_query_with_llm(self, query: str, llm_function, raise_errors: bool = False) -> Dict[str, Any]:
         """
         Parse query using LLM to extract filters
         
         Args:
             query: Natural language query
             llm_function: Function that takes prompt and returns LLM response
+            raise_errors: Raise LLM/JSON errors instead of returning no filters
             
         Returns:
             Dictionary with extracted filters
@@ -119,11 +137,18 @@ Extract filters from this query: {user_query}
 
             # Return dictionary with only non-null values            
             result = {k: v for k, v in filters_dict.items() if v is not None}
+            if 'regions' in result:
+                regions = result.pop('regions')
+                regions = [region for region in regions if region in REGIONS] if isinstance(regions, list) else []
+                if regions:
+                    result['regions'] = regions
             print(f"query_parser result: {result}")
 
             return result
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"parsing failed: {e}")
             return {}  # Return empty dict on failure
 
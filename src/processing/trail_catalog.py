@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+SQLite Trail Catalog
+Authoritative local store of cleaned trails with indexed lookups by URL, ID, name and filters
+"""
+
+import os
+import sys
+import uuid
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from scrapers.changelog import field_hashes, content_hash
+
+TRAIL_CATALOG_PATH = os.getenv('TRAIL_CATALOG_PATH', 'data/trails.db')
+
+COLUMNS = ['id', 'url', 'name', 'rating', 'region', 'difficulty', 'time', 'distance', 'season',
+           'dog_friendly', 'no_dogs_allowed', 'public_transit', 'camping', 'description',
+           'content_hash', 'updated_at', 'indexed_hash']
+FLAG_COLUMNS = ['dog_friendly', 'no_dogs_allowed', 'public_transit', 'camping']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trails (
+    url TEXT PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    rating REAL,
+    region TEXT,
+    difficulty TEXT,
+    time REAL,
+    distance REAL,
+    season TEXT,
+    dog_friendly INTEGER,
+    no_dogs_allowed INTEGER,
+    public_transit INTEGER,
+    camping INTEGER,
+    description TEXT,
+    content_hash TEXT,
+    updated_at TEXT,
+    indexed_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trails_name ON trails(name);
+CREATE INDEX IF NOT EXISTS idx_trails_region ON trails(region);
+CREATE INDEX IF NOT EXISTS idx_trails_difficulty ON trails(difficulty);
+CREATE INDEX IF NOT EXISTS idx_trails_dog_friendly ON trails(dog_friendly);
+CREATE INDEX IF NOT EXISTS idx_trails_public_transit ON trails(public_transit);
+CREATE INDEX IF NOT EXISTS idx_trails_camping ON trails(camping);
+"""
+
+UPSERT = f"""
+INSERT INTO trails ({', '.join(COLUMNS[:-1])})
+VALUES ({', '.join('?' for _ in COLUMNS[:-1])})
+ON CONFLICT(url) DO UPDATE SET
+    {', '.join(f'{column} = excluded.{column}' for column in COLUMNS[2:-1])}
+WHERE trails.content_hash IS NOT excluded.content_hash
+"""
+
+
+def trail_id(url: str) -> str:
+    """Stable trail ID derived from its URL (also used as the Qdrant point ID)"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, url))
+
+
+def _value(value):
+    """Convert pandas/NumPy scalars to plain SQLite values (NaN and pd.NA become NULL)"""
+    if value is None or (isinstance(value, float) and value != value) or type(value).__name__ == 'NAType':
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+class TrailCatalog:
+    """SQLite catalog of trails keyed by URL"""
+
+    def __init__(self, path: str = TRAIL_CATALOG_PATH, read_only: bool = False):
+        """
+        Args:
+            path: SQLite file (created with its schema unless read_only)
+            read_only: Open an existing catalog for lookups only, e.g. from a read-only data mount
+        """
+        self.path = path
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            if path != ':memory:' and os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(SCHEMA)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM trails").fetchone()[0]
+
+    def upsert_trails(self, trails: List[Dict], removed_urls: Iterable[str] = ()) -> int:
+        """Insert or update raw scraped trails and delete removed ones, in a single transaction.
+
+        Values are cleaned with the same rules as the cleaning step. Rows whose content
+        hash is unchanged are left untouched. Returns the number of rows written.
+        """
+        # Cleaning needs pandas; imported here so read-only lookups (the API) stay light
+        import pandas as pd
+        from processing.clean_data import clean_trails_dataframe
+
+        removed_urls = list(removed_urls)
+        trails = [trail for trail in trails if trail.get('url')]
+        rows = []
+        if trails:
+            hashes = [content_hash(field_hashes(trail)) for trail in trails]
+            df = clean_trails_dataframe(pd.DataFrame(trails))
+            now = datetime.now(timezone.utc).isoformat()
+            for (_, row), trail_hash in zip(df.iterrows(), hashes):
+                values = {column: _value(row.get(column)) for column in COLUMNS[2:14]}
+                for column in FLAG_COLUMNS:
+                    values[column] = None if values[column] is None else int(values[column])
+                rows.append((trail_id(row['url']), row['url'], *values.values(), trail_hash, now))
+
+        with self.conn:
+            before = self.conn.total_changes
+            if rows:
+                self.conn.executemany(UPSERT, rows)
+            if removed_urls:
+                self.conn.executemany("DELETE FROM trails WHERE url = ?", [(url,) for url in removed_urls])
+            return self.conn.total_changes - before
+
+    def has_name(self, name: str) -> bool:
+        """Indexed check whether a trail with this name is already catalogued"""
+        return self.conn.execute("SELECT 1 FROM trails WHERE name = ? LIMIT 1", (name,)).fetchone() is not None
+
+    def has_url(self, url: str) -> bool:
+        """Indexed check whether a trail with this URL is catalogued"""
+        return self.conn.execute("SELECT 1 FROM trails WHERE url = ? LIMIT 1", (url,)).fetchone() is not None
+
+    def _row_to_trail(self, row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        trail = dict(row)
+        for column in FLAG_COLUMNS:
+            trail[column] = None if trail[column] is None else bool(trail[column])
+        trail.pop('indexed_hash', None)
+        return trail
+
+    def get_trail(self, trail_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM trails WHERE id = ?", (trail_id,)).fetchone()
+        return self._row_to_trail(row)
+
+    def get_trail_by_url(self, url: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM trails WHERE url = ?", (url,)).fetchone()
+        return self._row_to_trail(row)
+
+    def find_trails(self, limit: int = 50, **filters) -> List[Dict]:
+        """Trails matching exact-value filters on indexed columns, e.g. region="Whistler", camping=True"""
+        indexed = {'region', 'difficulty', *FLAG_COLUMNS}
+        unknown = set(filters) - indexed
+        if unknown:
+            raise ValueError(f"Unsupported catalog filters: {sorted(unknown)}")
+        where = ' AND '.join(f"{column} = ?" for column in filters) or '1'
+        params = [int(value) if isinstance(value, bool) else value for value in filters.values()]
+        rows = self.conn.execute(f"SELECT * FROM trails WHERE {where} ORDER BY name LIMIT ?", (*params, limit))
+        return [self._row_to_trail(row) for row in rows]
+
+    def is_indexed(self, url: str) -> bool:
+        """Indexed check whether a trail has been ingested into the vector index"""
+        row = self.conn.execute("SELECT 1 FROM trails WHERE url = ? AND indexed_hash IS NOT NULL", (url,)).fetchone()
+        return row is not None
+
+    def indexed_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM trails WHERE indexed_hash IS NOT NULL").fetchone()[0]
+
+    def mark_indexed(self, urls: Iterable[str]) -> None:
+        """Record that the current content of these trails is in the vector index (URLs not in
+        the catalog are ignored; callers check the collection for those)"""
+        with self.conn:
+            self.conn.executemany("UPDATE trails SET indexed_hash = content_hash WHERE url = ?", [(url,) for url in urls])
+
+    def clear_indexed(self) -> None:
+        """Forget what is indexed, e.g. after the vector collection was recreated"""
+        with self.conn:
+            self.conn.execute("UPDATE trails SET indexed_hash = NULL")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Trail Dataset Storage
+Typed Parquet datasets for the scraper, cleaner and ingestion; CSV stays as an export format
+"""
+
+import os
+import uuid
+import shutil
+from typing import Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+FLAG_COLUMNS = ['dog_friendly', 'no_dogs_allowed', 'public_transit', 'camping']
+
+# Raw scraper output: values are kept exactly as scraped, plus the change-detection hash
+RAW_TRAIL_SCHEMA = pa.schema(
+    [(column, pa.string()) for column in ['name', 'rating', 'region', 'difficulty', 'time', 'distance', 'season']]
+    + [(column, pa.bool_()) for column in FLAG_COLUMNS]
+    + [('url', pa.string()), ('description', pa.string()), ('content_hash', pa.string())]
+)
+
+# Cleaned dataset, matching processing.clean_data.TRAIL_SCHEMA
+CLEAN_TRAIL_SCHEMA = pa.schema(
+    [('name', pa.string()), ('rating', pa.float64()), ('region', pa.string()), ('difficulty', pa.string()),
+     ('time', pa.float64()), ('distance', pa.float64()), ('season', pa.string())]
+    + [(column, pa.bool_()) for column in FLAG_COLUMNS]
+    + [('url', pa.string()), ('description', pa.string())]
+)
+
+
+def is_csv(path: str) -> bool:
+    return path.lower().endswith('.csv')
+
+
+def trails_exist(path: str) -> bool:
+    return os.path.exists(path)
+
+
+def _partitioning(partition_by: Optional[List[str]]):
+    # Partition values are read back as plain strings, not dictionaries
+    if not partition_by:
+        return None
+    return ds.partitioning(pa.schema([(column, pa.string()) for column in partition_by]), flavor='hive')
+
+
+def _dataset(path: str) -> ds.Dataset:
+    return ds.dataset(path, format='parquet', partitioning='hive')
+
+
+def _to_table(df: pd.DataFrame, schema: Optional[pa.Schema]) -> pa.Table:
+    """Convert to Arrow, conforming to `schema` (missing columns become nulls) when given."""
+    if schema is None:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    df = df.copy()
+    for field in schema:
+        if field.name not in df.columns:
+            df[field.name] = None
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+
+def read_trails(path: str, columns: Optional[List[str]] = None, urls: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Read a trail dataset (Parquet directory or CSV).
+
+    Only `columns` are read, and `urls` is pushed down as a row filter. Parquet data
+    comes back Arrow-backed (pd.ArrowDtype), so the conversion is zero-copy.
+    """
+    if is_csv(path):
+        if columns is not None:
+            header = pd.read_csv(path, nrows=0).columns
+            columns = [column for column in columns if column in header]
+        df = pd.read_csv(path, usecols=columns)
+        return df[df['url'].isin(set(urls))] if urls is not None else df
+
+    dataset = _dataset(path)
+    if columns is not None:
+        columns = [column for column in columns if column in dataset.schema.names]
+    row_filter = ds.field('url').isin(pa.array(list(urls), pa.string())) if urls is not None else None
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def iter_trail_batches(path: str, batch_size: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Stream a trail dataset in batches of at most `batch_size` rows."""
+    if is_csv(path):
+        yield from pd.read_csv(path, usecols=columns, chunksize=batch_size)
+        return
+    for batch in _dataset(path).to_batches(columns=columns, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def write_trails(df: pd.DataFrame, path: str, schema: Optional[pa.Schema] = None,
+                 partition_by: Optional[List[str]] = None) -> None:
+    """Replace the dataset at `path` with `df` (Parquet directory, optionally hive-partitioned, or CSV)."""
+    if is_csv(path):
+        df.to_csv(path, index=False, encoding='utf-8')
+        return
+
+    # Write next to the target and swap, so readers never see a half-written dataset
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+    pq.write_to_dataset(_to_table(df, schema), tmp_path, partitioning=_partitioning(partition_by),
+                        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet")
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+    os.replace(tmp_path, path)
+
+
+def append_trails(df: pd.DataFrame, path: str, schema: Optional[pa.Schema] = None,
+                  partition_by: Optional[List[str]] = None) -> None:
+    """Add rows to a dataset without rewriting it: Parquet gets a new fragment file, CSV gets appended lines."""
+    if not trails_exist(path):
+        write_trails(df, path, schema, partition_by)
+        return
+    if is_csv(path):
+        header = list(pd.read_csv(path, nrows=0).columns)
+        df.reindex(columns=header).to_csv(path, mode='a', header=False, index=False, encoding='utf-8')
+        return
+    pq.write_to_dataset(_to_table(df, schema), path, partitioning=_partitioning(partition_by),
+                        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet")
+
+
+def migrate_csv(csv_path: str, path: str, schema: Optional[pa.Schema] = None,
+                partition_by: Optional[List[str]] = None) -> bool:
+    """Create the Parquet dataset from an existing CSV export if it doesn't exist yet."""
+    if trails_exist(path) or not os.path.exists(csv_path):
+        return False
+    df = pd.read_csv(csv_path, dtype={field.name: 'string' for field in schema if pa.types.is_string(field.type)} if schema else None)
+    write_trails(df, path, schema, partition_by)
+    return True
+
+
+def export_csv(path: str, csv_path: str, exclude: Iterable[str] = ('content_hash',)) -> int:
+    """Write a Parquet dataset out as CSV (without internal columns). Returns the row count."""
+    df = read_trails(path)
+    df = df.drop(columns=[column for column in exclude if column in df.columns])
+    write_trails(df, csv_path)
+    return len(df)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Shared Embedding Service
+One process holds the fastembed model and serves vectors over a Unix socket, so
+workers don't each load their own copy. Concurrent requests are micro-batched.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import socketserver
+from concurrent.futures import Future
+from typing import List
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from rag.model_artifacts import model_options, require_model
+
+load_dotenv()
+
+EMBEDDING_SOCKET = os.getenv('EMBEDDING_SOCKET')
+MODEL_NAME = os.getenv('MODEL_NAME')
+# Texts per model call, and how long to wait for more requests before running a partial batch
+EMBEDDING_MAX_BATCH = int(os.getenv('EMBEDDING_MAX_BATCH', '64'))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv('EMBEDDING_MAX_WAIT_MS', '5'))
+
+
+class MicroBatcher:
+    """Collects embedding requests from many threads and runs them through the model together"""
+
+    def __init__(self, model, max_batch: int = EMBEDDING_MAX_BATCH, max_wait_ms: float = EMBEDDING_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.batches = 0
+        threading.Thread(target=self._run, name='embedding-batcher', daemon=True).start()
+
+    def submit(self, texts: List[str], is_query: bool = False) -> Future:
+        future = Future()
+        self.requests.put((texts, is_query, future))
+        return future
+
+    def _collect(self) -> list:
+        """Block for one request, then take whatever else arrives within max_wait, up to max_batch texts"""
+        pending = [self.requests.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            try:
+                item = self.requests.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            # Queries and passages go through different model entry points
+            for is_query in (False, True):
+                group = [item for item in pending if item[1] == is_query]
+                if not group:
+                    continue
+                texts = [text for item in group for text in item[0]]
+                try:
+                    if is_query:
+                        vectors = [vector.tolist() for vector in self.model.query_embed(query=texts)]
+                    else:
+                        vectors = [vector.tolist() for vector in self.model.embed(documents=texts, batch_size=self.max_batch)]
+                except Exception as e:
+                    for _, _, future in group:
+                        future.set_exception(e)
+                    continue
+                self.batches += 1
+                start = 0
+                for item_texts, _, future in group:
+                    future.set_result(vectors[start:start + len(item_texts)])
+                    start += len(item_texts)
+
+
+class EmbeddingRequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line: {"texts": [...], "is_query": bool} -> {"vectors": [...]} or {"error": "..."}"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                vectors = self.server.batcher.submit(request['texts'], bool(request.get('is_query'))).result()
+                response = {'vectors': vectors}
+            except Exception as e:
+                response = {'error': str(e)}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Every worker thread holds its own connection; the default backlog of 5 refuses bursts
+    request_queue_size = 128
+
+    def __init__(self, socket_path: str, model, max_batch: int = EMBEDDING_MAX_BATCH,
+                 max_wait_ms: float = EMBEDDING_MAX_WAIT_MS):
+        # A socket file left by a previous run would make bind fail
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.batcher = MicroBatcher(model, max_batch, max_wait_ms)
+        super().__init__(socket_path, EmbeddingRequestHandler)
+
+
+class EmbeddingClient:
+    """Client for the embedding service; keeps one connection per thread"""
+
+    def __init__(self, socket_path: str = EMBEDDING_SOCKET, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        if getattr(self._local, 'conn', None) is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.conn = (sock, sock.makefile('rb'))
+        return self._local.conn
+
+    def _close(self):
+        sock, reader = self._local.conn
+        reader.close()
+        sock.close()
+        self._local.conn = None
+
+    def embed(self, texts: List[str], is_query: bool = False) -> List[List[float]]:
+        """Embed texts with the service's model. Raises OSError if the service can't be reached."""
+        message = json.dumps({'texts': list(texts), 'is_query': is_query}).encode('utf-8') + b'\n'
+        for attempt in range(2):
+            try:
+                sock, reader = self._connection()
+                sock.sendall(message)
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError("embedding service closed the connection")
+                break
+            except OSError:
+                if getattr(self._local, 'conn', None) is not None:
+                    self._close()
+                # Retry once on a fresh connection, e.g. after the service restarted
+                if attempt:
+                    raise
+        response = json.loads(line)
+        if 'error' in response:
+            raise RuntimeError(f"Embedding service error: {response['error']}")
+        return response['vectors']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding service over a Unix socket")
+    parser.add_argument("--socket", default=EMBEDDING_SOCKET or "/tmp/vantrails-embedding.sock")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--max-batch", type=int, default=EMBEDDING_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=EMBEDDING_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    from fastembed import TextEmbedding
+
+    require_model(args.model)
+    print(f"🧠 Loading {args.model}")
+    model = TextEmbedding(args.model, **model_options())
+    server = EmbeddingServer(args.socket, model, args.max_batch, args.max_wait_ms)
+    print(f"🚀 Embedding service listening on {args.socket} "
+          f"(batches of up to {args.max_batch}, {args.max_wait_ms} ms window)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Trail Facet Index
+In-memory columnar copy of the filterable payload fields: NumPy arrays for
+numeric fields and bitsets for booleans and categoricals, so filtered counts
+and ranges for GET /api/facets take microseconds instead of a Qdrant scroll
+"""
+
+import os
+import time
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Fields build_qdrant_filter can filter on, by how they are indexed
+NUMERIC_FIELDS = ['rating', 'time', 'distance']
+BOOLEAN_FIELDS = ['dog_friendly', 'no_dogs_allowed', 'public_transit', 'camping']
+CATEGORICAL_FIELDS = ['difficulty', 'region', 'season']
+# Seconds before the index is reloaded from the collection (ingestion in this process reloads it at once)
+FACET_INDEX_TTL = float(os.getenv('FACET_INDEX_TTL', '300'))
+
+
+class FacetIndex:
+    """Filtered counts and ranges over the trail payloads, with the filter semantics of build_qdrant_filter"""
+
+    def __init__(self, payloads: Dict[str, Dict]):
+        """
+        Args:
+            payloads: point ID -> payload (at least the facet fields)
+        """
+        self.size = len(payloads)
+        rows = list(payloads.values())
+        self.numeric = {
+            field: np.array([_number(row.get(field)) for row in rows], dtype=np.float64)
+            for field in NUMERIC_FIELDS
+        }
+        # field -> value -> bitset (one bit per trail, packed into uint64 words)
+        self.bitsets = {}
+        for field in BOOLEAN_FIELDS + CATEGORICAL_FIELDS:
+            values = [row.get(field) for row in rows]
+            self.bitsets[field] = {
+                value: self._pack(np.fromiter((v == value for v in values), dtype=bool, count=self.size))
+                for value in set(values) if value is not None
+            }
+        self._all = self._pack(np.ones(self.size, dtype=bool))
+        self._none = np.zeros_like(self._all)
+
+    def __len__(self):
+        return self.size
+
+    def _pack(self, mask: np.ndarray) -> np.ndarray:
+        """Boolean row mask -> bitset"""
+        packed = np.packbits(mask, bitorder='little')
+        padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+        padded[:len(packed)] = packed
+        return padded.view(np.uint64)
+
+    def _unpack(self, bits: np.ndarray) -> np.ndarray:
+        return np.unpackbits(bits.view(np.uint8), count=self.size, bitorder='little').astype(bool)
+
+    @staticmethod
+    def validate(filters_dict: Dict) -> Optional[str]:
+        """Error message for a filter this index can't evaluate, or None"""
+        for key in filters_dict:
+            field = key[:-4] if key.endswith(('_min', '_max')) else key
+            if field not in NUMERIC_FIELDS and (key != field or field not in BOOLEAN_FIELDS + CATEGORICAL_FIELDS):
+                return f"Unsupported filter: {key}"
+        return None
+
+    def _filter_bits(self, key: str, value) -> np.ndarray:
+        """Bitset of the trails satisfying one filter"""
+        if key.endswith('_min') or key.endswith('_max'):
+            column = self.numeric.get(key[:-4])
+            if column is None:
+                return self._none
+            # NaN (missing) never satisfies a range, as in Qdrant
+            return self._pack(column >= value if key.endswith('_min') else column <= value)
+        if key in self.numeric:
+            return self._pack(self.numeric[key] == value)
+        return self.bitsets.get(key, {}).get(value, self._none)
+
+    def match(self, filters_dict: Dict) -> np.ndarray:
+        """Bitset of the trails matching every filter"""
+        bits = self._all.copy()
+        for key, value in filters_dict.items():
+            bits &= self._filter_bits(key, value)
+        return bits
+
+    def count(self, filters_dict: Dict) -> int:
+        """Number of trails matching the filters"""
+        return int(np.bitwise_count(self.match(filters_dict)).sum())
+
+    def facets(self, filters_dict: Dict) -> Dict[str, Any]:
+        """Matching total, value counts per boolean/categorical field and numeric ranges
+
+        Each field's counts apply every filter except the field's own, so they show how many
+        trails each alternative value would give ("12 Easy, 30 Intermediate").
+        """
+        filter_bits = {key: self._filter_bits(key, value) for key, value in filters_dict.items()}
+        bits = self._all.copy()
+        for key_bits in filter_bits.values():
+            bits &= key_bits
+        counts = {}
+        for field, values in self.bitsets.items():
+            base = bits
+            if field in filter_bits:
+                base = self._all.copy()
+                for key, key_bits in filter_bits.items():
+                    if key != field:
+                        base &= key_bits
+            counts[field] = {
+                str(value).lower() if isinstance(value, bool) else value: int(np.bitwise_count(base & value_bits).sum())
+                for value, value_bits in sorted(values.items(), key=lambda item: str(item[0]))
+            }
+
+        rows = self._unpack(bits)
+        ranges = {}
+        for field, column in self.numeric.items():
+            present = column[rows & ~np.isnan(column)]
+            ranges[field] = (
+                {'min': float(present.min()), 'max': float(present.max())} if len(present)
+                else {'min': None, 'max': None}
+            )
+        return {'total': int(rows.sum()), 'counts': counts, 'ranges': ranges}
+
+
+def _number(value) -> float:
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_facet_index(client, collection: str) -> FacetIndex:
+    """Shared facet index for a collection, loaded from its payloads and refreshed after FACET_INDEX_TTL"""
+    with _lock:
+        cached = _indexes.get(collection)
+        if cached is not None and time.monotonic() - cached[0] < FACET_INDEX_TTL:
+            return cached[1]
+
+    payloads, offset = {}, None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection,
+            limit=1000,
+            offset=offset,
+            with_payload=NUMERIC_FIELDS + BOOLEAN_FIELDS + CATEGORICAL_FIELDS,
+            with_vectors=False
+        )
+        payloads.update((str(point.id), point.payload) for point in points)
+        if offset is None:
+            break
+
+    index = FacetIndex(payloads)
+    with _lock:
+        _indexes[collection] = (time.monotonic(), index)
+    return index
+
+
+def invalidate_facet_index(collection: str) -> None:
+    """Drop the cached index, e.g. after ingestion changed trails"""
+    with _lock:
+        _indexes.pop(collection, None)
@@ -5,31 +5,48 @@ Generate personalized trail recommendations using RAG
 
 import sys
 import os
+import hashlib
 from typing import List, Dict, Any, Callable
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from llm.client import llm_function
+from llm.client import llm_function, MODEL
+from rag.query_cache import answer_version
+from rag.metrics import metrics
 
-def generate_trail_recommendation(user_query: str, search_results: list, llm_function: Callable):
-    """
-    Generate a conversational trail recommendation based on search results
-    
-    Args:
-        user_query: The original user query
-        search_results: List of trail results from vector search
-        llm_function: Function that takes (system_prompt, user_prompt) and returns response
-        
-    Returns:
-        Generator that yields streaming chunks
-    """
-    # Handle empty search results
-    if not search_results:
-        yield "Sorry, I can't find any trails that satisfy all the constraints in your request. You might want to try broadening your criteria and try again."
-        return
-    
-    # Format search results for the prompt
+RECOMMENDATION_SYSTEM_PROMPT = """You are a knowledgeable Vancouver hiking guide who provides helpful trail recommendations."""
+
+RECOMMENDATION_PROMPT = """The user asked: "{user_query}"
+
+I searched our database and found these trails that match their request:
+
+{trails_context}
+
+Please recommend these trails to the user. Guidelines:
+- Write in a friendly, informative tone using plain text only (no markdown formatting)
+- Use natural paragraphs and sentences instead of bullet points or headers
+- Present these as YOUR recommendations to help them with their request
+- Explain why each trail is suitable for their specific needs
+- Mention key details like difficulty, time, distance, and special features
+- Provide practical advice (best seasons, what to bring, parking, etc.)
+- Keep the response comprehensive but not overwhelming (aim for 200-400 words)
+- Start by directly addressing their request, not commenting on their "plan"
+- You can use emojis when necessary to make the response warmer and lighter
+
+Write a recommendation response as if you are suggesting these trails to help with their hiking request."""
+
+# Cached answers are dropped when the prompt changes
+RECOMMENDATION_PROMPT_VERSION = hashlib.sha1(
+    (RECOMMENDATION_SYSTEM_PROMPT + RECOMMENDATION_PROMPT).encode()
+).hexdigest()[:12]
+
+def recommendation_answer_version(search_results: list) -> str:
+    """Answer cache version for an answer generated from these trails with the current prompt and model"""
+    return answer_version((result.id for result in search_results), RECOMMENDATION_PROMPT_VERSION, MODEL)
+
+def format_trails_context(search_results: list) -> str:
+    """Trail details for the prompt, one block per search result"""
     formatted_trails = []
     for i, result in enumerate(search_results, 1):
         trail = result.payload
@@ -49,32 +66,104 @@ Trail {i}: {trail.get('name', 'Unknown')}
         """.strip()
         formatted_trails.append(trail_info)
     
-    trails_context = "\n\n".join(formatted_trails)
-    
-    system_prompt = """You are a knowledgeable Vancouver hiking guide who provides helpful trail recommendations."""
-
-    user_prompt = f"""The user asked: "{user_query}"
-
-I searched our database and found these trails that match their request:
-
-{trails_context}
-
-Please recommend these trails to the user. Guidelines:
-- Write in a friendly, informative tone using plain text only (no markdown formatting)
-- Use natural paragraphs and sentences instead of bullet points or headers
-- Present these as YOUR recommendations to help them with their request
-- Explain why each trail is suitable for their specific needs
-- Mention key details like difficulty, time, distance, and special features
-- Provide practical advice (best seasons, what to bring, parking, etc.)
-- Keep the response comprehensive but not overwhelming (aim for 200-400 words)
-- Start by directly addressing their request, not commenting on their "plan"
-- You can use emojis when necessary to make the response warmer and lighter
+    return "\n\n".join(formatted_trails)
 
-Write a recommendation response as if you are suggesting these trails to help with their hiking request."""
+def generate_trail_recommendation(user_query: str, search_results: list, llm_function: Callable):
+    """
+    Generate a conversational trail recommendation based on search results
+    
+    Args:
+        user_query: The original user query
+        search_results: List of trail results from vector search
+        llm_function: Function that takes (system_prompt, user_prompt) and returns response
+        
+    Returns:
+        Generator that yields streaming chunks
+    """
+    # Handle empty search results
+    if not search_results:
+        yield "Sorry, I can't find any trails that satisfy all the constraints in your request. You might want to try broadening your criteria and try again."
+        return
+    
+    # Format search results for the prompt
+    trails_context = format_trails_context(search_results)
+    
+    system_prompt = RECOMMENDATION_SYSTEM_PROMPT
+    user_prompt = RECOMMENDATION_PROMPT.format(user_query=user_query, trails_context=trails_context)
 
     # Get the streaming response from LLM
     stream = llm_function(user_prompt, system_prompt, stream=True)
     
     # Yield each chunk as it comes
     for chunk in stream:
-        yield chunk
\ No newline at end of file
+        yield chunk
+
+def cached_trail_recommendation(user_query: str, search_results: list, llm_function: Callable, query_cache=None):
+    """
+    generate_trail_recommendation through the answer cache
+
+    A cached answer for the same normalized query and the same retrieved trails is yielded
+    whole; otherwise the answer is generated, streamed and cached once complete.
+
+    Args:
+        user_query: The original user query
+        search_results: List of trail results from vector search
+        llm_function: Function that takes (system_prompt, user_prompt) and returns response
+        query_cache: QueryCache, or None to always generate
+
+    Returns:
+        Generator that yields streaming chunks
+    """
+    if query_cache is None or not search_results:
+        yield from generate_trail_recommendation(user_query, search_results, llm_function)
+        return
+
+    version = recommendation_answer_version(search_results)
+    answer = query_cache.get('answer', user_query, version)
+    if answer is not None:
+        metrics.increment('cache.answer.hit')
+        yield answer
+        return
+
+    metrics.increment('cache.answer.miss')
+    chunks = []
+    for chunk in generate_trail_recommendation(user_query, search_results, llm_function):
+        chunks.append(chunk)
+        yield chunk
+    query_cache.put('answer', user_query, "".join(chunks), version)
+
+def generate_followup_recommendation(followup: str, previous_query: str, previous_answer: str,
+                                     search_results: list, llm_function: Callable):
+    """
+    Short answer to a follow-up in an ongoing conversation, from the refined trail list
+
+    Args:
+        followup: The follow-up message, e.g. "which of those allow dogs?"
+        previous_query: The question that started the conversation
+        previous_answer: The last answer given (only its start is sent, for context)
+        search_results: Refined trails (ScoredPoints with full payloads)
+        llm_function: Function that takes (system_prompt, user_prompt) and returns response
+
+    Returns:
+        Generator that yields streaming chunks
+    """
+    if not search_results:
+        yield "None of the trails we talked about match that. Try asking a new question to search again."
+        return
+
+    system_prompt = """You are a knowledgeable Vancouver hiking guide continuing a conversation about trail recommendations."""
+
+    user_prompt = f"""Earlier the user asked: "{previous_query}"
+You answered (beginning): "{previous_answer[:400]}"
+
+Now they follow up: "{followup}"
+
+These trails from the earlier results fit the follow-up:
+
+{format_trails_context(search_results)}
+
+Answer the follow-up directly in plain text (no markdown), in 60-150 words. Only mention
+what is new or different for these trails; don't repeat the earlier answer."""
+
+    for chunk in llm_function(user_prompt, system_prompt, stream=True):
+        yield chunk
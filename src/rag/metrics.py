@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+In-process Search Metrics
+Thread-safe counters and timings for the search path, exposed by GET /api/metrics
+"""
+
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """Named counters plus total seconds per timed stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._seconds = defaultdict(float)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Count one `name` event and add its duration"""
+        with self._lock:
+            self._counters[name] += 1
+            self._seconds[name] += seconds
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {
+                name: {'count': counters[name], 'mean_ms': round(total / counters[name] * 1000, 2)}
+                for name, total in self._seconds.items() if counters[name]
+            }
+        searches = counters.get('search', 0)
+        return {
+            'counters': counters,
+            'timings': timings,
+            'name_match_rate': round(counters.get('search.name_match', 0) / searches, 4) if searches else 0.0,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._seconds.clear()
+
+
+# Process-wide metrics (each API/UI worker process reports its own)
+metrics = Metrics()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Embedding Model Artifacts
+Downloads the fastembed model once into MODEL_CACHE_DIR with a checksum manifest,
+so containers and air-gapped nodes load it strictly offline from there.
+
+    python src/rag/model_artifacts.py download   # fetch the model and write the manifest
+    python src/rag/model_artifacts.py verify     # re-hash every file against the manifest
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODEL_NAME = os.getenv('MODEL_NAME')
+# Pinned model directory; unset keeps fastembed's default cache and on-demand download
+MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR')
+MANIFEST_FILE = 'manifest.json'
+
+
+class ModelArtifactError(RuntimeError):
+    """Raised when the pinned model artifact is missing or doesn't match its manifest"""
+
+
+def model_options(cache_dir: str = MODEL_CACHE_DIR) -> Dict:
+    """fastembed options: load only from the pinned directory when one is configured"""
+    if not cache_dir:
+        return {}
+    return {'cache_dir': cache_dir, 'local_files_only': True}
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _artifact_files(cache_dir: str) -> Dict[str, str]:
+    """Relative path -> absolute path of every model file (the hub's symlinks point at blobs, hashed once)"""
+    files = {}
+    for root, dirs, names in os.walk(cache_dir):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d != 'tmp']
+        for name in names:
+            path = os.path.join(root, name)
+            if name == MANIFEST_FILE or name.startswith('.') or os.path.islink(path):
+                continue
+            files[os.path.relpath(path, cache_dir)] = path
+    return files
+
+
+def download_model(model_name: str = MODEL_NAME, cache_dir: str = MODEL_CACHE_DIR) -> Dict:
+    """Download the model into cache_dir, check it embeds, and write the manifest"""
+    from fastembed import TextEmbedding
+    import fastembed
+
+    model = TextEmbedding(model_name, cache_dir=cache_dir)
+    dimensions = len(next(iter(model.embed(["trail"]))))
+
+    manifest = {
+        'model': model_name,
+        'fastembed': fastembed.__version__,
+        'dimensions': dimensions,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'files': {
+            relpath: {'sha256': _sha256(path), 'size': os.path.getsize(path)}
+            for relpath, path in sorted(_artifact_files(cache_dir).items())
+        },
+    }
+    with open(os.path.join(cache_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def verify_model(model_name: str = MODEL_NAME, cache_dir: str = MODEL_CACHE_DIR, check_hashes: bool = True) -> Dict:
+    """Check the artifact against its manifest; sizes only unless check_hashes"""
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ModelArtifactError(
+            f"No model artifact in {cache_dir}. Run `python src/rag/model_artifacts.py download` "
+            f"with network access, or unset MODEL_CACHE_DIR to download on first use."
+        )
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest['model'] != model_name:
+        raise ModelArtifactError(f"{cache_dir} holds {manifest['model']}, but MODEL_NAME is {model_name}")
+
+    for relpath, expected in manifest['files'].items():
+        path = os.path.join(cache_dir, relpath)
+        if not os.path.exists(path) or os.path.getsize(path) != expected['size']:
+            raise ModelArtifactError(f"Model file missing or truncated: {path}")
+        if check_hashes and _sha256(path) != expected['sha256']:
+            raise ModelArtifactError(f"Model file checksum mismatch: {path}")
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def require_model(model_name: str = MODEL_NAME, cache_dir: str = MODEL_CACHE_DIR) -> None:
+    """Fail fast at startup if a pinned model directory is configured but incomplete.
+
+    Also switches the Hugging Face hub offline, so nothing waits on the network.
+    """
+    if not cache_dir:
+        return
+    verify_model(model_name, cache_dir, check_hashes=False)
+    os.environ['HF_HUB_OFFLINE'] = '1'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download or verify the pinned embedding model")
+    parser.add_argument("command", choices=["download", "verify"])
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--cache-dir", default=MODEL_CACHE_DIR, required=not MODEL_CACHE_DIR)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "download":
+            print(f"⬇️  Downloading {args.model} into {args.cache_dir}")
+            manifest = download_model(args.model, args.cache_dir)
+        else:
+            manifest = verify_model(args.model, args.cache_dir)
+    except ModelArtifactError as e:
+        print(f"❌ {e}")
+        return 1
+    size_mb = sum(file['size'] for file in manifest['files'].values()) / 1024 / 1024
+    print(f"✅ {manifest['model']}: {len(manifest['files'])} files, {size_mb:.1f} MB, "
+          f"{manifest['dimensions']} dimensions (fastembed {manifest['fastembed']})")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Trail Name Index
+In-memory trigram index over trail names, so queries naming a specific trail
+("tell me about abby grnd") can be answered by direct lookup, typos included
+"""
+
+import os
+import re
+import time
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# A confident match needs this trigram similarity on the distinctive words of the name,
+# NAME_MATCH_FULL on the whole name (so "dog" alone doesn't match "Dog Mountain"),
+# and a lead of NAME_MATCH_MARGIN over the runner-up
+NAME_MATCH_THRESHOLD = float(os.getenv('NAME_MATCH_THRESHOLD', '0.7'))
+NAME_MATCH_FULL = float(os.getenv('NAME_MATCH_FULL', '0.6'))
+NAME_MATCH_MARGIN = float(os.getenv('NAME_MATCH_MARGIN', '0.05'))
+# Share of the query's meaningful words the matched name must cover, so "steep alternative to
+# the grouse grind" (which has other constraints) isn't answered with the Grouse Grind itself
+NAME_MATCH_COVERAGE = float(os.getenv('NAME_MATCH_COVERAGE', '0.75'))
+# Seconds before the index is reloaded from the collection
+NAME_INDEX_TTL = float(os.getenv('NAME_INDEX_TTL', '300'))
+
+# Words shared by many trail names; they can't identify a trail on their own
+GENERIC_WORDS = {
+    'trail', 'trails', 'hike', 'loop', 'lake', 'lakes', 'falls', 'creek', 'river', 'park', 'regional',
+    'provincial', 'mountain', 'mount', 'mt', 'peak', 'ridge', 'canyon', 'beach', 'bay', 'hill', 'island',
+    'valley', 'forest', 'meadows', 'the', 'and', 'of', 'to', 'a',
+}
+
+
+# Filler around a trail name in queries that only ask about that trail ("tell me about the abby grind")
+QUERY_FILLER = {
+    'tell', 'me', 'about', 'info', 'information', 'details', 'on', 'the', 'a', 'an', 'is', 'it', 'what', 'whats',
+    'how', 'hard', 'long', 'far', 'show', 'give', 'for', 'of', 'to', 'at', 'i', 'can', 'you', 'please', 'do',
+    'does', 'know', 'describe', 'hike', 'hiking', 'trail', 'trails',
+}
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower().replace("'", ""))
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: set, b: set) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+def _best_window(words: List[str], key: List[str]) -> Tuple[float, range]:
+    """Best trigram similarity between `key` and any run of as many query words (or one more, for split words),
+    with the positions of that run"""
+    key_grams = _trigrams(' '.join(key))
+    best, window = 0.0, range(0)
+    for size in (len(key), len(key) + 1):
+        for start in range(max(len(words) - size + 1, 1)):
+            score = _dice(_trigrams(' '.join(words[start:start + size])), key_grams)
+            if score > best:
+                best, window = score, range(start, min(start + size, len(words)))
+    return best, window
+
+
+def _coverage(words: List[str], window: set) -> float:
+    """Share of the query's non-filler words inside the matched window"""
+    meaningful = [i for i, word in enumerate(words) if word not in QUERY_FILLER]
+    if not meaningful:
+        return 1.0
+    return sum(i in window for i in meaningful) / len(meaningful)
+
+
+class TrailNameIndex:
+    """Trigram index mapping trail names to point IDs"""
+
+    def __init__(self, names: Dict[str, str]):
+        """
+        Args:
+            names: point ID -> trail name
+        """
+        self.entries = []
+        self.postings = defaultdict(set)
+        for point_id, name in names.items():
+            words = _words(name)
+            if not words:
+                continue
+            # Match on the distinctive words ("abby grind", "buntzen"), fall back to the whole name
+            key = [word for word in words if word not in GENERIC_WORDS] or words
+            self.entries.append((point_id, name, words, key))
+            for gram in _trigrams(' '.join(key)):
+                self.postings[gram].add(len(self.entries) - 1)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def match(self, query: str) -> Optional[Tuple[str, str, float]]:
+        """(point ID, name, score) of the trail the query confidently names, or None
+
+        Only queries that are essentially just the name match: a query with anything
+        else in it ("dog friendly walks around buntzen lake under 5km") needs the full search.
+        """
+        words = _words(query)
+        if not words:
+            return None
+        # Candidates share at least two trigrams with the query
+        hits = defaultdict(int)
+        for gram in _trigrams(' '.join(words)):
+            for entry in self.postings.get(gram, ()):
+                hits[entry] += 1
+
+        scored = []
+        for entry, count in hits.items():
+            if count < 2:
+                continue
+            point_id, name, name_words, key = self.entries[entry]
+            key_score, key_window = _best_window(words, key)
+            if key_score < NAME_MATCH_THRESHOLD:
+                continue
+            full_score, full_window = (key_score, key_window) if key == name_words else _best_window(words, name_words)
+            if full_score < NAME_MATCH_FULL:
+                continue
+            if _coverage(words, set(key_window) | set(full_window)) < NAME_MATCH_COVERAGE:
+                continue
+            # The full name also breaks ties between trails sharing distinctive words
+            scored.append(((key_score + full_score) / 2, point_id, name))
+        if not scored:
+            return None
+        scored.sort(reverse=True)
+        if len(scored) > 1 and scored[0][0] - scored[1][0] < NAME_MATCH_MARGIN:
+            return None
+        score, point_id, name = scored[0]
+        return point_id, name, round(score, 3)
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_name_index(client, collection: str) -> TrailNameIndex:
+    """Shared name index for a collection, loaded from its payloads and refreshed after NAME_INDEX_TTL"""
+    with _lock:
+        cached = _indexes.get(collection)
+        if cached is not None and time.monotonic() - cached[0] < NAME_INDEX_TTL:
+            return cached[1]
+
+    names, offset = {}, None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection,
+            limit=1000,
+            offset=offset,
+            with_payload=['name'],
+            with_vectors=False
+        )
+        names.update((str(point.id), point.payload['name']) for point in points if 'name' in point.payload)
+        if offset is None:
+            break
+
+    index = TrailNameIndex(names)
+    with _lock:
+        _indexes[collection] = (time.monotonic(), index)
+    return index
+
+
+def invalidate_name_index(collection: str) -> None:
+    """Drop the cached index, e.g. after ingestion changed trail names"""
+    with _lock:
+        _indexes.pop(collection, None)
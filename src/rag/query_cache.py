@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Query Cache
+Persistent cache of filter parses, query embeddings and answers keyed by the
+normalized query, so repeated (or pre-warmed) questions skip the LLM calls
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
+
+# SQLite file shared by the API and UI processes; empty disables the cache
+QUERY_CACHE_PATH = os.getenv('QUERY_CACHE_PATH', 'data/query_cache.db')
+# Seconds a cached answer is served (ingestion also clears answers)
+ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', '86400'))
+
+KINDS = ('parse', 'embedding', 'answer')
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, single-spaced, without surrounding punctuation: " Easy hikes  with my dog?" -> "easy hikes with my dog" """
+    return re.sub(r"\s+", " ", query.lower()).strip(" .,!?;:'\"")
+
+
+def answer_version(result_ids: Iterable, prompt_version: str, model: str) -> str:
+    """Answers are only reused for the same retrieved trails, in the same order, from the same prompt and model"""
+    key = ','.join(str(point_id) for point_id in result_ids) + f'|{prompt_version}|{model}'
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class QueryCache:
+    """(kind, normalized query, version) -> JSON value in a SQLite file.
+
+    The version ties an entry to what produced it: the parser prompt for parses,
+    the model for embeddings and the retrieved trails, prompt and LLM for answers.
+    """
+
+    def __init__(self, path: str, answer_ttl: float = ANSWER_CACHE_TTL):
+        self.answer_ttl = answer_ttl
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        # WAL lets the API and UI processes read while the warm job writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_cache (kind TEXT NOT NULL, query TEXT NOT NULL, version TEXT NOT NULL, "
+            "value TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (kind, query, version))"
+        )
+        self.conn.commit()
+
+    def get(self, kind: str, query: str, version: str = '') -> Optional[Any]:
+        oldest = time.time() - self.answer_ttl if kind == 'answer' else 0
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM query_cache WHERE kind = ? AND query = ? AND version = ? AND created_at >= ?",
+                (kind, normalize_query(query), version, oldest)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, kind: str, query: str, value: Any, version: str = '') -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO query_cache VALUES (?, ?, ?, ?, ?)",
+                (kind, normalize_query(query), version, json.dumps(value), time.time())
+            )
+
+    def clear(self, kind: str = None) -> int:
+        """Drop every entry, or every entry of one kind; returns how many were dropped"""
+        with self._lock, self.conn:
+            if kind is None:
+                return self.conn.execute("DELETE FROM query_cache").rowcount
+            return self.conn.execute("DELETE FROM query_cache WHERE kind = ?", (kind,)).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Entries per kind"""
+        with self._lock:
+            rows = self.conn.execute("SELECT kind, COUNT(*) FROM query_cache GROUP BY kind").fetchall()
+        return {kind: 0 for kind in KINDS} | dict(rows)
+
+
+@lru_cache(maxsize=None)
+def get_query_cache(path: str = QUERY_CACHE_PATH) -> Optional[QueryCache]:
+    """Shared cache for a path, or None when caching is disabled"""
+    return QueryCache(path) if path else None
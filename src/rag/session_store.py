@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Conversation Session Store
+Keeps each conversation's filters, query embedding and candidate trails, so
+follow-ups ("shorter ones?", "which allow dogs?") refine them locally instead
+of re-running the whole pipeline
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict, replace
+from typing import Dict, List, Optional
+
+# Seconds a conversation stays refinable after its last turn
+SESSION_TTL = float(os.getenv('SESSION_TTL', '1800'))
+# Conversations kept in memory (least recently used are evicted first)
+SESSION_MAX = int(os.getenv('SESSION_MAX', '1000'))
+# SQLite file to share sessions between worker processes; unset keeps them in memory
+SESSION_STORE_PATH = os.getenv('SESSION_STORE_PATH')
+
+# Payload fields kept per candidate: everything filters and re-ranking need, but not the description
+CANDIDATE_FIELDS = ['name', 'url', 'rating', 'region', 'difficulty', 'time', 'distance', 'season',
+                    'dog_friendly', 'no_dogs_allowed', 'public_transit', 'camping']
+
+DIFFICULTY_ORDER = {'Easy': 0, 'Intermediate': 1, 'Difficult': 2}
+
+# Follow-up wording that re-ranks the candidates: (words, sort key, descending)
+RERANK_CUES = [
+    (('shorter',), 'distance', False),
+    (('longer',), 'distance', True),
+    (('quicker', 'faster', 'less time'), 'time', False),
+    (('easier', 'less difficult'), 'difficulty', False),
+    (('harder', 'more challenging', 'tougher'), 'difficulty', True),
+    (('better rated', 'higher rated', 'best rated', 'top rated', 'highest rated'), 'rating', True),
+]
+
+
+@dataclass
+class Session:
+    conversation_id: str
+    query: str
+    filters: Dict
+    candidates: List[Dict]  # {'id', 'score', 'payload'} with CANDIDATE_FIELDS only
+    query_vector: Optional[List[float]] = None
+    last_answer: str = ''
+    turns: int = 1
+    updated_at: float = field(default_factory=time.time)
+
+
+def compact_candidates(search_results) -> List[Dict]:
+    """Candidates to keep from search results (ScoredPoints)"""
+    return [
+        {'id': str(point.id), 'score': point.score,
+         'payload': {key: point.payload.get(key) for key in CANDIDATE_FIELDS}}
+        for point in search_results
+    ]
+
+
+def rerank_cue(followup: str) -> Optional[tuple]:
+    """(field, descending) if the follow-up asks to re-order, e.g. "shorter ones?" """
+    text = followup.lower()
+    for words, key, descending in RERANK_CUES:
+        if any(word in text for word in words):
+            return key, descending
+    return None
+
+
+def rerank(candidates: List[Dict], key: str, descending: bool) -> List[Dict]:
+    """Stable sort on a payload field; candidates without a value go last"""
+    def value(candidate):
+        raw = candidate['payload'].get(key)
+        return DIFFICULTY_ORDER.get(raw, 1) if key == 'difficulty' else raw
+
+    present = [c for c in candidates if value(c) is not None]
+    missing = [c for c in candidates if value(c) is None]
+    return sorted(present, key=value, reverse=descending) + missing
+
+
+class MemorySessionStore:
+    """In-process sessions with TTL and LRU eviction
+
+    Sessions are copied in and out, so concurrent follow-ups in one conversation each refine
+    their own copy (the last put wins, as with SQLiteSessionStore) instead of racing on one object.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = SESSION_MAX):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> Optional[Session]:
+        with self._lock:
+            session = self._sessions.get(conversation_id)
+            if session is None:
+                return None
+            if time.time() - session.updated_at > self.ttl:
+                del self._sessions[conversation_id]
+                return None
+            self._sessions.move_to_end(conversation_id)
+            return _copy(session)
+
+    def put(self, session: Session) -> None:
+        session.updated_at = time.time()
+        session = _copy(session)
+        with self._lock:
+            self._sessions[session.conversation_id] = session
+            self._sessions.move_to_end(session.conversation_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def _copy(session: Session) -> Session:
+    """Session with its own filters and candidate list (candidates themselves are never modified in place)"""
+    return replace(session, filters=dict(session.filters), candidates=list(session.candidates))
+
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite file, shared by every worker process on the host"""
+
+    def __init__(self, path: str, ttl: float = SESSION_TTL):
+        self.ttl = ttl
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (conversation_id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+            "expires_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, conversation_id: str) -> Optional[Session]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT data FROM sessions WHERE conversation_id = ? AND expires_at > ?", (conversation_id, time.time())
+            ).fetchone()
+        return Session(**json.loads(row[0])) if row else None
+
+    def put(self, session: Session) -> None:
+        session.updated_at = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (session.conversation_id, json.dumps(asdict(session)), session.updated_at + self.ttl)
+            )
+            self.conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (session.updated_at,))
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+
+def create_session_store(path: Optional[str] = SESSION_STORE_PATH, ttl: float = SESSION_TTL):
+    return SQLiteSessionStore(path, ttl) if path else MemorySessionStore(ttl)
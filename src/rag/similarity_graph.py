@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Trail Similarity Graph
+k-nearest-neighbour graph over the trail vectors, stored in each point's payload
+as `similar_trails`, so "trails like this one" is a lookup instead of a search
+"""
+
+import os
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+# Neighbours kept per trail; 0 disables the graph
+SIMILAR_TRAILS_K = int(os.getenv('SIMILAR_TRAILS_K', '10'))
+GRAPH_FIELD = 'similar_trails'
+# Rows of the similarity matrix computed at once, bounding memory to BLOCK_ROWS x N floats
+BLOCK_ROWS = 1024
+
+
+def load_vectors(client: QdrantClient, collection: str) -> Tuple[List[str], np.ndarray, Dict[str, list]]:
+    """All point IDs, their normalized vectors and their current neighbour lists"""
+    ids, vectors, graph, offset = [], [], {}, None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection,
+            limit=1000,
+            offset=offset,
+            with_payload=[GRAPH_FIELD],
+            with_vectors=True
+        )
+        for point in points:
+            ids.append(str(point.id))
+            vectors.append(point.vector)
+            if GRAPH_FIELD in point.payload:
+                graph[str(point.id)] = point.payload[GRAPH_FIELD]
+        if offset is None:
+            break
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return ids, matrix / np.where(norms == 0, 1, norms), graph
+
+
+def knn(matrix: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k cosine neighbours (excluding itself) of matrix[rows] among all rows, best first"""
+    k = min(k, len(matrix) - 1)
+    indices = np.empty((len(rows), k), dtype=np.int64)
+    scores = np.empty((len(rows), k), dtype=np.float32)
+    for start in range(0, len(rows), BLOCK_ROWS):
+        block = rows[start:start + BLOCK_ROWS]
+        sims = matrix[block] @ matrix.T
+        sims[np.arange(len(block)), block] = -np.inf
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        indices[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+        scores[start:start + len(block)] = np.take_along_axis(top_scores, order, axis=1)
+    return indices, scores
+
+
+def affected_rows(ids: List[str], matrix: np.ndarray, graph: Dict[str, list],
+                  changed: Iterable[str], removed: Iterable[str], k: int) -> np.ndarray:
+    """Rows whose neighbour list may differ after `changed` points were (re)embedded and `removed` deleted.
+
+    That is the changed points themselves, points without a list yet, points whose list
+    references a changed or removed point, and points a changed point now outranks.
+    """
+    position = {point_id: i for i, point_id in enumerate(ids)}
+    changed_rows = np.array([position[point_id] for point_id in set(changed) if point_id in position], dtype=np.int64)
+    stale = set(changed) | set(removed)
+
+    affected = np.zeros(len(ids), dtype=bool)
+    affected[changed_rows] = True
+    kth_score = np.full(len(ids), -np.inf, dtype=np.float32)
+    for i, point_id in enumerate(ids):
+        neighbours = graph.get(point_id)
+        if neighbours is None or any(neighbour['id'] in stale for neighbour in neighbours):
+            affected[i] = True
+        elif len(neighbours) >= min(k, len(ids) - 1):
+            kth_score[i] = neighbours[-1]['score']
+
+    for start in range(0, len(changed_rows), BLOCK_ROWS):
+        block = changed_rows[start:start + BLOCK_ROWS]
+        best = (matrix[block] @ matrix.T).max(axis=0)
+        affected |= best > kth_score
+    return np.flatnonzero(affected)
+
+
+def update_similarity_graph(client: QdrantClient, collection: str, changed: Iterable[str] = (),
+                            removed: Iterable[str] = (), k: int = SIMILAR_TRAILS_K) -> int:
+    """Recompute the neighbour lists affected by changed/removed points; returns how many were rewritten.
+
+    Points without a list are always recomputed, so the first run builds the whole graph.
+    """
+    if k <= 0:
+        return 0
+    ids, matrix, graph = load_vectors(client, collection)
+    if len(ids) < 2:
+        return 0
+    rows = affected_rows(ids, matrix, graph, changed, removed, k)
+    if not len(rows):
+        return 0
+
+    indices, scores = knn(matrix, rows, k)
+    operations = [
+        models.SetPayloadOperation(set_payload=models.SetPayload(
+            payload={GRAPH_FIELD: [
+                {'id': ids[j], 'score': round(float(score), 4)} for j, score in zip(neighbours, row_scores)
+            ]},
+            points=[ids[row]]
+        ))
+        for row, neighbours, row_scores in zip(rows, indices, scores)
+    ]
+    for start in range(0, len(operations), 256):
+        client.batch_update_points(collection_name=collection, update_operations=operations[start:start + 256])
+    return len(operations)
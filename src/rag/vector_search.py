@@ -7,16 +7,28 @@ Ingests trail data with Jina embeddings and metadata
 import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-import pandas as pd
 import hashlib
-from typing import List, Dict, Any
+import threading
+import time
+from functools import lru_cache
+from collections import defaultdict
+from typing import Iterator, List, Dict, Any, Optional
 from qdrant_client import QdrantClient, models
-from tqdm import tqdm
 from dotenv import load_dotenv
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from processing.query_parser import QueryParser
+from processing.trail_catalog import TrailCatalog, trail_id
+from rag.embedding_service import EmbeddingClient
+from rag.model_artifacts import model_options, require_model
+from rag.similarity_graph import GRAPH_FIELD, update_similarity_graph
+from rag.name_index import get_name_index, invalidate_name_index
+from rag.facet_index import FacetIndex, get_facet_index, invalidate_facet_index
+from rag.query_cache import QUERY_CACHE_PATH, get_query_cache
+from rag.metrics import metrics
 from llm.client import llm_function
+# pandas, pyarrow and the cleaning/changelog modules are only needed for ingestion,
+# so they are imported inside those methods to keep the search path fast to start
 # Tracing imports removed for now
 
 load_dotenv()
@@ -26,14 +38,236 @@ EMBEDDING_DIMENSIONALITY = os.getenv('EMBEDDING_DIMENSIONALITY')
 COLLECTION_NAME = os.getenv('COLLECTION_NAME')
 QDRANT_HOST = os.getenv('QDRANT_HOST')
 QDRANT_PORT = int(os.getenv('QDRANT_PORT'))
+# Optional local Qdrant instead of host/port: ":memory:" or a storage path
+QDRANT_LOCATION = os.getenv('QDRANT_LOCATION')
 MODEL_NAME = os.getenv('MODEL_NAME')
+# Rows read and points embedded/uploaded per ingestion batch
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '256'))
+# Optional shared embedding service (rag/embedding_service.py); unset embeds in-process
+EMBEDDING_SOCKET = os.getenv('EMBEDDING_SOCKET')
+# fastembed options for in-process embedding (offline from MODEL_CACHE_DIR when set)
+EMBEDDING_OPTIONS = model_options() or None
+# New collections get one Qdrant shard key per region, so searches with region hints only
+# touch those shards (server Qdrant only; the local mode can't shard and filters instead)
+PARTITION_BY_REGION = os.getenv('PARTITION_BY_REGION', '0') == '1'
+# Seconds a process trusts its view of the collection's region shards
+PARTITIONS_TTL = 60
+# Payload returned with search results: everything but the neighbour lists, which only
+# get_similar_trails reads and which would otherwise dominate each hit
+RESULT_PAYLOAD = models.PayloadSelectorExclude(exclude=[GRAPH_FIELD])
+
+
+@lru_cache(maxsize=None)
+def get_qdrant_client(host: str = QDRANT_HOST, port: int = QDRANT_PORT, location: str = None) -> QdrantClient:
+    """Get a shared Qdrant client, so every TrailVectorDB in a process sees the same local store"""
+    if location == ":memory:":
+        return QdrantClient(location=location)
+    if location:
+        return QdrantClient(path=location)
+    return QdrantClient(host=host, port=port)
+
+
+# collection -> (loaded at, region shard keys or None when not partitioned)
+_partitions = {}
+
+
+# Stable point ID derived from the URL; the same ID identifies the trail in the catalog
+trail_point_id = trail_id
+
+
+def url_filter(url: str) -> models.Filter:
+    """Filter selecting the point(s) of one trail by URL"""
+    return models.Filter(must=[models.FieldCondition(key='url', match=models.MatchValue(value=url))])
+
+
+def build_trail_payload(row) -> Dict[str, Any]:
+    """Convert a cleaned dataset row into the Qdrant payload for a trail"""
+    import pandas as pd
+
+    return {
+        'name': str(row['name']),
+        'rating': float(row['rating']) if pd.notna(row['rating']) else 0.0,
+        'region': str(row['region']),
+        'difficulty': str(row['difficulty']),
+        'time': float(row['time']) if pd.notna(row['time']) else 0.0,
+        'distance': float(row['distance']) if pd.notna(row['distance']) else 0.0,
+        'season': str(row['season']),
+        'dog_friendly': bool(row['dog_friendly']),
+        'no_dogs_allowed': bool(row['no_dogs_allowed']),
+        'public_transit': bool(row['public_transit']),
+        'camping': bool(row['camping']),
+        'url': str(row['url']),
+        'description': str(row['description']) if pd.notna(row['description']) else ""
+    }
+
+
+def payload_matches_filters(payload: Dict, filters_dict: Dict) -> bool:
+    """Check a payload against parser filters locally, with the same semantics as build_qdrant_filter"""
+    for key, value in filters_dict.items():
+        if key.endswith('_min'):
+            field_value = payload.get(key[:-4])
+            if field_value is None or field_value < value:
+                return False
+        elif key.endswith('_max'):
+            field_value = payload.get(key[:-4])
+            if field_value is None or field_value > value:
+                return False
+        elif key == 'regions':
+            if payload.get('region') not in value:
+                return False
+        elif payload.get(key) != value:
+            return False
+    return True
+
+
+def route_regions(filters_dict: Optional[Dict]) -> Optional[List[str]]:
+    """Regions a search is limited to by its filters, or None for all of them"""
+    if not filters_dict:
+        return None
+    if filters_dict.get('regions'):
+        return sorted(set(filters_dict['regions']))
+    if isinstance(filters_dict.get('region'), str):
+        return [filters_dict['region']]
+    return None
+
+
+class _LastSearch(threading.local):
+    """Details of a thread's most recent search_trails call, so a shared TrailVectorDB can report them"""
+    timings = {}
+    filters = {}
+    query_vector = None
+
 
 class TrailVectorDB:
     """Qdrant vector database for trails"""
     
-    def __init__(self, host: str = QDRANT_HOST, port: int = QDRANT_PORT):
-        """Initialize Qdrant client and embedding model"""
-        self.client = QdrantClient(host=host, port=port)   
+    def __init__(self, host: str = QDRANT_HOST, port: int = QDRANT_PORT, location: str = QDRANT_LOCATION,
+                 catalog: TrailCatalog = None, embedding_socket: str = EMBEDDING_SOCKET,
+                 query_cache_path: str = QUERY_CACHE_PATH):
+        """Initialize Qdrant client and embedding model
+
+        With a trail catalog, ingestion dedup uses its indexed lookups instead of scrolling the collection.
+        With an embedding socket, vectors come from the shared embedding service instead of a model
+        loaded in this process. With a query cache, parsed filters and query vectors are reused
+        for queries seen (or warmed) before.
+        """
+        self.client = get_qdrant_client(host, port, location)
+        self.location = location
+        self.catalog = catalog
+        self.embedder = EmbeddingClient(embedding_socket) if embedding_socket else None
+        if self.embedder is None:
+            # Fail now rather than on the first query if the pinned model isn't there
+            require_model()
+        self.query_cache = get_query_cache(query_cache_path) if query_cache_path else None
+        self.parser = QueryParser()
+        # Parses cached under an older prompt are not reused
+        self.parser_version = hashlib.sha1(self.parser.filter_extraction_prompt.encode()).hexdigest()[:12]
+        self._last = _LastSearch()
+    
+    @property
+    def last_timings(self) -> Dict[str, float]:
+        """Stage timings (seconds) of this thread's most recent search_trails call"""
+        return self._last.timings
+    
+    @property
+    def last_filters(self) -> Dict:
+        """Filters used by this thread's most recent search_trails call"""
+        return self._last.filters
+    
+    @property
+    def last_query_vector(self):
+        """Query vector of this thread's most recent search_trails call, when one was computed here"""
+        return self._last.query_vector
+    
+    def embed_texts(self, texts: List[str], is_query: bool = False) -> list:
+        """Query vectors from the query cache, others from the embedding service
+        (caching query vectors), or models.Document for Qdrant to embed in-process"""
+        if not is_query or self.query_cache is None:
+            return self._embed(texts, is_query)
+        embedded = [self.query_cache.get('embedding', text, MODEL_NAME) for text in texts]
+        missing = [i for i, vector in enumerate(embedded) if vector is None]
+        metrics.increment('cache.embedding.hit', len(texts) - len(missing))
+        metrics.increment('cache.embedding.miss', len(missing))
+        if missing:
+            for i, vector in zip(missing, self._embed([texts[i] for i in missing], is_query)):
+                embedded[i] = vector
+                if isinstance(vector, list):
+                    self.query_cache.put('embedding', texts[i], vector, MODEL_NAME)
+        return embedded
+    
+    def _embed(self, texts: List[str], is_query: bool) -> list:
+        if self.embedder is not None:
+            try:
+                return self.embedder.embed(texts, is_query)
+            except OSError as e:
+                print(f"   Warning: embedding service unavailable ({e}), embedding in-process")
+                require_model()
+        return [models.Document(text=text, model=MODEL_NAME, options=EMBEDDING_OPTIONS) for text in texts]
+    
+    def partitions(self, refresh: bool = False) -> Optional[set]:
+        """Region shard keys of the collection, or None when it isn't partitioned (cached for PARTITIONS_TTL)"""
+        cached = _partitions.get(COLLECTION_NAME)
+        if cached is not None and not refresh and time.monotonic() - cached[0] < PARTITIONS_TTL:
+            return cached[1]
+        try:
+            params = self.client.get_collection(COLLECTION_NAME).config.params
+        except Exception:
+            return None  # No collection yet
+        shard_keys = None
+        if params.sharding_method == models.ShardingMethod.CUSTOM:
+            info = self.client.collection_cluster_info(COLLECTION_NAME)
+            shard_keys = {
+                shard.shard_key for shard in info.local_shards + info.remote_shards if shard.shard_key is not None
+            }
+        _partitions[COLLECTION_NAME] = (time.monotonic(), shard_keys)
+        return shard_keys
+    
+    @property
+    def partitioned(self) -> bool:
+        """Whether the collection has one shard key per region"""
+        return self.partitions() is not None
+    
+    def shard_selector(self, regions: Optional[List[str]]) -> Optional[List[str]]:
+        """Shard keys to send a search to: the hinted regions' shards, or None for all shards"""
+        shard_keys = self.partitions() if regions else None
+        if not shard_keys:
+            return None
+        # A hinted region without a shard has no trails; if none has one, the region filter alone returns nothing
+        return [region for region in regions if region in shard_keys] or None
+    
+    def ensure_partitions(self, regions) -> None:
+        """Create the shard keys of regions seen for the first time"""
+        shard_keys = self.partitions()
+        for region in set(regions) - shard_keys:
+            try:
+                self.client.create_shard_key(COLLECTION_NAME, shard_key=region)
+                print(f"   Created partition for region {region}")
+            except Exception:
+                # Another ingestion run may have created it meanwhile
+                if region not in self.partitions(refresh=True):
+                    raise
+                shard_keys = self.partitions()
+            shard_keys.add(region)
+    
+    def upsert_points(self, points: List[models.PointStruct]) -> None:
+        """Upsert points, each into its region's partition when the collection is partitioned"""
+        if not self.partitioned:
+            self.client.upsert(collection_name=COLLECTION_NAME, points=points)
+            return
+        by_region = defaultdict(list)
+        for point in points:
+            by_region[point.payload['region']].append(point)
+        self.ensure_partitions(by_region)
+        for region, region_points in by_region.items():
+            self.client.upsert(collection_name=COLLECTION_NAME, points=region_points, shard_key_selector=region)
+    
+    def build_points(self, payloads: List[Dict]) -> List[models.PointStruct]:
+        """Points with a stable ID derived from the URL and the embedded description"""
+        vectors = self.embed_texts([payload['description'] for payload in payloads])
+        return [
+            models.PointStruct(id=trail_point_id(payload['url']), vector=vector, payload=payload)
+            for payload, vector in zip(payloads, vectors)
+        ]
     
     def create_collection(self):
         """Create collection if it doesn't exist"""
@@ -47,121 +281,266 @@ class TrailVectorDB:
         except:
             # Collection doesn't exist, create it
             print("   Creating new collection...")
+            partitioned = PARTITION_BY_REGION and self.location is None
+            if PARTITION_BY_REGION and not partitioned:
+                print("   Warning: local Qdrant can't shard, PARTITION_BY_REGION ignored")
             self.client.create_collection(
                 collection_name=COLLECTION_NAME,
                 vectors_config=models.VectorParams(
                     size=EMBEDDING_DIMENSIONALITY,
                     distance=models.Distance.COSINE
-                )
+                ),
+                sharding_method=models.ShardingMethod.CUSTOM if partitioned else None
             )
-            print("Collection created successfully")
+            _partitions[COLLECTION_NAME] = (time.monotonic(), set() if partitioned else None)
+            # Change-log updates and deletes select trails by URL
+            self.client.create_payload_index(
+                collection_name=COLLECTION_NAME,
+                field_name='url',
+                field_schema=models.PayloadSchemaType.KEYWORD
+            )
+            # Region hints filter on the region
+            self.client.create_payload_index(
+                collection_name=COLLECTION_NAME,
+                field_name='region',
+                field_schema=models.PayloadSchemaType.KEYWORD
+            )
+            print(f"Collection created successfully{' (partitioned by region)' if partitioned else ''}")
             return True  # New collection created
     
     def get_existing_trails(self) -> set:
         """Get existing trail identifiers (name_url) from the collection"""
         try:
-            # Scroll through all points to get trail names and URLs
-            points, _ = self.client.scroll(
-                collection_name=COLLECTION_NAME,
-                limit=1000,  # Get all points
-                with_payload=True
-            )
-            
-            existing_trails = set()
-            for point in points:
-                if 'name' in point.payload and 'url' in point.payload:
-                    trail_key = f"{point.payload['name']}_{point.payload['url']}"
-                    existing_trails.add(trail_key)
-            
-            return existing_trails
+            # Page through all points, reading only the two payload fields we need
+            existing_trails, offset = set(), None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=COLLECTION_NAME,
+                    limit=1000,
+                    offset=offset,
+                    with_payload=['name', 'url'],
+                    with_vectors=False
+                )
+                for point in points:
+                    if 'name' in point.payload and 'url' in point.payload:
+                        trail_key = f"{point.payload['name']}_{point.payload['url']}"
+                        existing_trails.add(trail_key)
+                if offset is None:
+                    return existing_trails
         except Exception as e:
             print(f"   Warning: Could not check existing points: {e}")
             return set()
     
-    def prepare_new_trail_data(self, csv_path: str) -> List[models.PointStruct]:
-        """Load and prepare only new trail data for Qdrant"""
-        print(f"📄 Loading trail data from {csv_path}")
-        
-        # Load trails data
-        df = pd.read_csv(csv_path)
-        print(f"   Found {len(df)} trails")
+    def get_indexed_urls(self) -> set:
+        """URLs of all trails in the collection (reads only the url payload field)"""
+        urls, offset = set(), None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=COLLECTION_NAME,
+                limit=1000,
+                offset=offset,
+                with_payload=['url'],
+                with_vectors=False
+            )
+            urls.update(point.payload['url'] for point in points if 'url' in point.payload)
+            if offset is None:
+                return urls
+    
+    def iter_new_trail_points(self, csv_path: str, batch_size: int = INGEST_BATCH_SIZE) -> Iterator[List[models.PointStruct]]:
+        """Stream the dataset in chunks and yield points for new trails, at most batch_size at a time
+
+        Only one chunk of rows and one batch of points are alive at any time, so memory
+        does not grow with the dataset (apart from the set of already indexed keys).
+        """
+        from processing.trail_store import iter_trail_batches
+
+        print(f"📄 Streaming trail data from {csv_path}")
         
-        # Check which trails already exist (by name_url)
         print("   Checking for existing trails...")
-        existing_trails = self.get_existing_trails()
-        print(f"   Found {len(existing_trails)} existing trails")
-        
-        # Prepare only new points
-        new_points = []
-        for _, row in df.iterrows():
-            # Create trail identifier
-            trail_key = f"{row['name']}_{row['url']}"
-            
-            # Skip if trail already exists
-            if trail_key in existing_trails:
-                continue
-            
-            # Text for embedding (description)
-            description = str(row['description']) if pd.notna(row['description']) else ""
-            
-            # Create vector using Qdrant's text embedding
-            vector = models.Document(text=description, model=MODEL_NAME)
-            
-            # Prepare metadata
-            payload = {
-                'name': str(row['name']),
-                'rating': float(row['rating']) if pd.notna(row['rating']) else 0.0,
-                'region': str(row['region']),
-                'difficulty': str(row['difficulty']),
-                'time': float(row['time']) if pd.notna(row['time']) else 0.0,
-                'distance': float(row['distance']) if pd.notna(row['distance']) else 0.0,
-                'season': str(row['season']),
-                'dog_friendly': bool(row['dog_friendly']),
-                'no_dogs_allowed': bool(row['no_dogs_allowed']),
-                'public_transit': bool(row['public_transit']),
-                'camping': bool(row['camping']),
-                'url': str(row['url']),
-                'description': description
-            }
-            
-            # Create point with unique ID (hash of trail_key)
-            point = models.PointStruct(
-                id=hash(trail_key) & 0x7FFFFFFF,  # Ensure positive 32-bit integer
-                vector=vector,
-                payload=payload
-            )
-            new_points.append(point)
+        if self.catalog is not None:
+            # Collection populated before the catalog tracked it: record what is indexed once
+            if self.catalog.indexed_count() == 0:
+                self.catalog.mark_indexed(self.get_indexed_urls())
+            # Indexed catalog lookup per trail instead of scrolling the collection; trails the
+            # catalog doesn't know can't be marked there, so the collection is asked about those
+            collection_urls = None
+
+            def is_new(row):
+                nonlocal collection_urls
+                if self.catalog.is_indexed(row['url']):
+                    return False
+                if self.catalog.has_url(row['url']):
+                    return True
+                if collection_urls is None:
+                    collection_urls = self.get_indexed_urls()
+                return row['url'] not in collection_urls
+
+            print(f"   Found {self.catalog.indexed_count()} existing trails (catalog)")
+        else:
+            # Check which trails already exist (by name_url)
+            existing_trails = self.get_existing_trails()
+            is_new = lambda row: f"{row['name']}_{row['url']}" not in existing_trails
+            print(f"   Found {len(existing_trails)} existing trails")
         
+        batch = []
+        for chunk in iter_trail_batches(csv_path, batch_size):
+            for _, row in chunk.iterrows():
+                if not is_new(row):
+                    continue
+                
+                # Prepare metadata
+                batch.append(build_trail_payload(row))
+                if len(batch) == batch_size:
+                    yield self.build_points(batch)
+                    batch = []
+        if batch:
+            yield self.build_points(batch)
+    
+    def prepare_new_trail_data(self, csv_path: str) -> List[models.PointStruct]:
+        """Load and prepare all new trail points at once (prefer iter_new_trail_points for large datasets)"""
+        new_points = [point for batch in self.iter_new_trail_points(csv_path) for point in batch]
         print(f"   {len(new_points)} new trails to ingest")
         return new_points
     
-    def ingest_trails(self, csv_path: str):
-        """Complete ingestion process - only new trails"""
+    def ingest_trails(self, csv_path: str, batch_size: int = INGEST_BATCH_SIZE, update_graph: bool = True):
+        """Complete ingestion process - only new trails, uploaded batch by batch, then the similarity graph"""
         print("Starting incremental trail ingestion")
         print("=" * 50)
         
-        # Prepare only new data
-        new_points = self.prepare_new_trail_data(csv_path)
+        added = 0
+        added_ids = []
+        for batch in self.iter_new_trail_points(csv_path, batch_size):
+            # Embed and upload this batch, then let it go before the next one is built
+            self.upsert_points(batch)
+            if self.catalog is not None:
+                self.catalog.mark_indexed(point.payload['url'] for point in batch)
+            added += len(batch)
+            added_ids.extend(point.id for point in batch)
+            print(f"   Uploaded {added} new trails...", end='\r')
         
-        if not new_points:
+        if update_graph:
+            self.update_similarity_graph(changed=added_ids)
+        if added:
+            self.invalidate_search_caches()
+        
+        collection_info = self.client.get_collection(COLLECTION_NAME)
+        if not added:
             print("No new trails to ingest - database is up to date!")
-            collection_info = self.client.get_collection(COLLECTION_NAME)
             return collection_info.points_count
         
-        # Upload new points to Qdrant
-        print(f"Uploading {len(new_points)} new trails...")
-        self.client.upsert(
-            collection_name=COLLECTION_NAME,
-            points=new_points
-        )
-        
         # Verify ingestion
-        collection_info = self.client.get_collection(COLLECTION_NAME)
-        print(f"Total trails in database: {collection_info.points_count}")
-        print(f"   ({len(new_points)} newly added)")
+        print(f"\nTotal trails in database: {collection_info.points_count}")
+        print(f"   ({added} newly added)")
         
         return collection_info.points_count
     
+    def apply_changelog(self, changelog_path: str, update_graph: bool = True) -> Dict[str, int]:
+        """Apply a scraper change log: re-embed trails whose description changed,
+        update the payload of metadata-only changes and delete removed trails"""
+        import pandas as pd
+        from processing.clean_data import clean_trails_dataframe, validate_trails
+        from scrapers.changelog import read_changelog
+
+        print(f"📝 Applying change log {changelog_path}")
+        changes = list(read_changelog(changelog_path))
+        counts = {'embedded': 0, 'payload_updated': 0, 'deleted': 0}
+        if not changes:
+            print("No changes to apply - database is up to date!")
+            return counts
+        
+        # Clean the raw scraped records exactly like the batch cleaning step
+        live = [change for change in changes if change['op'] != 'removed']
+        payloads = {}
+        if live:
+            df, rejected = validate_trails(clean_trails_dataframe(pd.DataFrame([change['trail'] for change in live])))
+            payloads = {row['url']: build_trail_payload(row) for _, row in df.iterrows()}
+            for _, row in rejected.iterrows():
+                print(f"   Skipping invalid trail {row['url']}: {row['reason']}")
+        
+        new_payloads = []
+        updated_urls = []
+        for change in changes:
+            url = change['url']
+            if change['op'] == 'removed':
+                self.client.delete(
+                    collection_name=COLLECTION_NAME,
+                    points_selector=models.FilterSelector(filter=url_filter(url))
+                )
+                counts['deleted'] += 1
+                continue
+            
+            if url not in payloads:
+                continue
+            payload = payloads[url]
+            exists = self.client.count(COLLECTION_NAME, count_filter=url_filter(url), exact=True).count > 0
+            # In a partitioned collection a trail changing region must move to the other shard
+            moved = self.partitioned and 'region' in change['changed_fields']
+            if change['op'] == 'added' or 'description' in change['changed_fields'] or not exists or moved:
+                # Drop any point stored under a legacy ID before upserting the re-embedded one
+                self.client.delete(
+                    collection_name=COLLECTION_NAME,
+                    points_selector=models.FilterSelector(filter=url_filter(url))
+                )
+                new_payloads.append(payload)
+            else:
+                # Metadata-only change: no need to re-embed
+                self.client.set_payload(
+                    collection_name=COLLECTION_NAME,
+                    payload=payload,
+                    points=models.FilterSelector(filter=url_filter(url))
+                )
+                counts['payload_updated'] += 1
+                updated_urls.append(url)
+        
+        new_points = self.build_points(new_payloads) if new_payloads else []
+        if new_points:
+            self.upsert_points(new_points)
+            counts['embedded'] = len(new_points)
+        if self.catalog is not None:
+            self.catalog.mark_indexed(updated_urls + [point.payload['url'] for point in new_points])
+        self.invalidate_search_caches()
+        # Metadata-only updates keep their vectors, so only re-embedded and deleted trails move in the graph
+        if update_graph:
+            removed = [trail_point_id(change['url']) for change in changes if change['op'] == 'removed']
+            self.update_similarity_graph(changed=[point.id for point in new_points], removed=removed)
+        
+        print(f"   {counts['embedded']} re-embedded, {counts['payload_updated']} payload updates, {counts['deleted']} deleted")
+        return counts
+    
+    def invalidate_search_caches(self):
+        """Drop the name and facet indexes and cached answers after ingestion changed the trails"""
+        invalidate_name_index(COLLECTION_NAME)
+        invalidate_facet_index(COLLECTION_NAME)
+        if self.query_cache is not None:
+            self.query_cache.clear('answer')
+    
+    def update_similarity_graph(self, changed: List[str] = (), removed: List[str] = ()) -> int:
+        """Refresh the neighbour lists affected by (re)embedded and deleted trails"""
+        rewritten = update_similarity_graph(self.client, COLLECTION_NAME, changed, removed)
+        if rewritten:
+            print(f"   Updated similar trails for {rewritten} trails")
+        return rewritten
+    
+    def get_similar_trails(self, trail_id: str, limit: int = 5):
+        """Precomputed nearest trails of a trail (None if the trail isn't indexed), no embedding or search"""
+        points = self.client.retrieve(COLLECTION_NAME, ids=[trail_id], with_payload=[GRAPH_FIELD])
+        if not points:
+            return None
+        neighbours = points[0].payload.get(GRAPH_FIELD, [])[:limit]
+        fields = ['name', 'url', 'region', 'difficulty', 'rating', 'distance', 'time']
+        payloads = {
+            str(point.id): point.payload
+            for point in self.client.retrieve(COLLECTION_NAME, ids=[n['id'] for n in neighbours], with_payload=fields)
+        }
+        return [
+            {'id': neighbour['id'], 'score': neighbour['score'], **payloads[neighbour['id']]}
+            for neighbour in neighbours if neighbour['id'] in payloads
+        ]
+    
+    def get_facet_index(self) -> FacetIndex:
+        """In-memory facet index of the collection, for filtered counts without a Qdrant scroll"""
+        return get_facet_index(self.client, COLLECTION_NAME)
+    
     def build_qdrant_filter(self, filters_dict: Dict):
         """Convert filters to Qdrant format"""
 
@@ -174,35 +553,134 @@ class TrailVectorDB:
             elif key.endswith('_max'):
                 field = key[:-4]  # Remove '_max'
                 conditions.append(models.FieldCondition(key=field, range=models.Range(lte=value)))
+            elif key == 'regions':
+                # Also applied when routed to the regions' shards, so results are the same unpartitioned
+                conditions.append(models.FieldCondition(key='region', match=models.MatchAny(any=value)))
             else:
                 conditions.append(models.FieldCondition(key=key, match=models.MatchValue(value=value)))
         
         return models.Filter(must=conditions) if conditions else None
     
-    def search_trails(self, query: str, limit: int = 3):
-        """Search trails by semantic similarity"""
+    def parse_filters(self, query: str) -> Dict:
+        """Extract payload filters from a natural language query with the LLM parser (cached per normalized query)"""
+        if self.query_cache is None:
+            return self.parser.parse_query_with_llm(query, llm_function)
+        filters_dict = self.query_cache.get('parse', query, self.parser_version)
+        if filters_dict is not None:
+            metrics.increment('cache.parse.hit')
+            return filters_dict
+        metrics.increment('cache.parse.miss')
+        try:
+            filters_dict = self.parser.parse_query_with_llm(query, llm_function, raise_errors=True)
+        except Exception as e:
+            # Not cached, so the next request retries the parse
+            print(f"parsing failed: {e}")
+            return {}
+        self.query_cache.put('parse', query, filters_dict, self.parser_version)
+        return filters_dict
+    
+    def match_trail_name(self, query: str) -> list:
+        """The trail a query names, e.g. "tell me about abby grnd", as a one-element result list, or []"""
+        match = get_name_index(self.client, COLLECTION_NAME).match(query)
+        if match is None:
+            return []
+        point_id, _, score = match
+        points = self.client.retrieve(COLLECTION_NAME, ids=[point_id], with_payload=RESULT_PAYLOAD)
+        return [models.ScoredPoint(id=point.id, version=0, score=score, payload=point.payload) for point in points]
+    
+    def search_trails(self, query: str, limit: int = 3, filters_dict: Dict = None):
+        """Search trails by semantic similarity, parsing filters from the query unless given.
+
+        Without given filters, a query that confidently names a trail returns that trail
+        directly, skipping the LLM parser and the vector search. With region hints in the
+        filters, a partitioned collection is only searched in those regions' shards.
+        """
+        start = time.perf_counter()
+        metrics.increment('search')
+
+        if filters_dict is None:
+            named = self.match_trail_name(query)
+            if named:
+                self._last.timings = {'parse': 0.0, 'search': time.perf_counter() - start}
+                self._last.filters, self._last.query_vector = {}, None
+                metrics.observe('search.name_match', self._last.timings['search'])
+                return named
+
         # Prepare Qdrant filters
-        query_parser = QueryParser()
-        filters_dict = query_parser.parse_query_with_llm(query, llm_function)
+        if filters_dict is None:
+            filters_dict = self.parse_filters(query)
         qdrant_filter = self.build_qdrant_filter(filters_dict)
+        parsed = time.perf_counter()
+        query_vector = self.embed_texts([query], is_query=True)[0]
+        self._last.filters = filters_dict
+        self._last.query_vector = query_vector if isinstance(query_vector, list) else None
         
-        # Search using query_points
+        # Search using query_points (Qdrant fans out to the selected shards and merges their results)
         query_points = self.client.query_points(
             collection_name=COLLECTION_NAME,
-            query=models.Document(
-                text=query,
-                model=MODEL_NAME
-            ),
+            query=query_vector,
             query_filter=qdrant_filter,
             limit=limit,
-            with_payload=True
+            with_payload=RESULT_PAYLOAD,
+            shard_key_selector=self.routed_selector(filters_dict)
         )
         
         # Extract results
         results = []
         for point in query_points.points:
             results.append(point)
+
+        self._last.timings = {'parse': parsed - start, 'search': time.perf_counter() - parsed}
+        metrics.observe('search.parse', self._last.timings['parse'])
+        metrics.observe('search.vector', self._last.timings['search'])
         
         return results
+    
+    def search_by_vector(self, query_vector, filters_dict: Dict, limit: int = 3) -> list:
+        """Filtered search with an already known query vector (or query text, embedded again)"""
+        if isinstance(query_vector, str):
+            query_vector = self.embed_texts([query_vector], is_query=True)[0]
+        return self.client.query_points(
+            collection_name=COLLECTION_NAME,
+            query=query_vector,
+            query_filter=self.build_qdrant_filter(filters_dict),
+            limit=limit,
+            with_payload=RESULT_PAYLOAD,
+            shard_key_selector=self.routed_selector(filters_dict)
+        ).points
+    
+    def routed_selector(self, filters_dict: Optional[Dict]):
+        """Shard keys for a search with these filters (None searches every shard)"""
+        selector = self.shard_selector(route_regions(filters_dict))
+        if selector is not None:
+            metrics.increment('search.routed')
+        return selector
+    
+    def get_trails(self, scores: Dict[str, float]) -> list:
+        """Full payloads of the given trail IDs as ScoredPoints, in the order given"""
+        points = {
+            str(point.id): point
+            for point in self.client.retrieve(COLLECTION_NAME, ids=list(scores), with_payload=RESULT_PAYLOAD)
+        }
+        return [
+            models.ScoredPoint(id=point_id, version=0, score=score, payload=points[point_id].payload)
+            for point_id, score in scores.items() if point_id in points
+        ]
+    
+    def search_trails_batch(self, queries: List[str], filters_list: List[Dict], limit: int = 3) -> List[list]:
+        """Search many already-parsed queries with one embedding call and one Qdrant request,
+        each query routed to its own regions' shards"""
+        metrics.increment('search', len(queries))
+        vectors = self.embed_texts(queries, is_query=True)
+        responses = self.client.query_batch_points(
+            collection_name=COLLECTION_NAME,
+            requests=[
+                models.QueryRequest(query=vector, filter=self.build_qdrant_filter(filters_dict),
+                                    limit=limit, with_payload=RESULT_PAYLOAD,
+                                    shard_key=self.routed_selector(filters_dict))
+                for vector, filters_dict in zip(vectors, filters_list)
+            ]
+        )
+        return [response.points for response in responses]
 
 
@@ -0,0 +1,62 @@
+import json
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List
+
+# Fields whose changes are tracked; url is the key
+TRACKED_FIELDS = ['name', 'rating', 'region', 'difficulty', 'time', 'distance', 'season',
+                  'dog_friendly', 'no_dogs_allowed', 'public_transit', 'camping', 'description']
+
+
+def _normalize(value) -> str:
+    """String form used for hashing, so CSV-loaded and freshly scraped values compare equal."""
+    if value is None or (isinstance(value, float) and value != value):  # None or NaN
+        return ''
+    return str(value).strip()
+
+
+def field_hashes(trail: Dict) -> Dict[str, str]:
+    """Content hash of every tracked field of a trail."""
+    return {
+        field: hashlib.sha1(_normalize(trail.get(field)).encode('utf-8')).hexdigest()
+        for field in TRACKED_FIELDS
+    }
+
+
+def content_hash(hashes: Dict[str, str]) -> str:
+    """Single hash over all field hashes, for cheap whole-record comparison."""
+    return hashlib.sha1(''.join(hashes[field] for field in TRACKED_FIELDS).encode('utf-8')).hexdigest()
+
+
+def diff_trails(previous: Dict[str, Dict], current: Dict[str, Dict]) -> List[Dict]:
+    """Compare two {url: trail} snapshots and return added, modified and removed changes."""
+    changes = []
+    for url, trail in current.items():
+        hashes = field_hashes(trail)
+        if url not in previous:
+            changes.append({'op': 'added', 'url': url, 'changed_fields': TRACKED_FIELDS, 'hashes': hashes, 'trail': trail})
+            continue
+        old_hashes = field_hashes(previous[url])
+        changed = [field for field in TRACKED_FIELDS if hashes[field] != old_hashes[field]]
+        if changed:
+            changes.append({'op': 'modified', 'url': url, 'changed_fields': changed, 'hashes': hashes, 'trail': trail})
+    for url, trail in previous.items():
+        if url not in current:
+            changes.append({'op': 'removed', 'url': url, 'changed_fields': [], 'hashes': field_hashes(trail), 'trail': trail})
+    return changes
+
+
+def write_changelog(changes: List[Dict], path: str) -> None:
+    """Write changes as JSON lines, one change per line."""
+    timestamp = datetime.now(timezone.utc).isoformat()
+    with open(path, 'w', encoding='utf-8') as f:
+        for change in changes:
+            f.write(json.dumps({**change, 'detected_at': timestamp}, ensure_ascii=False, default=str) + '\n')
+
+
+def read_changelog(path: str) -> Iterator[Dict]:
+    """Yield the changes stored in a changelog file."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
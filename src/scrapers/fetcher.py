@@ -0,0 +1,182 @@
+import asyncio
+import random
+import time
+import logging
+from collections import Counter
+from urllib.parse import urlparse
+from typing import Dict, Iterable, Optional
+
+import httpx
+from tqdm import tqdm
+
+from scrapers.http_cache import HttpCache
+from scrapers.fixtures import FixtureArchive
+
+logger = logging.getLogger(__name__)
+# httpx logs every request at INFO, which drowns out the scraper's own progress
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Token bucket that spaces out requests to a single host."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it.
+
+        Tokens may go negative: each caller reserves a future slot, so no lock
+        is needed inside a single event loop.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self) -> None:
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class AsyncFetcher:
+    """Concurrent page fetcher with a bounded connection pool, per-host rate limiting and retries."""
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, max_connections: int = 8,
+                 requests_per_second: Optional[float] = 2.0, burst: int = 2, max_retries: int = 3,
+                 backoff: float = 1.0, timeout: float = 10.0, cache: Optional[HttpCache] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 recorder: Optional[FixtureArchive] = None):
+        """
+        Args:
+            requests_per_second: Per-host rate limit, None disables limiting
+            cache: Optional on-disk HTTP cache
+            transport: Custom httpx transport, e.g. ReplayTransport for offline runs
+            recorder: Fixture archive that every fetched page is saved into
+        """
+        self.headers = headers or {}
+        self.max_connections = max_connections
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.cache = cache
+        self.transport = transport
+        self.recorder = recorder
+        # fresh / revalidated / downloaded / cache_miss / failed counts
+        self.stats = Counter()
+
+    async def _throttle(self, url: str) -> None:
+        if self.requests_per_second is not None:
+            await self._bucket(url).acquire()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+        return self.buckets[host]
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            transport=self.transport,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+        )
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    async def _get(self, client: httpx.AsyncClient, url: str) -> Optional[bytes]:
+        """Fetch one URL via the cache, retrying rate limits, server errors and network failures."""
+        entry = self.cache.get(url) if self.cache else None
+        if entry is not None and (self.cache.cache_only or self.cache.is_fresh(entry)):
+            self.stats['fresh'] += 1
+            return entry.body
+        if self.cache and self.cache.cache_only:
+            logger.warning(f"Not in cache (cache-only mode): {url}")
+            self.stats['cache_miss'] += 1
+            return None
+        headers = self.cache.conditional_headers(entry) if entry is not None else {}
+
+        for attempt in range(self.max_retries + 1):
+            await self._throttle(url)
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Error fetching {url}: {e}")
+                    self.stats['failed'] += 1
+                    return None
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                logger.warning(f"HTTP {response.status_code} for {url}, retrying")
+                await asyncio.sleep(self._retry_delay(attempt, response))
+                continue
+            if response.status_code == 304 and entry is not None:
+                self.cache.refresh(entry, response)
+                self.stats['revalidated'] += 1
+                return entry.body
+            if response.is_error:
+                logger.error(f"Error fetching {url}: HTTP {response.status_code}")
+                self.stats['failed'] += 1
+                return None
+            if self.cache:
+                self.cache.store(url, response)
+            self.stats['downloaded'] += 1
+            return response.content
+        return None
+
+    async def _fetch_all(self, urls: Iterable[str], progress: Optional[str] = None) -> Dict[str, Optional[bytes]]:
+        urls = list(dict.fromkeys(urls))
+        semaphore = asyncio.Semaphore(self.max_connections)
+        results: Dict[str, Optional[bytes]] = {}
+
+        async with self._client() as client:
+            async def fetch_one(url: str) -> None:
+                async with semaphore:
+                    results[url] = await self._get(client, url)
+
+            tasks = [asyncio.ensure_future(fetch_one(url)) for url in urls]
+            completed = asyncio.as_completed(tasks)
+            if progress:
+                completed = tqdm(completed, total=len(tasks), desc=progress, unit="page")
+            for task in completed:
+                await task
+
+        if self.recorder is not None:
+            for url, content in results.items():
+                if content is not None:
+                    self.recorder.add(url, content)
+            self.recorder.save()
+
+        return results
+
+    def fetch_all(self, urls: Iterable[str], progress: Optional[str] = None) -> Dict[str, Optional[bytes]]:
+        """Fetch many URLs concurrently. Returns {url: body or None on failure}."""
+        return asyncio.run(self._fetch_all(urls, progress))
+
+    def fetch(self, url: str) -> Optional[bytes]:
+        """Fetch a single URL."""
+        return self.fetch_all([url])[url]
@@ -0,0 +1,66 @@
+import os
+import json
+import hashlib
+import logging
+import zipfile
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = 'index.json'
+
+
+class FixtureArchive:
+    """Compressed zip archive of raw pages keyed by URL.
+
+    Layout: index.json ({url: member name}) plus one deflated member per page.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pages: Dict[str, bytes] = {}
+        if os.path.exists(path):
+            self.load()
+
+    def load(self) -> None:
+        with zipfile.ZipFile(self.path) as archive:
+            index = json.loads(archive.read(INDEX_NAME))
+            self.pages = {url: archive.read(name) for url, name in index.items()}
+        logger.info(f"Loaded {len(self.pages)} fixture pages from {self.path}")
+
+    def get(self, url: str) -> Optional[bytes]:
+        return self.pages.get(url)
+
+    def add(self, url: str, content: bytes) -> None:
+        self.pages[url] = content
+
+    def save(self) -> None:
+        """Write every page to the archive (atomically replacing the old file)."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        index = {}
+        tmp_path = f"{self.path}.tmp"
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            for url, content in sorted(self.pages.items()):
+                name = f"pages/{hashlib.sha256(url.encode('utf-8')).hexdigest()}.html"
+                index[url] = name
+                archive.writestr(name, content)
+            archive.writestr(INDEX_NAME, json.dumps(index, indent=2))
+        os.replace(tmp_path, self.path)
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """httpx transport that answers every request from a fixture archive, without network access."""
+
+    def __init__(self, archive: FixtureArchive):
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        content = self.archive.get(str(request.url))
+        if content is None:
+            return httpx.Response(404, content=b"Not in fixture archive", request=request)
+        return httpx.Response(200, headers={'content-type': 'text/html; charset=utf-8'},
+                              content=content, request=request)
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    """A cached response: body plus the validators needed to revalidate it."""
+
+    def __init__(self, url: str, body: bytes, meta: Dict):
+        self.url = url
+        self.body = body
+        self.meta = meta
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.meta.get('etag')
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.meta.get('last_modified')
+
+
+def parse_cache_control(header: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into {directive: value}."""
+    directives = {}
+    for part in (header or '').split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, value = part.partition('=')
+        directives[name.strip()] = value.strip().strip('"') or None
+    return directives
+
+
+class HttpCache:
+    """On-disk HTTP cache storing bodies with their ETag/Last-Modified validators.
+
+    Each URL is stored as <sha256>.body (the raw page) and <sha256>.json (metadata).
+    """
+
+    def __init__(self, directory: str, cache_only: bool = False, default_ttl: float = 0.0):
+        """
+        Args:
+            directory: Folder for cached pages
+            cache_only: Never touch the network, serve whatever is cached
+            default_ttl: Seconds a response without Cache-Control max-age is considered fresh
+        """
+        self.directory = directory
+        self.cache_only = cache_only
+        self.default_ttl = default_ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return f"{base}.json", f"{base}.body"
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        meta_path, body_path = self._paths(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry for {url}: {e}")
+            return None
+        return CacheEntry(url, body, meta)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """True if the entry can be served without contacting the server."""
+        directives = entry.meta.get('cache_control', {})
+        if 'no-cache' in directives or 'no-store' in directives:
+            return False
+        max_age = directives.get('max-age')
+        ttl = float(max_age) if max_age and max_age.isdigit() else self.default_ttl
+        return time.time() - entry.meta.get('stored_at', 0) < ttl
+
+    def conditional_headers(self, entry: CacheEntry) -> Dict[str, str]:
+        """Validators to send so the server can answer 304 Not Modified."""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def _meta(self, url: str, response: httpx.Response) -> Dict:
+        return {
+            'url': url,
+            'status': response.status_code,
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+            'content_type': response.headers.get('content-type'),
+            'cache_control': parse_cache_control(response.headers.get('cache-control')),
+            'stored_at': time.time(),
+        }
+
+    def _write_meta(self, meta_path: str, meta: Dict) -> None:
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def store(self, url: str, response: httpx.Response) -> None:
+        """Save a full 200 response, unless the server forbids storing it."""
+        meta = self._meta(url, response)
+        if 'no-store' in meta['cache_control']:
+            return
+        meta_path, body_path = self._paths(url)
+        tmp_path = f"{body_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_path, body_path)
+        self._write_meta(meta_path, meta)
+
+    def refresh(self, entry: CacheEntry, response: httpx.Response) -> None:
+        """Record a 304 revalidation: keep the body, update validators and freshness."""
+        meta = self._meta(entry.url, response)
+        meta['status'] = entry.meta.get('status', 200)
+        meta['etag'] = meta['etag'] or entry.etag
+        meta['last_modified'] = meta['last_modified'] or entry.last_modified
+        meta['content_type'] = meta['content_type'] or entry.meta.get('content_type')
+        meta_path, _ = self._paths(entry.url)
+        self._write_meta(meta_path, meta)
+        entry.meta = meta
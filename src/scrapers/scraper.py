@@ -1,26 +1,123 @@
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import pandas as pd
-import time
 import logging
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Optional, Set
-from tqdm import tqdm
+from typing import Iterable, List, Dict, Optional, Set
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from scrapers.fetcher import AsyncFetcher
+from scrapers.http_cache import HttpCache
+from scrapers.fixtures import FixtureArchive, ReplayTransport
+from scrapers.changelog import diff_trails, write_changelog, field_hashes, content_hash
+from processing.trail_catalog import TrailCatalog
+from processing.trail_store import (
+    RAW_TRAIL_SCHEMA, is_csv, trails_exist, read_trails, write_trails, append_trails
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
+# lxml is several times faster than html.parser; strainers build only the subtree we read
+PARSER = 'lxml'
+TRAILS_LIST_STRAINER = SoupStrainer('div', id='trails-list')
+TRAIL_INFO_STRAINER = SoupStrainer('div', class_='trail-info')
+
+
+def trail_info_description(soup: BeautifulSoup) -> str:
+    """Extract the description from the div.trail-info section, if any."""
+    # Look for the main trail info section
+    trail_info = soup.find('div', class_='trail-info')
+    if trail_info:
+        # Get all paragraphs within trail-info
+        paragraphs = trail_info.find_all('p')
+        description_parts = []
+        
+        for p in paragraphs:
+            text = p.get_text(strip=True)
+            # Skip short paragraphs and common elements
+            if len(text) > 30 and not any(skip in text.lower() for skip in ['share', 'facebook', 'twitter', 'email']):
+                description_parts.append(text)
+        
+        if description_parts:
+            return ' '.join(description_parts)
+    
+    return ""
+
+
+def description_from_soup(soup: BeautifulSoup) -> str:
+    """Extract the trail description from a fully parsed trail page."""
+    description = trail_info_description(soup)
+    if description:
+        return description
+    
+    # Fallback: look for main content area
+    content_area = soup.find('div', class_='content') or soup.find('main') or soup.find('article')
+    if content_area:
+        paragraphs = content_area.find_all('p')
+        description_parts = []
+        
+        for p in paragraphs[:5]:  # Take first 5 paragraphs max
+            text = p.get_text(strip=True)
+            if len(text) > 30:
+                description_parts.append(text)
+        
+        return ' '.join(description_parts)
+    
+    return ""
+
+
+def parse_trail_description(content: Optional[bytes]) -> str:
+    """Parse a raw trail page into its description (top-level so worker processes can run it)."""
+    if not content:
+        return ""
+    # Fast path: only build div.trail-info; fall back to the whole document if it has no description
+    description = trail_info_description(BeautifulSoup(content, PARSER, parse_only=TRAIL_INFO_STRAINER))
+    if description:
+        return description
+    return description_from_soup(BeautifulSoup(content, PARSER))
+
+
+def parse_trails_list(content: bytes) -> BeautifulSoup:
+    """Parse only the #trails-list container of a listing page."""
+    return BeautifulSoup(content, PARSER, parse_only=TRAILS_LIST_STRAINER)
+
+
 class VancouverTrailsScraper:
-    def __init__(self, base_url: str = "https://www.vancouvertrails.com"):
+    def __init__(self, base_url: str = "https://www.vancouvertrails.com", max_connections: int = 8,
+                 requests_per_second: float = 2.0, parse_workers: Optional[int] = None,
+                 cache_dir: Optional[str] = None, cache_only: bool = False,
+                 record_fixtures: Optional[str] = None, replay_fixtures: Optional[str] = None,
+                 catalog_path: Optional[str] = None):
         self.base_url = base_url
         self.trails_url = f"{base_url}/trails/"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        # Fixture archives: record every fetched page, or replay them offline at full speed
+        recorder = FixtureArchive(record_fixtures) if record_fixtures else None
+        transport = None
+        if replay_fixtures:
+            transport = ReplayTransport(FixtureArchive(replay_fixtures))
+            requests_per_second = None
+        
+        # Politeness budget: at most max_connections in flight and requests_per_second per host
+        self.fetcher = AsyncFetcher(
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            },
+            max_connections=max_connections,
+            requests_per_second=requests_per_second,
+            # Optional on-disk cache: conditional requests on repeat runs, or fully offline with cache_only
+            cache=HttpCache(cache_dir, cache_only=cache_only) if cache_dir and not replay_fixtures else None,
+            transport=transport,
+            recorder=recorder,
+        )
+        self.parse_workers = parse_workers if parse_workers is not None else (os.cpu_count() or 1)
         self.trails_data = []
         self.existing_trails: Set[str] = set()
+        # Optional SQLite trail catalog: indexed dedup and transactional upserts of every save
+        self.catalog = TrailCatalog(catalog_path) if catalog_path else None
         
         # Filter URLs for feature detection
         self.filter_urls = {
@@ -30,15 +127,12 @@ class VancouverTrailsScraper:
         }
         
 
-    def get_page(self, url: str) -> Optional[BeautifulSoup]:
-        """Fetch and parse a webpage."""
-        try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching {url}: {e}")
+    def get_page(self, url: str, parse_only: Optional[SoupStrainer] = None) -> Optional[BeautifulSoup]:
+        """Fetch and parse a webpage, optionally only the parts matched by parse_only."""
+        content = self.fetcher.fetch(url)
+        if content is None:
             return None
+        return BeautifulSoup(content, PARSER, parse_only=parse_only)
 
     def extract_trail_data(self, soup: BeautifulSoup) -> List[Dict]:
         """Extract trail data from the trails list structure."""
@@ -117,11 +211,15 @@ class VancouverTrailsScraper:
         """Get sets of trail names for each feature by scraping filtered pages."""
         feature_trails = {}
         
+        # Fetch all filter pages concurrently
+        logger.info(f"Scraping feature pages: {list(self.filter_urls.values())}")
+        pages = self.fetcher.fetch_all(self.filter_urls.values())
+        
         for feature, filter_url in self.filter_urls.items():
-            logger.info(f"Scraping {feature} trails from {filter_url}")
-            soup = self.get_page(filter_url)
+            content = pages.get(filter_url)
             
-            if soup:
+            if content:
+                soup = parse_trails_list(content)
                 trails = self.extract_trail_data(soup)
                 trail_names = {trail['name'] for trail in trails if trail.get('name')}
                 feature_trails[feature] = trail_names
@@ -130,9 +228,6 @@ class VancouverTrailsScraper:
                 # Debug: Show first few trail names for this feature
                 sample_trails = list(trail_names)[:3]
                 logger.info(f"Sample {feature} trails: {sample_trails}")
-                
-                # Be respectful to the server
-                time.sleep(1)
             else:
                 feature_trails[feature] = set()
                 logger.warning(f"Failed to load {feature} filter page")
@@ -142,46 +237,33 @@ class VancouverTrailsScraper:
 
     def extract_trail_description(self, trail_url: str) -> str:
         """Extract detailed description from individual trail page."""
-        soup = self.get_page(trail_url)
-        if not soup:
-            return ""
-        
-        # Look for the main trail info section
-        trail_info = soup.find('div', class_='trail-info')
-        if trail_info:
-            # Get all paragraphs within trail-info
-            paragraphs = trail_info.find_all('p')
-            description_parts = []
-            
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                # Skip short paragraphs and common elements
-                if len(text) > 30 and not any(skip in text.lower() for skip in ['share', 'facebook', 'twitter', 'email']):
-                    description_parts.append(text)
-            
-            if description_parts:
-                return ' '.join(description_parts)
-        
-        # Fallback: look for main content area
-        content_area = soup.find('div', class_='content') or soup.find('main') or soup.find('article')
-        if content_area:
-            paragraphs = content_area.find_all('p')
-            description_parts = []
-            
-            for p in paragraphs[:5]:  # Take first 5 paragraphs max
-                text = p.get_text(strip=True)
-                if len(text) > 30:
-                    description_parts.append(text)
-            
-            return ' '.join(description_parts)
+        return parse_trail_description(self.fetcher.fetch(trail_url))
+
+    def extract_trail_descriptions(self, trail_urls: List[str]) -> Dict[str, str]:
+        """Fetch trail pages concurrently and parse them in parallel. Returns {url: description},
+        leaving out pages that failed to fetch."""
+        pages = self.fetcher.fetch_all(trail_urls, progress="Fetching descriptions")
+        failed = [url for url, content in pages.items() if content is None]
+        if failed:
+            logger.warning(f"Failed to fetch {len(failed)} trail pages")
+        urls = [url for url, content in pages.items() if content is not None]
+        contents = [pages[url] for url in urls]
         
-        return ""
+        if self.parse_workers > 1 and len(urls) > 1:
+            with ProcessPoolExecutor(max_workers=self.parse_workers) as executor:
+                descriptions = list(executor.map(parse_trail_description, contents, chunksize=8))
+        else:
+            descriptions = [parse_trail_description(content) for content in contents]
+        
+        return dict(zip(urls, descriptions))
 
     def load_existing_trails(self, csv_file: str) -> None:
-        """Load existing trail names from CSV to avoid re-scraping."""
-        if os.path.exists(csv_file):
+        """Load existing trail names (Parquet dataset or CSV) to avoid re-scraping."""
+        if self.catalog is not None and self.catalog.count():
+            logger.info(f"Checking existing trails against catalog {self.catalog.path}")
+        elif trails_exist(csv_file):
             try:
-                df = pd.read_csv(csv_file)
+                df = read_trails(csv_file, columns=['name'])
                 if 'name' in df.columns:
                     self.existing_trails = set(df['name'].dropna())
                     logger.info(f"Loaded {len(self.existing_trails)} existing trails from {csv_file}")
@@ -190,21 +272,22 @@ class VancouverTrailsScraper:
             except Exception as e:
                 logger.error(f"Error loading existing trails: {e}")
         else:
-            logger.info(f"No existing CSV file found at {csv_file}")
+            logger.info(f"No existing trail data found at {csv_file}")
 
-    def scrape_all_trails(self, csv_file: str = "data/vancouver_trails.csv", test_mode: bool = False) -> List[Dict]:
-        """Main method to scrape all trail data."""
-        logger.info(f"Starting to scrape trails from {self.trails_url}")
-        
-        # Load existing trails to avoid re-scraping
-        self.load_existing_trails(csv_file)
-        
+    def is_existing_trail(self, name: Optional[str]) -> bool:
+        """Whether a trail was scraped before (indexed catalog lookup when a catalog is populated)."""
+        if self.catalog is not None and not self.existing_trails:
+            return self.catalog.has_name(name)
+        return name in self.existing_trails
+
+    def scrape_trail_listing(self) -> List[Dict]:
+        """Scrape the main trails page and feature filter pages (no descriptions)."""
         # Get feature data by scraping filtered pages
         print("\n📋 Extracting trail features from filter pages...")
         feature_trails = self.get_trails_with_features()
         
         # Get the main trails page
-        soup = self.get_page(self.trails_url)
+        soup = self.get_page(self.trails_url, parse_only=TRAILS_LIST_STRAINER)
         if not soup:
             logger.error("Failed to load main trails page")
             return []
@@ -225,8 +308,89 @@ class VancouverTrailsScraper:
                 # Simple logic: no_dogs_allowed is the opposite of dog_friendly
                 trail['no_dogs_allowed'] = not trail['dog_friendly']
         
+        return all_trails
+
+    def load_trail_hashes(self, csv_file: str) -> Dict[str, Optional[str]]:
+        """Load {url: content_hash} of the previous scrape, reading only those two columns."""
+        if not trails_exist(csv_file):
+            return {}
+        df = read_trails(csv_file, columns=['url', 'content_hash'])
+        hashes = df['content_hash'] if 'content_hash' in df.columns else [None] * len(df)
+        return {url: (h if isinstance(h, str) else None) for url, h in zip(df['url'], hashes) if isinstance(url, str)}
+
+    def load_trail_snapshot(self, csv_file: str, urls: Optional[Set[str]] = None) -> Dict[str, Dict]:
+        """Load the previous scrape (optionally only `urls`) as {url: trail}."""
+        if not trails_exist(csv_file):
+            return {}
+        if is_csv(csv_file):
+            df = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+            if urls is not None:
+                df = df[df['url'].isin(urls)]
+        else:
+            df = read_trails(csv_file, urls=urls)
+        return {row['url']: row for row in df.to_dict('records') if row.get('url')}
+
+    def scrape_changes(self, csv_file: str = "data/vancouver_trails.csv",
+                       changelog_file: str = "data/trail_changes.jsonl",
+                       partition_by: Optional[List[str]] = None) -> List[Dict]:
+        """Re-scrape the full catalog, write a changelog of added/modified/removed trails
+        against csv_file, and replace csv_file with the new snapshot."""
+        logger.info(f"Starting change detection against {csv_file}")
+        previous_hashes = self.load_trail_hashes(csv_file)
+        
+        all_trails = self.scrape_trail_listing()
+        if not all_trails:
+            # Never report the whole catalog as removed because a page failed to load
+            logger.error("No trails scraped, skipping change detection")
+            return []
+        
+        # Descriptions are needed for every trail to detect edits; the HTTP cache keeps this cheap
+        print(f"\n🔄 Checking descriptions for {len(all_trails)} trails...")
+        descriptions = self.extract_trail_descriptions([trail['url'] for trail in all_trails if trail.get('url')])
+        current = {trail['url']: trail for trail in all_trails if trail.get('url')}
+        
+        # A page that failed to fetch says nothing about the trail: keep its previous description,
+        # and leave new trails for the next run rather than adding them without one
+        failed = set(current) - set(descriptions)
+        kept = self.load_trail_snapshot(csv_file, urls=failed & set(previous_hashes)) if failed else {}
+        for url in failed - set(kept):
+            del current[url]
+        for url, trail in current.items():
+            trail['description'] = descriptions[url] if url in descriptions else kept[url].get('description') or ""
+        if failed:
+            print(f"⚠️  {len(failed)} trail pages failed to fetch: kept {len(kept)} previous descriptions, "
+                  f"skipped {len(failed) - len(kept)} new trails")
+        
+        # Compare whole-record hashes first; only changed or removed trails are loaded in full
+        changed = {url for url, trail in current.items()
+                   if url not in previous_hashes or previous_hashes[url] != content_hash(field_hashes(trail))}
+        removed = set(previous_hashes) - set(current)
+        previous = self.load_trail_snapshot(csv_file, urls=(changed | removed) & set(previous_hashes))
+        # previous holds exactly the changed and removed trails, so the diff over this subset is complete
+        changes = diff_trails(previous, {url: current[url] for url in changed})
+        write_changelog(changes, changelog_file)
+        
+        counts = {op: sum(change['op'] == op for change in changes) for op in ('added', 'modified', 'removed')}
+        print(f"\n📝 {counts['added']} added, {counts['modified']} modified, {counts['removed']} removed -> {changelog_file}")
+        
+        self.trails_data = list(current.values())
+        self.save_trails(csv_file, replace=True, partition_by=partition_by, removed_urls=removed)
+        logger.info(f"HTTP fetch summary: {dict(self.fetcher.stats)}")
+        return changes
+
+    def scrape_all_trails(self, csv_file: str = "data/vancouver_trails.csv", test_mode: bool = False) -> List[Dict]:
+        """Main method to scrape all trail data."""
+        logger.info(f"Starting to scrape trails from {self.trails_url}")
+        
+        # Load existing trails to avoid re-scraping
+        self.load_existing_trails(csv_file)
+        
+        all_trails = self.scrape_trail_listing()
+        if not all_trails:
+            return []
+        
         # Filter out trails that already exist
-        new_trails = [trail for trail in all_trails if trail.get('name') not in self.existing_trails]
+        new_trails = [trail for trail in all_trails if not self.is_existing_trail(trail.get('name'))]
         
         if not new_trails:
             print(f"\n✅ No new trails found! All {len(all_trails)} trails already exist in CSV.")
@@ -242,35 +406,60 @@ class VancouverTrailsScraper:
         
         # Enhance each NEW trail with detailed description
         print(f"\n🔄 Scraping detailed descriptions for {len(new_trails)} new trails...")
-        for trail in tqdm(new_trails, desc="Extracting descriptions", unit="trail"):
-            if trail.get('url'):
-                description = self.extract_trail_description(trail['url'])
-                trail['description'] = description
-                
-                # Be respectful to the server
-                time.sleep(1)
-            else:
-                trail['description'] = ""
+        descriptions = self.extract_trail_descriptions([trail['url'] for trail in new_trails if trail.get('url')])
+        for trail in new_trails:
+            trail['description'] = descriptions.get(trail.get('url'), "")
         
         self.trails_data = new_trails
+        logger.info(f"HTTP fetch summary: {dict(self.fetcher.stats)}")
         return new_trails
 
-    def save_to_csv(self, filename: str = "vancouver_trails.csv") -> None:
-        """Save scraped data to CSV file (append new trails to existing)."""
-        if not self.trails_data:
-            logger.warning("No new data to save")
-            return
-        
+    def trails_dataframe(self) -> pd.DataFrame:
+        """Scraped trails as a DataFrame in the standard column order."""
         new_df = pd.DataFrame(self.trails_data)
         
         # Reorder columns for better readability
         column_order = ['name', 'rating', 'region', 'difficulty', 'time', 'distance', 'elevation', 'season', 'dog_friendly', 'no_dogs_allowed', 'public_transit', 'camping', 'url', 'description']
         existing_columns = [col for col in column_order if col in new_df.columns]
         other_columns = [col for col in new_df.columns if col not in column_order]
-        new_df = new_df[existing_columns + other_columns]
+        return new_df[existing_columns + other_columns]
+
+    def save_trails(self, filename: str = "vancouver_trails.parquet", replace: bool = False,
+                    partition_by: Optional[List[str]] = None, removed_urls: Iterable[str] = ()) -> None:
+        """Save scraped data to a Parquet dataset (appending a new fragment, or replacing it
+        with a full snapshot). CSV paths are written with save_to_csv.
+        
+        The catalog, if any, is updated in one transaction: scraped trails are upserted
+        and removed_urls deleted."""
+        if self.catalog is not None:
+            written = self.catalog.upsert_trails(self.trails_data, removed_urls)
+            logger.info(f"Catalog {self.catalog.path}: {written} rows written")
+        if is_csv(filename):
+            self.save_to_csv(filename, replace=replace)
+            return
+        if not self.trails_data:
+            logger.warning("No new data to save")
+            return
+        
+        new_df = self.trails_dataframe()
+        new_df['content_hash'] = [content_hash(field_hashes(trail)) for trail in self.trails_data]
+        if replace:
+            write_trails(new_df, filename, RAW_TRAIL_SCHEMA, partition_by)
+            logger.info(f"Saved {len(new_df)} trails to {filename}")
+        else:
+            append_trails(new_df, filename, RAW_TRAIL_SCHEMA, partition_by)
+            logger.info(f"Appended {len(new_df)} new trails to {filename}")
+
+    def save_to_csv(self, filename: str = "vancouver_trails.csv", replace: bool = False) -> None:
+        """Save scraped data to CSV file (append new trails to existing, or replace it with a full snapshot)."""
+        if not self.trails_data:
+            logger.warning("No new data to save")
+            return
+        
+        new_df = self.trails_dataframe()
         
         # If CSV exists, append new data; otherwise create new file
-        if os.path.exists(filename):
+        if os.path.exists(filename) and not replace:
             try:
                 existing_df = pd.read_csv(filename)
                 combined_df = pd.concat([existing_df, new_df], ignore_index=True)
@@ -1,40 +1,78 @@
 import sys
 import os
+import time
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from rag.vector_search import TrailVectorDB
-from rag.generate_recommendations import generate_trail_recommendation
+from rag.generate_recommendations import cached_trail_recommendation
+from analytics.query_log import get_query_log
 from llm.client import llm_function
 
-def recommend_trails(query):
+@lru_cache(maxsize=None)
+def get_vector_db() -> TrailVectorDB:
+    """Shared vector database for every request in this process"""
+    return TrailVectorDB(
+        host=os.getenv('QDRANT_HOST', 'localhost'),
+        port=int(os.getenv('QDRANT_PORT', '6333'))
+    )
+
+def format_trails(search_results) -> str:
+    """Markdown list of retrieved trails, shown while the recommendation is generated"""
+    lines = []
+    for result in search_results:
+        trail = result.payload
+        lines.append(
+            f"- **[{trail.get('name', 'Unknown')}]({trail.get('url', '')})** · {trail.get('region', 'N/A')} · "
+            f"{trail.get('difficulty', 'N/A')} · {trail.get('distance', 'N/A')} km · {trail.get('time', 'N/A')} h"
+        )
+    return "\n".join(lines)
+
+def recommendation_events(query):
+    """Yield ("trails", search_results) as soon as search finishes, then ("text", chunk) for each answer chunk
+
+    A failure, even after part of the answer was streamed, ends with ("error", exception).
+    """
     try:
         if not query:
-            yield "Please enter your question"
+            yield "text", "Please enter your question"
             return
-    
-        vector_db = TrailVectorDB(
-            host=os.getenv('QDRANT_HOST', 'localhost'),
-            port=int(os.getenv('QDRANT_PORT', '6333'))
-        )
 
+        vector_db = get_vector_db()
         search_results = vector_db.search_trails(query, limit=3)
-        
+        # Read before yielding: the generator may resume on another thread
+        filters, timings = vector_db.last_filters, vector_db.last_timings
+        yield "trails", search_results
+
         if not search_results:
-            yield "I couldn't find any trails matching your criteria. Try a different search."
+            yield "text", "I couldn't find any trails matching your criteria. Try a different search."
             return
-        
-        # Use streaming for recommendation generation
-        recommendation_stream = generate_trail_recommendation(query, search_results, llm_function)
-        
-        # Accumulate the streamed response
-        full_response = ""
-        for chunk in recommendation_stream:
-            full_response += chunk
-            yield full_response
-    
+
+        # Use streaming for recommendation generation (a cached answer arrives in one chunk)
+        generate_start = time.perf_counter()
+        for chunk in cached_trail_recommendation(query, search_results, llm_function, vector_db.query_cache):
+            yield "text", chunk
+
+        query_log = get_query_log()
+        if query_log is not None:
+            query_log.record(query, filters, search_results,
+                             {**timings, 'generate': time.perf_counter() - generate_start}, 'ui', 3)
+
     except Exception as e:
         print(f"Error in recommend_trails: {e}")
-        yield f'Error: {str(e)}'
\ No newline at end of file
+        yield "error", e
+
+def recommend_trails(query):
+    """Stream the recommendation as deltas; join the chunks for the full answer
+
+    Raises:
+        RuntimeError: If search or generation failed, chained to the original exception
+    """
+    for kind, value in recommendation_events(query):
+        if kind == "text":
+            yield value
+        elif kind == "error":
+            raise RuntimeError(f"Recommendation failed: {value}") from value
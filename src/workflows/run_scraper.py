@@ -11,6 +11,7 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from scrapers.scraper import VancouverTrailsScraper
+from processing.trail_store import RAW_TRAIL_SCHEMA, migrate_csv, export_csv, read_trails
 
 def main():
     print("🏔️  Vancouver Trails Scraper")
@@ -19,16 +20,65 @@ def main():
     # Test mode - only scrape 10 trails
     TEST_MODE = False
     
-    scraper = VancouverTrailsScraper()
+    # Politeness budget for vancouvertrails.com
+    MAX_CONNECTIONS = 8
+    REQUESTS_PER_SECOND = 2.0
+    
+    # On-disk HTTP cache: repeat runs only revalidate pages; CACHE_ONLY never touches the network
+    CACHE_DIR = "../../data/http_cache"
+    CACHE_ONLY = False
+    
+    # Fixture archive: SCRAPER_FIXTURES_MODE=record saves every fetched page into it,
+    # SCRAPER_FIXTURES_MODE=replay serves the scrape from it without network access
+    FIXTURES_MODE = os.getenv("SCRAPER_FIXTURES_MODE")
+    FIXTURES_PATH = os.getenv("SCRAPER_FIXTURES_PATH", "../../data/fixtures/vancouvertrails.zip")
+    
+    # Change detection: re-scrape everything and write a change log of added, modified
+    # and removed trails for incremental vector ingestion (otherwise only new trails are scraped)
+    DETECT_CHANGES = os.getenv("SCRAPER_DETECT_CHANGES", "false").lower() == "true"
+    CHANGELOG_FILE = "../../data/trail_changes.jsonl"
+    
+    # Typed Parquet dataset is the source of truth; the CSV is re-exported after every run.
+    # PARTITION_BY = ['region'] writes one hive partition per region.
+    DATA_FILE = "../../data/vancouver_trails.parquet"
+    CSV_FILE = "../../data/vancouver_trails.csv"
+    PARTITION_BY = None
+    
+    # SQLite trail catalog kept in sync with every save (served by GET /api/trails/<id>)
+    CATALOG_PATH = os.getenv("TRAIL_CATALOG_PATH", "../../data/trails.db")
+    
+    scraper = VancouverTrailsScraper(
+        max_connections=MAX_CONNECTIONS,
+        requests_per_second=REQUESTS_PER_SECOND,
+        cache_dir=CACHE_DIR,
+        cache_only=CACHE_ONLY,
+        record_fixtures=FIXTURES_PATH if FIXTURES_MODE == "record" else None,
+        replay_fixtures=FIXTURES_PATH if FIXTURES_MODE == "replay" else None,
+        catalog_path=CATALOG_PATH
+    )
     
     try:
-        csv_file = "../../data/vancouver_trails.csv"
-        trails = scraper.scrape_all_trails(csv_file, test_mode=TEST_MODE)
+        if migrate_csv(CSV_FILE, DATA_FILE, RAW_TRAIL_SCHEMA, PARTITION_BY):
+            print(f"📦 Converted {CSV_FILE} to {DATA_FILE}")
+        if scraper.catalog.count() == 0 and os.path.exists(DATA_FILE):
+            written = scraper.catalog.upsert_trails(read_trails(DATA_FILE).to_dict('records'))
+            print(f"📦 Loaded {written} trails into catalog {CATALOG_PATH}")
+        
+        if DETECT_CHANGES:
+            changes = scraper.scrape_changes(DATA_FILE, CHANGELOG_FILE, PARTITION_BY)
+            if changes:
+                export_csv(DATA_FILE, CSV_FILE)
+            print(f"\n✅ Change detection complete: {len(changes)} changes")
+            print(f"📄 Change log saved to: {CHANGELOG_FILE}")
+            return 0
+        
+        trails = scraper.scrape_all_trails(DATA_FILE, test_mode=TEST_MODE)
         
         if trails:
-            scraper.save_to_csv(csv_file)
+            scraper.save_trails(DATA_FILE, partition_by=PARTITION_BY)
+            export_csv(DATA_FILE, CSV_FILE)
             print(f"\n✅ Successfully scraped {len(trails)} trails!")
-            print(f"📄 Data saved to: {csv_file}")
+            print(f"📄 Data saved to: {DATA_FILE} (CSV export: {CSV_FILE})")
             
             # Show summary statistics
             print(f"\n📊 Summary:")
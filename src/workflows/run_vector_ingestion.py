@@ -6,6 +6,7 @@ Executes trail data ingestion into Qdrant
 
 import os
 import sys
+import time
 
 # Suppress HuggingFace warnings
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -13,7 +14,8 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from rag.vector_search import TrailVectorDB
+from rag.vector_search import TrailVectorDB, COLLECTION_NAME
+from processing.trail_catalog import TrailCatalog, TRAIL_CATALOG_PATH
 from processing.query_parser import QueryParser
 from llm.client import llm_function
 
@@ -24,15 +26,33 @@ def main():
         print("🏔️  Vector Database Ingestion Workflow")
         print("=" * 50)
         
+        # Use the trail catalog for dedup when there is a writable one
+        catalog = None
+        if os.path.exists(TRAIL_CATALOG_PATH) and os.access(TRAIL_CATALOG_PATH, os.W_OK):
+            catalog = TrailCatalog(TRAIL_CATALOG_PATH)
+        
         # Initialize vector database
-        vector_db = TrailVectorDB()
+        vector_db = TrailVectorDB(catalog=catalog)
         
         # Create collection (handles existence check internally)
         is_new_collection = vector_db.create_collection()
+        if is_new_collection and catalog is not None:
+            catalog.clear_indexed()
         
-        # Ingest trail data (handles incremental ingestion internally)
-        csv_path = "data/vancouver_trails_clean.csv"
-        final_count = vector_db.ingest_trails(csv_path)
+        # Apply the scraper's change log when there is one, otherwise ingest new trails
+        changelog_path = "data/trail_changes.jsonl"
+        if os.path.exists(changelog_path) and not is_new_collection:
+            vector_db.apply_changelog(changelog_path)
+            # Archive the applied log so it is not replayed on the next run
+            os.replace(changelog_path, f"{changelog_path}.{time.strftime('%Y%m%d-%H%M%S')}")
+            final_count = vector_db.client.get_collection(COLLECTION_NAME).points_count
+        else:
+            # Ingest trail data (handles incremental ingestion internally)
+            # Prefer the Parquet dataset written by the cleaning step, fall back to the CSV export
+            csv_path = "data/vancouver_trails_clean.parquet"
+            if not os.path.exists(csv_path):
+                csv_path = "data/vancouver_trails_clean.csv"
+            final_count = vector_db.ingest_trails(csv_path)
         
         print(f"\n🎯 Vector database ingestion complete!")
         print(f"   Total trails: {final_count}")
@@ -12,6 +12,14 @@ def create_app(test_config=None):
         QDRANT_HOST=os.getenv('QDRANT_HOST'),
         QDRANT_PORT=int(os.getenv('QDRANT_PORT')),
         OPENAI_API_KEY=os.getenv('OPENAI_API_KEY'),
+        TRAIL_CATALOG_PATH=os.getenv('TRAIL_CATALOG_PATH', 'data/trails.db'),
+        RECOMMEND_BATCH_MAX_QUERIES=int(os.getenv('RECOMMEND_BATCH_MAX_QUERIES', '20')),
+        RECOMMEND_BATCH_CONCURRENCY=int(os.getenv('RECOMMEND_BATCH_CONCURRENCY', '4')),
+        SESSION_STORE_PATH=os.getenv('SESSION_STORE_PATH'),
+        SESSION_TTL=float(os.getenv('SESSION_TTL', '1800')),
+        SESSION_CANDIDATES=int(os.getenv('SESSION_CANDIDATES', '30')),
+        QUERY_LOG_PATH=os.getenv('QUERY_LOG_PATH', 'data/query_log.jsonl'),
+        WARM_CACHE_ON_STARTUP=os.getenv('WARM_CACHE_ON_STARTUP', '0') == '1',
     )
 
     if test_config is None:
@@ -1,13 +1,22 @@
 from flask import Blueprint, request, jsonify, current_app, g
 import sys
 import os
+import time
 import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # import RAG components
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from rag.vector_search import TrailVectorDB
-from rag.generate_recommendations import generate_trail_recommendation
+from rag.vector_search import TrailVectorDB, payload_matches_filters
+from processing.trail_catalog import TrailCatalog
+from rag.model_artifacts import ModelArtifactError
+from rag.metrics import metrics
+from rag.facet_index import NUMERIC_FIELDS, BOOLEAN_FIELDS, FacetIndex
+from rag.session_store import Session, compact_candidates, create_session_store, rerank, rerank_cue
+from rag.generate_recommendations import cached_trail_recommendation, generate_followup_recommendation
+from analytics.query_log import get_query_log
 from llm.client import llm_function
 
 bp = Blueprint('api', __name__, url_prefix='/api')
@@ -23,8 +32,38 @@ def get_vector_db():
     return g.vector_db
 
 
+def get_catalog():
+    """Get a read-only trail catalog connection for this request, or None if there is no catalog"""
+    if 'catalog' not in g:
+        path = current_app.config['TRAIL_CATALOG_PATH']
+        g.catalog = TrailCatalog(path, read_only=True) if os.path.exists(path) else None
+    return g.catalog
+
+
+def close_catalog(e=None):
+    catalog = g.pop('catalog', None)
+    if catalog is not None:
+        catalog.close()
+
+
+def get_session_store():
+    return current_app.extensions['session_store']
+
+
+def log_query(query, filters, search_results, timings, source, limit):
+    """Hand a served query to the background query log, if logging is on"""
+    query_log = current_app.extensions['query_log']
+    if query_log is not None:
+        query_log.record(query, filters, search_results, timings, source, limit)
+
+
 def init_app(app):
     """Initialize services with the Flask app"""
+    app.teardown_appcontext(close_catalog)
+    app.extensions['session_store'] = create_session_store(app.config['SESSION_STORE_PATH'],
+                                                           app.config['SESSION_TTL'])
+    app.extensions['query_log'] = get_query_log(app.config['QUERY_LOG_PATH'])
+
     # Test connections on startup
     with app.app_context():
         try:
@@ -34,6 +73,18 @@ def init_app(app):
                 port=app.config['QDRANT_PORT']
             )
             print(f"Connected to Qdrant at {app.config['QDRANT_HOST']}:{app.config['QDRANT_PORT']}")
+            if app.config['WARM_CACHE_ON_STARTUP']:
+                # Warm the hot queries in the background; the model isn't loaded a second time for it
+                from analytics.warm_cache import warm_cache
+                threading.Thread(
+                    target=warm_cache,
+                    kwargs={'vector_db': vector_db, 'log_path': app.config['QUERY_LOG_PATH'], 'embed_in_process': False},
+                    name='warm-cache',
+                    daemon=True
+                ).start()
+        except ModelArtifactError:
+            # Missing pinned model: refuse to start instead of failing every request
+            raise
         except Exception as e:
             print(f"Failed to connect to Qdrant: {e}")
             
@@ -47,8 +98,12 @@ def init_app(app):
 @bp.route('/recommend', methods=['POST'])
 def recommend_trails():
     """
-    Request: {"query": "I want an easy hike with my dog"}
-    Response: {"recommendation": "AI generated response..."}
+    Request: {"query": "I want an easy hike with my dog", "conversation_id": "..." (optional)}
+    Response: {"conversation_id": "...", "query": "...", "recommendation": "AI generated response...",
+               "refined": false}
+
+    Passing back the conversation_id of a live conversation treats the query as a follow-up
+    ("which of those allow dogs?"), answered from the conversation's cached candidates.
     """
     try:
         data = request.get_json()
@@ -58,10 +113,14 @@ def recommend_trails():
             
         query = data['query']
 
-        conversation_id = str(uuid.uuid4())
+        conversation_id = data.get('conversation_id') or str(uuid.uuid4())
+        session = get_session_store().get(conversation_id) if data.get('conversation_id') else None
+        if session is not None:
+            return jsonify(_refine(session, query))
     
         vector_db = get_vector_db()
-        search_results = vector_db.search_trails(query, limit=5)
+        candidates = vector_db.search_trails(query, limit=current_app.config['SESSION_CANDIDATES'])
+        search_results = candidates[:5]
         
         if not search_results:
             return jsonify({
@@ -69,9 +128,11 @@ def recommend_trails():
                 'recommendation': "I couldn't find any trails matching your criteria. Try a different search."
             })
         
-        # Get the streaming recommendation and collect all chunks
+        # Get the streaming recommendation (or the cached answer) and collect all chunks
         print(f"About to call generate_trail_recommendation with {len(search_results)} results")
-        recommendation_stream = generate_trail_recommendation(query, search_results, llm_function)
+        generate_start = time.perf_counter()
+        recommendation_stream = cached_trail_recommendation(query, search_results, llm_function,
+                                                            vector_db.query_cache)
         print(f"Got recommendation_stream: {type(recommendation_stream)}")
         
         chunks = []
@@ -81,11 +142,23 @@ def recommend_trails():
         
         recommendation = "".join(chunks)
         print(f"Final recommendation length: {len(recommendation)}")
+        log_query(query, vector_db.last_filters, search_results,
+                  {**vector_db.last_timings, 'generate': time.perf_counter() - generate_start}, 'api', 5)
+
+        get_session_store().put(Session(
+            conversation_id=conversation_id,
+            query=query,
+            filters=vector_db.last_filters,
+            candidates=compact_candidates(candidates),
+            query_vector=vector_db.last_query_vector,
+            last_answer=recommendation
+        ))
         
         result = {
             "conversation_id": conversation_id,
             'query': query,
-            'recommendation': recommendation
+            'recommendation': recommendation,
+            'refined': False
         }
 
         return jsonify(result)
@@ -95,6 +168,217 @@ def recommend_trails():
         return jsonify({'error': f'Error: {str(e)}'}), 500
 
 
+def _refine(session, followup):
+    """Answer a follow-up from the session's candidates: narrow them with the follow-up's
+    filters and re-rank them locally, searching again only if none are left"""
+    vector_db = get_vector_db()
+    filters = {**session.filters, **vector_db.parse_filters(followup)}
+    candidates = [c for c in session.candidates if payload_matches_filters(c['payload'], filters)]
+    if not candidates:
+        # The refinement ruled out every cached trail: search the collection with the original intent
+        points = vector_db.search_by_vector(session.query_vector or session.query, filters,
+                                            limit=current_app.config['SESSION_CANDIDATES'])
+        candidates = compact_candidates(points)
+        metrics.increment('session.research')
+    cue = rerank_cue(followup)
+    if cue:
+        candidates = rerank(candidates, *cue)
+
+    search_results = vector_db.get_trails({c['id']: c['score'] for c in candidates[:5]})
+    generate_start = time.perf_counter()
+    recommendation = "".join(generate_followup_recommendation(
+        followup, session.query, session.last_answer, search_results, llm_function
+    ))
+    metrics.increment('session.refine')
+    log_query(followup, filters, search_results, {'generate': time.perf_counter() - generate_start}, 'followup', 5)
+
+    if candidates:
+        session.filters, session.candidates = filters, candidates
+    session.last_answer = recommendation
+    session.turns += 1
+    get_session_store().put(session)
+    return {
+        'conversation_id': session.conversation_id,
+        'query': followup,
+        'recommendation': recommendation,
+        'refined': True
+    }
+
+
+def _recommend_item(query, search_results, query_cache=None):
+    """Generate one batch item's answer, reporting a failure in the item instead of the whole batch"""
+    item = {'query': query}
+    try:
+        if not search_results:
+            item['recommendation'] = "I couldn't find any trails matching your criteria. Try a different search."
+        else:
+            item['recommendation'] = "".join(
+                cached_trail_recommendation(query, search_results, llm_function, query_cache)
+            )
+    except Exception as e:
+        item['error'] = f'Error: {str(e)}'
+    return item
+
+
+@bp.route('/recommend/batch', methods=['POST'])
+def recommend_trails_batch():
+    """
+    Request: {"queries": ["easy hike with my dog", "camping near Squamish"]}
+    Response: {"results": [{"conversation_id": "...", "query": "...", "recommendation": "..."}
+                           or {"query": "...", "error": "..."}, ...],
+               "errors": 0}
+
+    Filters are parsed concurrently, retrieval is one batched Qdrant request and answers
+    are generated in parallel (RECOMMEND_BATCH_CONCURRENCY at a time). Each answered query
+    starts a conversation, continued by passing its conversation_id to /recommend.
+    """
+    data = request.get_json(silent=True)
+    queries = data.get('queries') if isinstance(data, dict) else None
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': 'Please provide a non-empty list of queries'}), 400
+    max_queries = current_app.config['RECOMMEND_BATCH_MAX_QUERIES']
+    if len(queries) > max_queries:
+        return jsonify({'error': f'At most {max_queries} queries per batch'}), 400
+
+    results = [None] * len(queries)
+    valid = []
+    for i, query in enumerate(queries):
+        if isinstance(query, str) and query.strip():
+            valid.append(i)
+        else:
+            results[i] = {'query': query, 'error': 'Please provide a query'}
+
+    def timed_item(query, item_results):
+        start = time.perf_counter()
+        return _recommend_item(query, item_results, vector_db.query_cache), time.perf_counter() - start
+
+    try:
+        vector_db = get_vector_db()
+        with ThreadPoolExecutor(max_workers=current_app.config['RECOMMEND_BATCH_CONCURRENCY']) as executor:
+            valid_queries = [queries[i] for i in valid]
+            start = time.perf_counter()
+            filters_list = list(executor.map(vector_db.parse_filters, valid_queries))
+            parsed = time.perf_counter()
+            candidates_list = vector_db.search_trails_batch(
+                valid_queries, filters_list, limit=current_app.config['SESSION_CANDIDATES']
+            ) if valid else []
+            timings = {'parse': parsed - start, 'search': time.perf_counter() - parsed}
+            items = executor.map(timed_item, valid_queries, [candidates[:5] for candidates in candidates_list])
+            for i, filters_dict, candidates, (item, generate) in zip(valid, filters_list, candidates_list, items):
+                results[i] = item
+                if 'error' in item:
+                    continue
+                log_query(queries[i], filters_dict, candidates[:5], {**timings, 'generate': generate}, 'batch', 5)
+                if not candidates:
+                    continue
+                conversation_id = str(uuid.uuid4())
+                get_session_store().put(Session(
+                    conversation_id=conversation_id,
+                    query=queries[i],
+                    filters=filters_dict,
+                    candidates=compact_candidates(candidates),
+                    last_answer=item['recommendation']
+                ))
+                results[i] = {'conversation_id': conversation_id, **item}
+    except Exception as e:
+        current_app.logger.error(f"Error: {str(e)}")
+        return jsonify({'error': f'Error: {str(e)}'}), 500
+
+    return jsonify({'results': results, 'errors': sum('error' in item for item in results)})
+
+
+def _facet_filters(args):
+    """Typed filters from query-string arguments, e.g. ?dog_friendly=true&distance_max=5"""
+    filters = {}
+    for key, value in args.items():
+        field = key[:-4] if key.endswith(('_min', '_max')) else key
+        if field in NUMERIC_FIELDS:
+            filters[key] = float(value)
+        elif field in BOOLEAN_FIELDS:
+            if value.lower() not in ('true', 'false'):
+                raise ValueError(f"{key} must be true or false")
+            filters[key] = value.lower() == 'true'
+        else:
+            filters[key] = value
+    return filters
+
+
+@bp.route('/facets', methods=['GET'])
+def get_facets():
+    """
+    Trail counts and ranges for the current filters, from the in-memory facet index.
+    Query: ?difficulty=Easy&dog_friendly=true&region=North Shore&distance_max=5
+    Response: {"total": 42, "filters": {...},
+               "counts": {"difficulty": {"Easy": 42, "Intermediate": 57, ...}, "dog_friendly": {"true": 42, ...}, ...},
+               "ranges": {"distance": {"min": 1.2, "max": 5.0}, ...}, "elapsed_us": 85.3}
+
+    Each field's counts ignore that field's own filter, so they show what choosing another value gives.
+    """
+    error = FacetIndex.validate(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    try:
+        filters = _facet_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid filter: {e}'}), 400
+
+    try:
+        index = get_vector_db().get_facet_index()
+    except Exception as e:
+        # e.g. the collection hasn't been ingested yet
+        current_app.logger.error(f"Error loading facet index: {str(e)}")
+        return jsonify({'error': 'Trail index not available'}), 503
+    start = time.perf_counter()
+    facets = index.facets(filters)
+    elapsed = time.perf_counter() - start
+    metrics.observe('facets', elapsed)
+    return jsonify({**facets, 'filters': filters, 'elapsed_us': round(elapsed * 1e6, 1)})
+
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Search counters and mean stage timings of this worker process since it started.
+    Response: {"counters": {"search": 120, "search.name_match": 14, ...},
+               "timings": {"search.parse": {"count": 106, "mean_ms": 812.4}, ...},
+               "name_match_rate": 0.1167}
+    """
+    return jsonify(metrics.snapshot())
+
+
+@bp.route('/trails/<trail_id>', methods=['GET'])
+def get_trail(trail_id):
+    """
+    Trail details straight from the SQLite catalog (no Qdrant round trip).
+    Response: {"id": "...", "name": "...", "region": "...", ..., "description": "..."}
+    """
+    catalog = get_catalog()
+    if catalog is None:
+        return jsonify({'error': 'Trail catalog not available'}), 503
+    trail = catalog.get_trail(trail_id)
+    if trail is None:
+        return jsonify({'error': f'Trail {trail_id} not found'}), 404
+    return jsonify(trail)
+
+
+@bp.route('/trails/<trail_id>/similar', methods=['GET'])
+def similar_trails(trail_id):
+    """
+    Trails most similar to this one, from the precomputed similarity graph (no LLM call or search).
+    Query: ?limit=5
+    Response: {"id": "...", "similar": [{"id": "...", "score": 0.91, "name": "...", ...}, ...]}
+    """
+    try:
+        uuid.UUID(trail_id)
+    except ValueError:
+        return jsonify({'error': f'Trail {trail_id} not found'}), 404
+    limit = min(max(request.args.get('limit', 5, type=int), 1), 50)
+    similar = get_vector_db().get_similar_trails(trail_id, limit=limit)
+    if similar is None:
+        return jsonify({'error': f'Trail {trail_id} not found'}), 404
+    return jsonify({'id': trail_id, 'similar': similar})
+
+
 if __name__ == "__main__":
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
     from vantrails import create_app
@@ -104,5 +388,6 @@ if __name__ == "__main__":
     print("Starting VanTrails API...")
     print("Health check: http://localhost:8000/health")
     print("Trail recommendations: POST http://localhost:8000/api/recommend")
+    print("Trail details: GET http://localhost:8000/api/trails/<trail_id>")
     
     app.run(debug=True, host='0.0.0.0', port=8000)